@@ -2,7 +2,7 @@
 
 
 a = Analysis(
-    ['visualizador.py'],
+    ['pixelvista.py'],
     pathex=[],
     binaries=[],
     datas=[('icone.ico', '.'), ('Tesseract-OCR', 'Tesseract-OCR')],
@@ -0,0 +1,269 @@
+# ===================================================================
+#        BENCHMARK SEM INTERFACE: CARREGAR, RENDERIZAR, EDITAR, LOTE
+# ===================================================================
+# Gera imagens sintéticas (determinísticas) em vários tamanhos e formatos e
+# mede os mesmos caminhos de código usados pela janela: decode_image
+# (load_image), o redimensionamento de fit_image_to_window, render_region
+# (apply_zoom), cada operação de edits.py, a padronização e o lote.
+# A conversão para PhotoImage e a abertura do programa (processo novo até a
+# primeira imagem na tela) precisam de um display: sem DISPLAY, um Xvfb é
+# iniciado pelo xvfbwrapper (requirements-dev.txt); --no-gui pula esses casos.
+# Cada caso registra o próprio pico de memória residente (peak_rss_mb).
+#   python benchmark.py --sizes small,medium --repeat 7 --output atual.json
+#   python benchmark.py --save-baseline base.json
+#   python benchmark.py --baseline base.json --threshold 0.15   (sai com código 1 se houver regressão)
+#   python benchmark.py --no-gui                                (sem display e sem Xvfb)
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+from PIL import Image
+import edits
+import pipeline
+from image_loader import decode_image, fit_size
+from rendering import render_region, preview_resample
+from profiling import peak_memory_mb, process_memory_mb, reset_peak_memory
+
+SIZES = {'small': (1280, 960), 'medium': (4000, 3000), 'large': (8000, 6000)}
+FORMATS = {'jpeg': ('JPEG', '.jpg', {'quality': 90}), 'png': ('PNG', '.png', {}), 'webp': ('WEBP', '.webp', {'quality': 90}), 'tiff': ('TIFF', '.tif', {})}
+CANVAS_SIZE = (1200, 700)       # Área de imagem da janela padrão (1200x750 menos barras)
+ZOOM_LEVELS = (0.25, 1.0, 3.0)
+BATCH_IMAGES = 16
+
+
+def synthetic_image(size):
+    # Conteúdo determinístico com detalhe fino (fractal) e gradientes suaves, parecido com uma foto para os codecs
+    detail = Image.effect_mandelbrot(size, (-2.2, -1.2, 1.0, 1.2), 64)
+    gradient_x = Image.linear_gradient('L').resize(size)
+    gradient_y = gradient_x.transpose(Image.Transpose.ROTATE_90).resize(size)
+    return Image.merge('RGB', (detail, gradient_x, gradient_y))
+
+
+def percentile(sorted_values, fraction):
+    # Posição mais próxima (nearest-rank)
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup): fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter(); fn(); samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples, megapixels=None, items=1):
+    values = sorted(samples); mean = sum(values) / len(values)
+    result = {'n': len(values), 'mean_ms': round(mean, 3), 'min_ms': round(values[0], 3), 'max_ms': round(values[-1], 3),
+              'p50_ms': round(percentile(values, 0.5), 3), 'p90_ms': round(percentile(values, 0.9), 3), 'p99_ms': round(percentile(values, 0.99), 3),
+              'ops_per_s': round(items * 1000 / mean, 2) if mean > 0 else None}
+    if megapixels: result['mpix_per_s'] = round(megapixels * items * 1000 / mean, 2) if mean > 0 else None
+    return result
+
+
+class PeakMemory:
+    # Pico de memória residente durante um bloco: no Linux o pico do kernel é zerado na entrada e lido na saída;
+    # nas outras plataformas (o pico não pode ser zerado) uma thread amostra a memória atual
+    def __init__(self, interval=0.002):
+        self.interval, self.peak_mb = interval, None
+
+    def __enter__(self):
+        self.exact = reset_peak_memory()
+        self.samples = [process_memory_mb()]
+        self.stop = threading.Event(); self.thread = None
+        if not self.exact: self.thread = threading.Thread(target=self._sample, daemon=True); self.thread.start()
+        return self
+
+    def _sample(self):
+        while not self.stop.wait(self.interval): self.samples.append(process_memory_mb())
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        if self.thread: self.thread.join()
+        self.samples.append(peak_memory_mb() if self.exact else process_memory_mb())
+        values = [v for v in self.samples if v is not None]
+        self.peak_mb = round(max(values), 1) if values else None
+        return False
+
+
+class Suite:
+    def __init__(self, sizes, formats, repeat, workers, work_dir, gui=True):
+        self.sizes, self.formats, self.repeat, self.workers, self.work_dir, self.gui = sizes, formats, repeat, workers, work_dir, gui
+        self.results = {}
+
+    def run(self, name, fn, megapixels=None, items=1, repeat=None):
+        with PeakMemory() as memory: samples = measure(fn, repeat or self.repeat)
+        self.add(name, samples, megapixels, items, memory.peak_mb)
+
+    def add(self, name, samples, megapixels=None, items=1, peak_rss_mb=None):
+        self.results[name] = dict(summarize(samples, megapixels, items), peak_rss_mb=peak_rss_mb)
+        print(f"{name:<40} p50 {self.results[name]['p50_ms']:>10.2f} ms   p90 {self.results[name]['p90_ms']:>10.2f} ms", file=sys.stderr)
+
+    def write_sources(self):
+        paths = {}
+        for size_name in self.sizes:
+            image = synthetic_image(SIZES[size_name])
+            for fmt in self.formats:
+                pil_format, extension, save_kwargs = FORMATS[fmt]
+                path = os.path.join(self.work_dir, f"{size_name}{extension}")
+                image.save(path, pil_format, **save_kwargs); paths[size_name, fmt] = path
+        return paths
+
+    def bench_load(self, paths):
+        # load_image: decodificação na escala da janela (draft/reduce) + versão ajustada à janela
+        for (size_name, fmt), path in paths.items():
+            mp = SIZES[size_name][0] * SIZES[size_name][1] / 1e6
+            self.run(f"load/{fmt}/{size_name}", lambda: decode_image(path, CANVAS_SIZE), mp)
+            self.run(f"load_full/{fmt}/{size_name}", lambda: decode_image(path, full=True), mp)
+
+    def bench_view(self, image, size_name):
+        mp = image.width * image.height / 1e6
+        new_w, new_h, ratio = fit_size(image.size, CANVAS_SIZE)
+        self.run(f"fit/{size_name}", lambda: image.resize((new_w, new_h), Image.Resampling.LANCZOS), mp)
+        for zoom in ZOOM_LEVELS:
+            origin = ((CANVAS_SIZE[0] - image.width * zoom) / 2, (CANVAS_SIZE[1] - image.height * zoom) / 2)
+            self.run(f"zoom/{zoom}x/fast/{size_name}", lambda: render_region(image, zoom, origin, CANVAS_SIZE, preview_resample(zoom), 2.0))
+            self.run(f"zoom/{zoom}x/lanczos/{size_name}", lambda: render_region(image, zoom, origin, CANVAS_SIZE))
+
+    def bench_edits(self, image, size_name):
+        mp = image.width * image.height / 1e6
+        w, h = image.size
+        operations = {'rotate': edits.rotate(90), 'flip': edits.flip(Image.Transpose.FLIP_LEFT_RIGHT), 'crop': edits.crop((w // 4, h // 4, w * 3 // 4, h * 3 // 4)),
+                      'resize': edits.resize((w // 2, h // 2)), 'grayscale': edits.grayscale(), 'adjust': edits.adjust(image, 1.2, 1.1, 1.3),
+                      'standardize': edits.standardize(900, 900)}
+        for op_name, op in operations.items():
+            self.run(f"edit/{op_name}/{size_name}", lambda: edits.apply_op(image, op), mp)
+        # Pilha completa como no salvamento: otimização + execução em resolução real
+        stack = list(operations.values())
+        self.run(f"edit/render_stack/{size_name}", lambda: edits.render(image, edits.optimize(stack, image.size)), mp)
+
+    def bench_photoimage(self, image, size_name):
+        import tkinter as tk
+        from PIL import ImageTk
+        root = tk.Tk(); root.withdraw()
+        try:
+            new_w, new_h, _ = fit_size(image.size, CANVAS_SIZE)
+            display = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
+            self.run(f"photoimage/{size_name}", lambda: ImageTk.PhotoImage(display), new_w * new_h / 1e6)
+        finally: root.destroy()
+
+    def bench_startup(self, paths):
+        # Clique duplo num arquivo: o próprio programa informa o tempo desde a criação do processo até a primeira imagem
+        # (medido noutro processo: o pico de memória deste não se aplica)
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pixelvista.py')
+        env = dict(os.environ, PIXELVISTA_STARTUP_EXIT='1')
+        for size_name in self.sizes:
+            command = [sys.executable, script, '--new-window', paths[size_name, self.formats[0]]]
+            launch = lambda: float(subprocess.run(command, env=env, capture_output=True, text=True, timeout=120, check=True).stdout.split()[-1])
+            launch()    # Aquecimento (cache de disco e do .pyc)
+            self.add(f"startup/{size_name}", [launch() for _ in range(self.repeat)])
+
+    def bench_batch(self, image, size_name):
+        # batch_process_images: o mesmo pipeline (pool de processos) sobre BATCH_IMAGES cópias
+        source_dir = os.path.join(self.work_dir, f"batch-{size_name}"); os.makedirs(source_dir)
+        for i in range(BATCH_IMAGES): image.save(os.path.join(source_dir, f"img{i:03d}.jpg"), 'JPEG', quality=90)
+        options = pipeline.StandardizeOptions(900, 900)
+        output_dir = os.path.join(source_dir, pipeline.OUTPUT_DIR_NAME)
+
+        def run_batch():
+            files = pipeline.iter_image_files([source_dir], exclude_dirs=[output_dir])
+            failures = [r for r in pipeline.run_standardize(files, options, lambda root: output_dir, self.workers) if not r['ok']]
+            if failures: raise RuntimeError(failures[0]['error'])
+        self.run(f"batch/{self.workers}workers/{size_name}", run_batch, image.width * image.height / 1e6, BATCH_IMAGES, repeat=max(1, self.repeat // 2))
+
+    def run_all(self):
+        paths = self.write_sources()
+        self.bench_load(paths)
+        if self.gui: self.bench_startup(paths)
+        for size_name in self.sizes:
+            image = decode_image(paths[size_name, self.formats[0]], full=True).image
+            self.bench_view(image, size_name)
+            self.bench_edits(image, size_name)
+            if self.gui: self.bench_photoimage(image, size_name)
+            self.bench_batch(image, size_name)
+        return self.results
+
+
+def start_display():
+    # Tk precisa de um servidor X: sem DISPLAY (Linux/BSD em CI), sobe um Xvfb, que exporta DISPLAY também para o
+    # processo da medição de abertura. Sem como subir um, falha em vez de omitir casos em silêncio.
+    if sys.platform in ('win32', 'darwin') or os.environ.get('DISPLAY'): return None
+    try: from xvfbwrapper import Xvfb
+    except ImportError: raise RuntimeError("sem display (DISPLAY vazio) e xvfbwrapper não instalado; instale requirements-dev.txt ou use --no-gui")
+    display = Xvfb(width=1280, height=800)
+    try: display.start()
+    except Exception as e: raise RuntimeError(f"não foi possível iniciar o Xvfb: {e}; use --no-gui para pular PhotoImage e abertura")
+    return display
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    # Regressão: p50 pior que a linha de base além da tolerância relativa E de uma diferença mínima absoluta (ruído)
+    regressions, rows = [], []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base: continue
+        ratio = current['p50_ms'] / base['p50_ms'] if base['p50_ms'] > 0 else 1.0
+        row = {'name': name, 'baseline_p50_ms': base['p50_ms'], 'p50_ms': current['p50_ms'], 'ratio': round(ratio, 3)}
+        rows.append(row)
+        if ratio > 1 + threshold and current['p50_ms'] - base['p50_ms'] > min_delta_ms: regressions.append(row)
+    return rows, regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pixelvista-benchmark", description="Benchmark dos caminhos de carregamento, renderização, edição e lote.")
+    parser.add_argument("--sizes", default="small,medium", help=f"Tamanhos separados por vírgula: {', '.join(SIZES)} (padrão: small,medium).")
+    parser.add_argument("--formats", default="jpeg,png", help=f"Formatos separados por vírgula: {', '.join(FORMATS)} (padrão: jpeg,png).")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições medidas por caso (padrão: 5; há uma execução de aquecimento).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos do lote (padrão: número de CPUs).")
+    parser.add_argument("--output", help="Grava o resultado JSON neste arquivo (padrão: saída padrão).")
+    parser.add_argument("--save-baseline", help="Grava o resultado também como linha de base para comparações futuras.")
+    parser.add_argument("--baseline", help="Compara com uma linha de base e sai com código 1 se houver regressão.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Tolerância relativa no p50 antes de acusar regressão (padrão: 0.15).")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Diferença absoluta mínima (ms) para contar como regressão (padrão: 1.0).")
+    parser.add_argument("--no-gui", action="store_true", help="Pula a conversão para PhotoImage e a abertura do programa (que precisam de display).")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sizes = [s for s in args.sizes.split(',') if s]; formats = [f for f in args.formats.split(',') if f]
+    unknown = [s for s in sizes if s not in SIZES] + [f for f in formats if f not in FORMATS]
+    if unknown: print(f"Erro: valores desconhecidos: {', '.join(unknown)}", file=sys.stderr); return 2
+    display = None
+    if not args.no_gui:
+        try: display = start_display()
+        except RuntimeError as e: print(f"Erro: {e}", file=sys.stderr); return 2
+    work_dir = tempfile.mkdtemp(prefix="pixelvista-bench-")
+    try: results = Suite(sizes, formats, args.repeat, args.workers, work_dir, gui=not args.no_gui).run_all()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if display: display.stop()
+    peaks = [r['peak_rss_mb'] for r in results.values() if r['peak_rss_mb'] is not None]
+    report = {'version': 1, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'platform': platform.platform(),
+              'cpu_count': os.cpu_count(), 'peak_rss_mb': max(peaks) if peaks else peak_memory_mb(),
+              'settings': {'sizes': sizes, 'formats': formats, 'repeat': args.repeat, 'workers': args.workers, 'gui': not args.no_gui}, 'results': results}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f: baseline = json.load(f)['results']
+        rows, regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        report['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'rows': rows, 'regressions': regressions}
+        for row in regressions: print(f"REGRESSÃO {row['name']}: {row['baseline_p50_ms']:.2f} -> {row['p50_ms']:.2f} ms ({row['ratio']:.2f}x)", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: f.write(text)
+    else: print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f: f.write(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
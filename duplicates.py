@@ -0,0 +1,239 @@
+# ===================================================================
+#        DUPLICATAS E QUASE-DUPLICATAS POR HASH PERCEPTUAL
+# ===================================================================
+# Cada arquivo é decodificado uma vez em tamanho reduzido (draft do JPEG
+# em 1/8) e vira três hashes de 64 bits (aHash, dHash, pHash), calculados
+# num pool de processos e guardados num índice SQLite por pasta (validado
+# por tamanho + mtime). O agrupamento não compara todos os pares: um
+# índice de Hamming por partes (4 blocos de 16 bits) só devolve candidatos
+# que compartilham um bloco igual ou quase igual ao do hash consultado.
+import os
+import math
+import queue
+import sqlite3
+import operator
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image
+from storage import folder_cache_path
+from thumbnails import MAX_SOURCE_PIXELS
+from orientation import read_orientation, apply_orientation, swaps_axes
+
+HASH_METHODS = ('phash', 'dhash', 'ahash')
+DEFAULT_METHOD = 'phash'
+DEFAULT_MAX_DISTANCE = 6    # Bits diferentes (de 64) ainda considerados a mesma imagem
+MAX_DISTANCE_LIMIT = 10      # Acima disso a busca por blocos (r // 4 bits por bloco) visita baldes demais
+CHUNK_FILES = 32            # Arquivos por tarefa enviada ao pool (menos troca de mensagens entre processos)
+INDEX_VERSION = 1       # Hashes calculados sem a orientação EXIF (versão 0) são recalculados
+COLUMNS = ('name', 'size', 'mtime_ns', 'width', 'height', 'ahash', 'dhash', 'phash')
+
+# Base do DCT-II (só as 8 frequências mais baixas de 32 amostras são usadas pelo pHash)
+_DCT = [[math.cos(math.pi * k * (2 * n + 1) / 64) for n in range(32)] for k in range(8)]
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+# --- Hashes ---
+def _bits(flags):
+    value = 0
+    for flag in flags: value = (value << 1) | bool(flag)
+    return value
+
+
+def average_hash(small):
+    pixels = list(small.resize((8, 8), Image.Resampling.BOX).getdata())
+    mean = sum(pixels) / 64
+    return _bits(p > mean for p in pixels)
+
+
+def difference_hash(small):
+    pixels = list(small.resize((9, 8), Image.Resampling.BOX).getdata())
+    return _bits(pixels[row * 9 + col + 1] > pixels[row * 9 + col] for row in range(8) for col in range(8))
+
+
+def perceptual_hash(small):
+    # DCT 2D separável da imagem 32x32; bits = coeficientes 8x8 de baixa frequência acima da mediana
+    pixels = list(small.getdata())
+    rows = [[sum(map(operator.mul, pixels[y * 32:y * 32 + 32], basis)) for basis in _DCT] for y in range(32)]
+    coefficients = [sum(map(operator.mul, [row[u] for row in rows], basis)) for basis in _DCT for u in range(8)]
+    median = sorted(coefficients)[32]
+    return _bits(c > median for c in coefficients)
+
+
+def hash_file(path):
+    # Executado nos processos do pool: precisa ser uma função de módulo (picklable)
+    st = os.stat(path)
+    with Image.open(path) as img:
+        if img.format != 'JPEG' and img.width * img.height > MAX_SOURCE_PIXELS: raise ValueError(f"imagem grande demais: {img.size}")
+        orientation = read_orientation(img)
+        width, height = (img.height, img.width) if swaps_axes(orientation) else img.size
+        img.draft('L', (64, 64))       # JPEG: decodifica só a luminância, direto em 1/2..1/8 da resolução
+        # A mesma foto girada pela tag EXIF ou já girada nos pixels deve gerar o mesmo hash
+        small = apply_orientation(img.convert('L').resize((32, 32), Image.Resampling.LANCZOS, reducing_gap=2.0), orientation)
+    return (os.path.basename(path), st.st_size, st.st_mtime_ns, width, height, average_hash(small), difference_hash(small), perceptual_hash(small))
+
+
+def hash_files(paths):
+    # Um lote por tarefa: [(caminho, linha do índice ou None, erro)]
+    results = []
+    for path in paths:
+        try: results.append((path, hash_file(path), None))
+        except Exception as e: results.append((path, None, str(e)))
+    return results
+
+
+def _to_db(value): return value - (1 << 64) if value >= 1 << 63 else value      # INTEGER do SQLite tem sinal
+def _from_db(value): return value + (1 << 64) if value < 0 else value
+
+
+# --- Índice de hashes da pasta ---
+class HashIndex:
+    def __init__(self, folder, db_path=None):
+        self.folder = os.path.abspath(folder)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path or folder_cache_path('hashes', self.folder), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, width INTEGER, height INTEGER, "
+                           "ahash INTEGER, dhash INTEGER, phash INTEGER)")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+            self._conn.execute("DELETE FROM files"); self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}"); self._conn.commit()
+        self._rows = {}
+        for row in self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM files"):
+            meta = dict(zip(COLUMNS, row))
+            for method in HASH_METHODS: meta[method] = _from_db(meta[method])
+            self._rows[meta['name']] = meta
+
+    def get(self, path):
+        return self._rows.get(os.path.basename(path))
+
+    def is_current(self, path):
+        meta = self.get(path)
+        if meta is None: return False
+        st = os.stat(path)
+        return (meta['size'], meta['mtime_ns']) == (st.st_size, st.st_mtime_ns)
+
+    def store(self, rows):
+        if not rows: return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [row[:5] + tuple(_to_db(h) for h in row[5:]) for row in rows])
+            self._conn.commit()
+            for row in rows: self._rows[row[0]] = dict(zip(COLUMNS, row))
+
+    def prune(self, paths):
+        # Remove do índice os arquivos que não estão mais na pasta
+        names = {os.path.basename(p) for p in paths}
+        with self._lock:
+            gone = [name for name in self._rows if name not in names]
+            if not gone: return
+            self._conn.executemany("DELETE FROM files WHERE name = ?", [(name,) for name in gone])
+            self._conn.commit()
+            for name in gone: del self._rows[name]
+
+
+# --- Agrupamento por distância de Hamming ---
+class HammingIndex:
+    # Se dois hashes diferem em até r bits, pelo menos um dos 4 blocos de 16 bits difere em até r // 4 bits:
+    # a busca só visita os baldes desses blocos (e seus vizinhos) em vez de comparar com todos os hashes
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        self._flips = [sum(1 << b for b in combo) for k in range(max_distance // 4 + 1) for combo in itertools.combinations(range(16), k)]
+        self._tables = ({}, {}, {}, {})
+
+    @staticmethod
+    def _chunks(value):
+        return value & 0xFFFF, (value >> 16) & 0xFFFF, (value >> 32) & 0xFFFF, value >> 48
+
+    def add(self, value):
+        for table, chunk in zip(self._tables, self._chunks(value)): table.setdefault(chunk, []).append(value)
+
+    def search(self, value):
+        candidates = set()
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            get = table.get
+            for flip in self._flips:
+                bucket = get(chunk ^ flip)
+                if bucket is not None: candidates.update(bucket)
+        return [other for other in candidates if _popcount(other ^ value) <= self.max_distance]
+
+
+def find_groups(hashes, max_distance, cancel_event=None):
+    # hashes: {caminho: hash}. Retorna grupos (listas de caminhos) de imagens parecidas, os maiores primeiro.
+    # Parecido com parecido é agrupado junto (A~B e B~C ficam no mesmo grupo).
+    by_hash = {}
+    for path, value in hashes.items(): by_hash.setdefault(value, []).append(path)
+    parent = {value: value for value in by_hash}
+
+    def find(value):
+        while parent[value] != value: parent[value] = parent[parent[value]]; value = parent[value]
+        return value
+    index = HammingIndex(max_distance)
+    for count, value in enumerate(by_hash):
+        if cancel_event is not None and count % 1000 == 0 and cancel_event.is_set(): return []
+        if max_distance:
+            for other in index.search(value): parent[find(other)] = find(value)
+        index.add(value)
+    clusters = {}
+    for value, paths in by_hash.items(): clusters.setdefault(find(value), []).extend(paths)
+    groups = [sorted(paths) for paths in clusters.values() if len(paths) > 1]
+    groups.sort(key=lambda group: (-len(group), group[0]))
+    return groups
+
+
+def best_of_group(group, index):
+    # Arquivo a manter: maior resolução, depois maior arquivo
+    def quality(path):
+        meta = index.get(path) or {}
+        return (meta.get('width') or 0) * (meta.get('height') or 0), meta.get('size') or 0
+    return max(group, key=quality)
+
+
+# --- Execução em fundo ---
+class DuplicateFinder:
+    # Thread de fundo: atualiza os hashes (pool de processos) e agrupa. Eventos em `results`:
+    # ('hashed', processados, total, falhas), ('grouping', None), ('done', grupos) ou ('error', exceção)
+    def __init__(self, index, paths, method=DEFAULT_METHOD, max_distance=DEFAULT_MAX_DISTANCE, workers=None):
+        self.index, self.paths, self.method, self.max_distance = index, list(paths), method, max_distance
+        self.workers = workers or os.cpu_count() or 1
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        threading.Thread(target=self._run, name="PixelVista-Duplicates", daemon=True).start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _run(self):
+        try:
+            self._update_hashes()
+            if self.cancel_event.is_set(): self.results.put(('done', None)); return
+            self.results.put(('grouping', None))
+            rows = ((path, self.index.get(path)) for path in self.paths)
+            hashes = {path: meta[self.method] for path, meta in rows if meta is not None}
+            groups = find_groups(hashes, self.max_distance, self.cancel_event)
+            self.results.put(('done', None if self.cancel_event.is_set() else groups))
+        except Exception as e: self.results.put(('error', e))
+
+    def _update_hashes(self):
+        missing = []
+        for path in self.paths:
+            try:
+                if not self.index.is_current(path): missing.append(path)
+            except OSError: continue
+        self.index.prune(self.paths)
+        total, processed, failed = len(missing), 0, 0
+        self.results.put(('hashed', processed, total, failed))
+        if not missing: return
+        chunks = iter([missing[i:i + CHUNK_FILES] for i in range(0, total, CHUNK_FILES)])
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            while True:
+                while len(pending) < self.workers * 2 and not self.cancel_event.is_set():
+                    chunk = next(chunks, None)
+                    if chunk is None: break
+                    pending.add(pool.submit(hash_files, chunk))
+                if not pending: break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results = future.result()
+                    self.index.store([row for _, row, error in results if row is not None])
+                    processed += len(results); failed += sum(1 for _, row, _ in results if row is None)
+                self.results.put(('hashed', processed, total, failed))
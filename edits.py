@@ -0,0 +1,263 @@
+# ===================================================================
+#                  PILHA DE EDIÇÕES NÃO DESTRUTIVAS
+# ===================================================================
+# Cada edição é uma operação (tupla) guardada numa lista. A lista é aplicada
+# numa versão reduzida (proxy) para a pré-visualização e só é executada em
+# resolução real ao salvar, depois de otimizada por optimize():
+#   - rotações/inversões consecutivas viram uma única transposição;
+#   - cortes são movidos para antes de redimensionamentos e ajustes;
+#   - corte + redimensionamento viram um único resize(box=...).
+#
+# Operações:
+#   ('transpose', (flip, k))        inversão horizontal opcional seguida de k rotações de 90° (anti-horário)
+#   ('crop', (x0, y0, x1, y1))
+#   ('resize', (w, h), box)         box = região da entrada a redimensionar (None = imagem inteira)
+#   ('grayscale',)
+#   ('adjust', (brilho, contraste, nitidez, média))  média = luminância de referência do contraste
+#   ('standardize', (w, h), cor_da_borda)
+import zlib
+import struct
+from collections import OrderedDict
+from PIL import Image, ImageEnhance, ImageFilter
+
+# Elemento (flip, k) -> método do Pillow
+_TRANSPOSE_METHODS = {
+    (0, 1): Image.Transpose.ROTATE_90, (0, 2): Image.Transpose.ROTATE_180, (0, 3): Image.Transpose.ROTATE_270,
+    (1, 0): Image.Transpose.FLIP_LEFT_RIGHT, (1, 1): Image.Transpose.TRANSPOSE,
+    (1, 2): Image.Transpose.FLIP_TOP_BOTTOM, (1, 3): Image.Transpose.TRANSVERSE,
+}
+_TRANSPOSE_ELEMENTS = {method: element for element, method in _TRANSPOSE_METHODS.items()}
+
+# Operações que atuam pixel a pixel (ou quase) e por isso podem trocar de lugar com um corte
+_CROP_COMMUTES = ('grayscale', 'adjust')
+
+
+# --- Construtores ---
+def rotate(angle):
+    return ('transpose', (0, (angle // 90) % 4))
+
+def flip(method):
+    return ('transpose', _TRANSPOSE_ELEMENTS[method])
+
+def crop(box):
+    return ('crop', tuple(int(round(v)) for v in box))
+
+def resize(size):
+    return ('resize', tuple(size), None)
+
+def grayscale():
+    return ('grayscale',)
+
+def adjust(image, brightness, contrast, sharpness):
+    # A média usada pelo contraste é fixada aqui, a partir da imagem editada, para que o
+    # resultado não dependa de cortes feitos depois (e a operação possa ser reordenada)
+    return ('adjust', (brightness, contrast, sharpness, contrast_mean(image, brightness)))
+
+def standardize(target_w, target_h, pad_color=(255, 255, 255)):
+    return ('standardize', (target_w, target_h), tuple(pad_color))
+
+
+# --- Álgebra das transposições (grupo diedral de 8 elementos) ---
+def compose_transpose(first, second):
+    # Aplicar 'first' e depois 'second' equivale a um único elemento
+    f1, k1 = first; f2, k2 = second
+    return (f1 ^ f2, (k2 + (-k1 if f2 else k1)) % 4)
+
+def invert_transpose(element):
+    flip_, k = element
+    return element if flip_ else (0, -k % 4)
+
+
+# --- Execução ---
+def contrast_mean(image, brightness=1.0):
+    # Mesma média do ImageEnhance.Contrast, calculada sobre a imagem já com o brilho aplicado. Cada canal
+    # satura em 255 separadamente, então a média não pode ser tirada só do histograma de luminância original.
+    if image.mode not in ('L', 'RGB', 'RGBA'): image = image.convert('RGB')
+    if brightness != 1.0: image = image.point(adjustment_lut(brightness, 1.0, 0, image.getbands()))
+    histogram = image.convert("L").histogram()
+    total = sum(histogram) or 1
+    return int(sum(i * count for i, count in enumerate(histogram)) / total + 0.5)
+
+def _f32(value):
+    return struct.unpack('f', struct.pack('f', value))[0]
+
+def adjustment_lut(brightness, contrast, mean, bands):
+    # Brilho e contraste fundidos numa única tabela por canal. O ImageEnhance (Image.blend) calcula em
+    # float de 32 bits e trunca: a tabela repete essas contas para dar exatamente o mesmo resultado.
+    b, c = _f32(brightness), _f32(contrast)
+    table = [max(0, min(255, int(_f32(mean + _f32(c * (min(255, int(_f32(b * i))) - mean)))))) for i in range(256)]
+    identity = list(range(256))
+    return [v for band in bands for v in (identity if band == 'A' else table)]
+
+def apply_adjustments(image, brightness, contrast, sharpness, mean):
+    # Uma única passada (Image.point) para brilho + contraste; a nitidez depende da vizinhança e vem depois
+    if image.mode not in ('L', 'RGB', 'RGBA'): image = image.convert('RGB')
+    if brightness != 1.0 or contrast != 1.0: image = image.point(adjustment_lut(brightness, contrast, mean, image.getbands()))
+    if sharpness != 1.0: image = ImageEnhance.Sharpness(image).enhance(sharpness)
+    return image
+
+class AdjustmentPreview:
+    # Pré-visualização em tempo real dos ajustes sobre um proxy do tamanho do canvas.
+    # A média do contraste (uma por posição do slider de brilho) e a versão suavizada (base
+    # da nitidez) são calculadas uma única vez; cada quadro custa duas consultas de tabela e uma mistura.
+    def __init__(self, proxy):
+        self.proxy = proxy if proxy.mode in ('L', 'RGB', 'RGBA') else proxy.convert('RGB')
+        self.means = {}
+        self.smoothed = None
+
+    def render(self, brightness, contrast, sharpness):
+        if brightness not in self.means: self.means[brightness] = contrast_mean(self.proxy, brightness)
+        lut = adjustment_lut(brightness, contrast, self.means[brightness], self.proxy.getbands())
+        image = self.proxy.point(lut)
+        if sharpness != 1.0:
+            # SMOOTH comuta (aproximadamente) com a tabela, então basta suavizar o proxy original uma vez
+            if self.smoothed is None: self.smoothed = self.proxy.filter(ImageFilter.SMOOTH)
+            image = Image.blend(self.smoothed.point(lut), image, sharpness)
+        return image
+
+def apply_op(image, op):
+    kind = op[0]
+    if kind == 'transpose':
+        method = _TRANSPOSE_METHODS.get(op[1])
+        return image.transpose(method) if method is not None else image
+    if kind == 'crop': return image.crop(op[1])
+    if kind == 'resize': return image.resize(op[1], Image.Resampling.LANCZOS, box=op[2])
+    if kind == 'grayscale': return image.convert("L")
+    if kind == 'adjust': return apply_adjustments(image, *op[1])
+    if kind == 'standardize':
+        from pipeline import standardize_image      # O pipeline (pool de processos, CLI) só é carregado quando usado
+        return standardize_image(image, *op[1], op[2])
+    raise ValueError(f"Operação desconhecida: {kind}")
+
+def render(image, ops):
+    for op in ops: image = apply_op(image, op)
+    return image
+
+def output_size(size, op):
+    kind = op[0]
+    if kind == 'transpose': return (size[1], size[0]) if op[1][1] % 2 else size
+    if kind == 'crop': return (op[1][2] - op[1][0], op[1][3] - op[1][1])
+    if kind in ('resize', 'standardize'): return op[1]
+    return size
+
+def final_size(size, ops):
+    for op in ops: size = output_size(size, op)
+    return size
+
+def scale_op(op, scale):
+    # Converte uma operação em pixels reais para a escala do proxy
+    if scale == 1: return op
+    kind = op[0]
+    if kind == 'crop': return ('crop', tuple(int(round(v * scale)) for v in op[1]))
+    if kind == 'resize':
+        box = tuple(v * scale for v in op[2]) if op[2] else None
+        return ('resize', tuple(max(1, int(round(v * scale))) for v in op[1]), box)
+    if kind == 'standardize': return ('standardize', tuple(max(1, int(round(v * scale))) for v in op[1]), op[2])
+    return op
+
+
+# --- Otimização ---
+def optimize(ops, size):
+    # Repete as regras de reescrita até a lista estabilizar; 'size' é o tamanho da imagem de entrada
+    ops = list(ops)
+    changed = True
+    while changed:
+        changed = False
+        sizes = [size]
+        for op in ops: sizes.append(output_size(sizes[-1], op))
+        for i in range(len(ops)):
+            rewritten = _rewrite(ops[i], ops[i + 1] if i + 1 < len(ops) else None, sizes[i])
+            if rewritten is not None:
+                ops[i:i + 2 if i + 1 < len(ops) else i + 1] = rewritten
+                changed = True
+                break
+    return ops
+
+def _rewrite(op, next_op, in_size):
+    # Retorna a lista que substitui [op, next_op] (ou só [op] se next_op for None), ou None se nada mudar
+    kind = op[0]
+    if kind == 'transpose' and op[1] == (0, 0): return [next_op] if next_op else []
+    if next_op is None: return None
+    next_kind = next_op[0]
+    if kind == 'transpose' and next_kind == 'transpose':
+        return [('transpose', compose_transpose(op[1], next_op[1]))]
+    if kind == 'crop' and next_kind == 'crop':
+        x0, y0 = op[1][0], op[1][1]; bx0, by0, bx1, by1 = next_op[1]
+        return [('crop', (x0 + bx0, y0 + by0, x0 + bx1, y0 + by1))]
+    if kind == 'crop' and next_kind == 'resize':
+        x0, y0 = op[1][0], op[1][1]
+        bx0, by0, bx1, by1 = next_op[2] or (0, 0) + output_size(in_size, op)
+        return [('resize', next_op[1], (x0 + bx0, y0 + by0, x0 + bx1, y0 + by1))]
+    if kind == 'resize' and next_kind in ('crop', 'resize'):
+        # Converte a região pedida (na saída do primeiro resize) para coordenadas da entrada
+        box = op[2] or (0, 0) + tuple(in_size)
+        sx = (box[2] - box[0]) / op[1][0]; sy = (box[3] - box[1]) / op[1][1]
+        if next_kind == 'crop':
+            cx0, cy0, cx1, cy1 = next_op[1]; out_size = (cx1 - cx0, cy1 - cy0)
+        else:
+            cx0, cy0, cx1, cy1 = next_op[2] or (0, 0) + tuple(op[1]); out_size = next_op[1]
+        return [('resize', out_size, (box[0] + cx0 * sx, box[1] + cy0 * sy, box[0] + cx1 * sx, box[1] + cy1 * sy))]
+    if kind in _CROP_COMMUTES and next_kind == 'crop': return [next_op, op]
+    if kind == 'grayscale' and next_kind == 'grayscale': return [op]
+    return None
+
+
+# ===================================================================
+#              HISTÓRICO (DESFAZER/REFAZER) COM MEMÓRIA LIMITADA
+# ===================================================================
+# Transposições são desfeitas aplicando a inversa (sem cópia da imagem).
+# Para as demais operações guarda-se uma cópia comprimida da prévia anterior;
+# quando ela é descartada por falta de memória, o estado é recalculado a
+# partir da cópia anterior mais próxima (ou da imagem base).
+class EditHistory:
+    def __init__(self, max_mb=256):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ops, self.redo_ops = [], []
+        self.snapshots = OrderedDict()     # índice i -> prévia antes de ops[i] (modo, tamanho, bytes zlib)
+        self.snapshot_bytes = 0
+
+    def reset(self):
+        self.ops, self.redo_ops = [], []
+        self.drop_snapshots()
+
+    def drop_snapshots(self):
+        # As cópias ficam inválidas quando a escala da prévia muda
+        self.snapshots.clear(); self.snapshot_bytes = 0
+
+    def can_undo(self): return bool(self.ops)
+    def can_redo(self): return bool(self.redo_ops)
+
+    def push(self, op, before_image, clear_redo=True):
+        if clear_redo:
+            self.redo_ops = []
+            for index in [i for i in self.snapshots if i > len(self.ops)]: self._discard(index)
+        if op[0] != 'transpose' and len(self.ops) not in self.snapshots: self._store(len(self.ops), before_image)
+        self.ops.append(op)
+
+    def undo(self, current_image, base_image, scale):
+        op = self.ops.pop(); self.redo_ops.append(op)
+        index = len(self.ops)
+        if op[0] == 'transpose': return apply_op(current_image, ('transpose', invert_transpose(op[1])))
+        if index in self.snapshots: return self._load(index)
+        # Recalcula a partir da cópia mais próxima antes deste ponto
+        start = max((i for i in self.snapshots if i < index), default=None)
+        image = self._load(start) if start is not None else base_image
+        return render(image, [scale_op(o, scale) for o in self.ops[start or 0:index]])
+
+    def redo(self, current_image, scale):
+        op = self.redo_ops.pop()
+        self.push(op, current_image, clear_redo=False)
+        return apply_op(current_image, scale_op(op, scale))
+
+    def _store(self, index, image):
+        data = zlib.compress(image.tobytes(), 1)
+        if len(data) > self.max_bytes: return
+        self.snapshots[index] = (image.mode, image.size, data); self.snapshot_bytes += len(data)
+        while self.snapshot_bytes > self.max_bytes: self._discard(next(iter(self.snapshots)))
+
+    def _load(self, index):
+        mode, size, data = self.snapshots[index]
+        return Image.frombytes(mode, size, zlib.decompress(data))
+
+    def _discard(self, index):
+        self.snapshot_bytes -= len(self.snapshots.pop(index)[2])
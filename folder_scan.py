@@ -0,0 +1,68 @@
+# ===================================================================
+#         VARREDURA DE PASTA EM FUNDO + OBSERVAÇÃO DE MUDANÇAS
+# ===================================================================
+# A listagem é feita com os.scandir numa thread e entregue em lotes, então
+# a interface mostra a primeira imagem antes do fim da varredura (pastas de
+# rede com 100 mil arquivos levam muito tempo para listar por inteiro).
+# Depois disso a thread fica observando a pasta: só quando o mtime do
+# diretório muda ela relista os nomes e envia apenas o que entrou ou saiu.
+import os
+import time
+import queue
+import threading
+
+SCAN_BATCH_SIZE = 256       # Arquivos por lote entregue à interface
+SCAN_BATCH_SECONDS = 0.05   # ...ou o que tiver sido achado nesse intervalo
+WATCH_INTERVAL = 2.0        # Intervalo (s) entre verificações do mtime da pasta
+
+
+def list_images(folder, extensions):
+    with os.scandir(folder) as it:
+        for entry in it:
+            try:
+                if entry.name.lower().endswith(extensions) and entry.is_file(): yield entry.path
+            except OSError: continue
+
+
+class FolderScanner:
+    # Eventos na fila `events`: ('add', [caminhos]), ('remove', [caminhos]), ('done', total) e ('error', exceção)
+    def __init__(self, folder, extensions, watch_interval=WATCH_INTERVAL):
+        self.folder, self.extensions, self.watch_interval = folder, extensions, watch_interval
+        self.events = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="PixelVista-Scan", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+            known = self._scan()
+            if known is None: return
+            self.events.put(('done', len(known)))
+        except OSError as e:
+            self.events.put(('error', e)); return
+        while not self._stop.wait(self.watch_interval):
+            try:
+                current_mtime = os.stat(self.folder).st_mtime_ns
+                if current_mtime == mtime: continue
+                mtime = current_mtime
+                found = set(list_images(self.folder, self.extensions))
+            except OSError: continue    # Pasta temporariamente inacessível (ex.: rede); tenta de novo depois
+            # Renomear aparece como uma remoção + uma adição
+            removed, added = known - found, found - known
+            if removed: self.events.put(('remove', sorted(removed)))
+            if added: self.events.put(('add', sorted(added)))
+            known = found
+
+    def _scan(self):
+        known, batch, last_flush = set(), [], time.monotonic()
+        for path in list_images(self.folder, self.extensions):
+            if self._stop.is_set(): return None
+            known.add(path); batch.append(path)
+            if len(batch) >= SCAN_BATCH_SIZE or time.monotonic() - last_flush >= SCAN_BATCH_SECONDS:
+                self.events.put(('add', batch)); batch, last_flush = [], time.monotonic()
+        if batch: self.events.put(('add', batch))
+        return known
@@ -0,0 +1,77 @@
+# ===================================================================
+#     VÁRIOS QUADROS: GIF/WEBP ANIMADOS E TIFF COM VÁRIAS PÁGINAS
+# ===================================================================
+# Os quadros são decodificados sob demanda numa thread de fundo, já na
+# escala da janela, e guardados num buffer circular pequeno à frente da
+# posição atual. A memória fica constante, não importa quantos quadros o
+# arquivo tenha; a interface nunca espera a decodificação.
+import threading
+from PIL import Image
+from image_loader import fit_size
+from orientation import read_orientation, apply_orientation, swaps_axes
+
+FRAME_BUFFER = 8            # Quadros mantidos decodificados à frente da posição atual
+DEFAULT_DURATION_MS = 100   # Mesma regra dos navegadores: duração ausente ou <= 10 ms vira 100 ms
+PAGED_FORMATS = ('TIFF', 'MPO')     # Páginas para folhear (sem reprodução automática)
+
+
+class Frame:
+    def __init__(self, image, duration, full_size):
+        self.image = image              # Já ajustado ao tamanho da janela, com a orientação EXIF aplicada
+        self.duration = duration        # ms
+        self.full_size = full_size      # Resolução real do quadro, em pixels de exibição (como em DecodedImage)
+
+
+class FrameSource:
+    def __init__(self, path, display_size, buffer_size=FRAME_BUFFER):
+        self.path, self.display_size, self.buffer_size = path, tuple(display_size), buffer_size
+        with Image.open(path) as img: self.n_frames, self.format = getattr(img, 'n_frames', 1), img.format
+        self.animated = self.format not in PAGED_FORMATS
+        self.playhead = 0
+        self.error = None
+        self._frames = {}
+        self._closed = False
+        self._cond = threading.Condition()
+        threading.Thread(target=self._run, name="PixelVista-Frames", daemon=True).start()
+
+    def seek(self, index):
+        # Move a posição atual; o buffer passa a cobrir os próximos quadros a partir dela
+        with self._cond: self.playhead = index % self.n_frames; self._cond.notify()
+
+    def get(self, index):
+        with self._cond: return self._frames.get(index)
+
+    def close(self):
+        with self._cond: self._closed = True; self._cond.notify()
+
+    def _wanted(self):
+        if self.animated: return [(self.playhead + k) % self.n_frames for k in range(min(self.buffer_size, self.n_frames))]
+        # Páginas: a anterior também fica pronta para voltar sem espera
+        return [i for i in range(self.playhead - 1, self.playhead + self.buffer_size - 1) if 0 <= i < self.n_frames]
+
+    def _run(self):
+        # Só esta thread usa o arquivo aberto (objetos Image do Pillow não são seguros entre threads)
+        try:
+            with Image.open(self.path) as img:
+                while True:
+                    with self._cond:
+                        while not self._closed and all(i in self._frames for i in self._wanted()): self._cond.wait()
+                        if self._closed: return
+                        wanted = self._wanted()
+                        for i in [i for i in self._frames if i not in wanted]: del self._frames[i]
+                        index = next(i for i in wanted if i not in self._frames)
+                    frame = self._decode(img, index)
+                    with self._cond:
+                        if index in self._wanted(): self._frames[index] = frame
+        except Exception as e: self.error = e
+
+    def _decode(self, img, index):
+        img.seek(index)
+        # A tag é lida por quadro (cada página de um MPO tem o próprio EXIF); aplicada antes do ajuste à janela, que usa o tamanho exibido
+        orientation = read_orientation(img)
+        frame = apply_orientation(img.convert('RGB') if img.mode not in ('RGB', 'RGBA') else img.copy(), orientation)
+        duration = img.info.get('duration') or 0       # No WebP só é preenchida ao carregar o quadro
+        new_w, new_h, ratio = fit_size(frame.size, self.display_size)
+        if ratio < 1: frame = frame.resize((new_w, new_h), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        full_size = (img.height, img.width) if swaps_axes(orientation) else img.size
+        return Frame(frame, duration if duration > 10 else DEFAULT_DURATION_MS, full_size)
@@ -0,0 +1,178 @@
+# ===================================================================
+#          CARREGAMENTO DE IMAGENS: CACHE LRU E PRÉ-CARREGAMENTO
+# ===================================================================
+# Módulo sem dependência de Tk: pode ser usado por threads de fundo.
+import os
+import queue
+import threading
+from collections import OrderedDict
+from PIL import Image
+from profiling import profiler
+from orientation import read_orientation, apply_orientation, swaps_axes
+
+# Bytes por pixel de cada modo (usado para estimar a memória do cache)
+_BYTES_PER_PIXEL = {'1': 1, 'L': 1, 'P': 1, 'LA': 2, 'I;16': 2, 'RGB': 3, 'YCbCr': 3, 'LAB': 3, 'HSV': 3, 'RGBA': 4, 'CMYK': 4, 'I': 4, 'F': 4}
+
+
+def image_nbytes(image):
+    if image is None: return 0
+    return image.width * image.height * _BYTES_PER_PIXEL.get(image.mode, 4)
+
+
+def fit_size(img_size, box_size):
+    img_w, img_h = img_size; box_w, box_h = box_size
+    ratio = min(box_w / img_w, box_h / img_h)
+    return max(1, int(img_w * ratio)), max(1, int(img_h * ratio)), ratio
+
+
+class DecodedImage:
+    # Imagem decodificada + metadados do arquivo original (formato, modo antes da conversão para RGB e resolução real)
+    def __init__(self, image, fmt, mode, full_size=None, n_frames=1, orientation=1):
+        self.image = image
+        self.format = fmt
+        self.mode = mode
+        self.n_frames = n_frames    # > 1 em GIF/WebP animados e TIFF com várias páginas (ver frames.py)
+        self.orientation = orientation      # Tag EXIF já aplicada em 'image' (tamanhos em pixels de exibição)
+        self.width, self.height = full_size or image.size
+        self.scale = image.width / self.width   # < 1 quando decodificada em resolução reduzida
+        self.display = None         # Versão já ajustada à janela
+        self.display_size = None    # Tamanho do canvas usado para gerar 'display'
+
+    def nbytes(self):
+        return image_nbytes(self.image) + image_nbytes(self.display)
+
+    def covers(self, display_size):
+        # A versão decodificada tem pixels suficientes para preencher a janela?
+        if self.scale >= 1: return True
+        new_w, new_h, _ = fit_size((self.width, self.height), display_size)
+        return self.image.width >= new_w and self.image.height >= new_h
+
+
+def decode_image(path, display_size=None, full=False, frame=0):
+    # Sem 'full', decodifica na menor escala que ainda cobre 'display_size':
+    # JPEG usa draft (DCT em 1/2, 1/4 ou 1/8); os demais formatos são reduzidos logo após decodificar.
+    # A orientação EXIF é aplicada no fim (na imagem já reduzida); 'target' fica em pixels gravados.
+    with Image.open(path) as img:
+        with profiler.stage('open'):
+            n_frames = getattr(img, 'n_frames', 1)
+            if frame: img.seek(frame)
+            fmt, mode, full_size = img.format, img.mode, img.size
+            orientation = read_orientation(img)
+            box = (display_size[1], display_size[0]) if display_size and swaps_axes(orientation) else display_size
+            target = fit_size(full_size, box)[:2] if display_size and not full else None
+            if target and fmt == 'JPEG': img.draft('RGB', target)
+        with profiler.stage('decode'): img.load()
+        with profiler.stage('convert_rgb'): image = img if img.mode in ('RGB', 'RGBA') else img.convert('RGB')
+    if target:
+        factor = min(image.width // target[0], image.height // target[1])
+        if factor >= 2:
+            with profiler.stage('reduce'): image = image.reduce(factor)
+    if orientation != 1:
+        with profiler.stage('orientation'): image = apply_orientation(image, orientation)
+        if swaps_axes(orientation): full_size = (full_size[1], full_size[0])
+    decoded = DecodedImage(image, fmt, mode, full_size, n_frames, orientation)
+    if display_size:
+        new_w, new_h, _ = fit_size(image.size, display_size)
+        with profiler.stage('display_resize'): decoded.display = image.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        decoded.display_size = tuple(display_size)
+    return decoded
+
+
+def file_key(path):
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+class ImageCache:
+    # Cache LRU limitado por memória, chaveado por caminho + mtime (+ tamanho)
+    def __init__(self, max_mb=512):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.current_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, path):
+        try: return file_key(path)
+        except OSError: return None
+
+    def get(self, path):
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None: self.misses += 1; return None
+            self._entries.move_to_end(key); self.hits += 1
+            return entry
+
+    def contains(self, path):
+        key = self._key(path)
+        with self._lock: return key in self._entries
+
+    def put(self, path, entry):
+        key = self._key(path)
+        if key is None: return
+        size = entry.nbytes()
+        if size > self.max_bytes: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self.current_bytes -= old.nbytes()
+            # Remove versões antigas do mesmo arquivo (mtime diferente)
+            for stale in [k for k in self._entries if k[0] == path]:
+                self.current_bytes -= self._entries.pop(stale).nbytes()
+            self._entries[key] = entry; self.current_bytes += size
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes(); self.evictions += 1
+
+    def set_display(self, entry, display, display_size):
+        # Troca a versão ajustada à janela de uma entrada, mantendo a contagem de memória
+        with self._lock:
+            cached = any(e is entry for e in self._entries.values())
+            if cached: self.current_bytes -= image_nbytes(entry.display)
+            entry.display, entry.display_size = display, tuple(display_size)
+            if cached: self.current_bytes += image_nbytes(display)
+
+    def clear(self):
+        with self._lock: self._entries.clear(); self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'mb': self.current_bytes / (1024 * 1024), 'max_mb': self.max_bytes / (1024 * 1024)}
+
+
+class Prefetcher:
+    # Thread de fundo que decodifica os próximos arquivos na direção da navegação
+    def __init__(self, cache):
+        self.cache = cache
+        self._pending = queue.Queue()
+        self._generation = 0
+        self._queued = set()        # Caminhos da geração atual ainda na fila
+        self._current = None        # Caminho sendo decodificado agora
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name="PixelVista-Prefetch", daemon=True)
+        self._thread.start()
+
+    def schedule(self, paths, display_size):
+        # Uma nova navegação invalida o que ainda estava pendente
+        with self._lock:
+            self._generation += 1; generation = self._generation
+            self._queued = set(paths)
+        for path in paths: self._pending.put((generation, path, display_size))
+
+    def wait(self, path):
+        # Se 'path' já está sendo (ou vai ser) decodificado aqui, espera o resultado em vez de decodificar de novo
+        with self._idle: self._idle.wait_for(lambda: path != self._current and path not in self._queued)
+
+    def _run(self):
+        while True:
+            generation, path, display_size = self._pending.get()
+            with self._lock:
+                if generation != self._generation: continue
+                self._queued.discard(path); self._current = path
+            try:
+                if not self.cache.contains(path): self.cache.put(path, decode_image(path, display_size))
+            except Exception: pass  # Arquivos inválidos são tratados quando o usuário chega neles
+            finally:
+                with self._idle: self._current = None; self._idle.notify_all()
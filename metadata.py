@@ -0,0 +1,166 @@
+# ===================================================================
+#        METADADOS SÓ PELO CABEÇALHO + ÍNDICE POR PASTA (SQLITE)
+# ===================================================================
+# Image.open só lê o cabeçalho; os pixels nunca são decodificados aqui.
+# Cada pasta tem um índice SQLite na pasta de cache do usuário, atualizado
+# apenas para os arquivos cujo tamanho/mtime mudou desde a última leitura.
+import os
+import time
+import queue
+import sqlite3
+import threading
+from PIL import Image
+from storage import folder_cache_path
+from pyramid import open_large
+from orientation import read_orientation
+
+TAG_ORIENTATION, TAG_DATETIME, TAG_MAKE, TAG_MODEL = 274, 306, 271, 272
+TAG_EXIF_IFD, TAG_DATETIME_ORIGINAL = 0x8769, 36867
+
+SORT_KEYS = ('name', 'date', 'dimensions', 'filesize', 'format')
+COLUMNS = ('name', 'size', 'mtime_ns', 'width', 'height', 'format', 'mode', 'taken', 'camera', 'orientation')
+
+
+def _exif_text(value):
+    if isinstance(value, bytes): value = value.decode('latin-1', 'replace')
+    return value.strip('\x00 ') or None if isinstance(value, str) else None
+
+
+def read_metadata(path):
+    st = os.stat(path)
+    # Sem o limite de "decompression bomb": é o tamanho lido aqui que manda as imagens gigantes para o modo de blocos
+    with open_large(path) as img:
+        # No PNG o getexif() decodifica a imagem inteira quando o EXIF não veio antes dos pixels: nesse caso fica sem EXIF
+        exif = img.getexif() if img.format != 'PNG' or 'exif' in img.info else Image.Exif()
+        taken = _exif_text(exif.get_ifd(TAG_EXIF_IFD).get(TAG_DATETIME_ORIGINAL)) or _exif_text(exif.get(TAG_DATETIME))
+        camera = " ".join(filter(None, (_exif_text(exif.get(TAG_MAKE)), _exif_text(exif.get(TAG_MODEL))))) or None
+        return {'name': os.path.basename(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'width': img.width, 'height': img.height,
+                'format': img.format, 'mode': img.mode, 'taken': taken, 'camera': camera, 'orientation': read_orientation(img)}
+
+
+def display_size(meta):
+    # Orientações EXIF 5..8 giram a imagem em 90°: largura e altura se invertem na exibição
+    return (meta['height'], meta['width']) if meta.get('orientation') in (5, 6, 7, 8) else (meta['width'], meta['height'])
+
+
+def capture_date(meta):
+    # Sem data EXIF, usa o mtime do arquivo no mesmo formato ("AAAA:MM:DD HH:MM:SS") para ordenar junto
+    return meta['taken'] or time.strftime('%Y:%m:%d %H:%M:%S', time.localtime(meta['mtime_ns'] / 1e9))
+
+
+class MetadataIndex:
+    def __init__(self, folder, db_path=None):
+        self.folder = os.path.abspath(folder)
+        db_path = db_path or folder_cache_path('metadata', self.folder)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, width INTEGER, height INTEGER, "
+                           "format TEXT, mode TEXT, taken TEXT, camera TEXT, orientation INTEGER)")
+        self._rows = {row[0]: dict(zip(COLUMNS, row)) for row in self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM files")}
+
+    def get(self, path):
+        return self._rows.get(os.path.basename(path))
+
+    def lookup(self, path):
+        # Usa o índice se ainda estiver válido; senão lê o cabeçalho (e atualiza o índice)
+        meta = self.get(path)
+        try:
+            st = os.stat(path)
+            if meta and (meta['size'], meta['mtime_ns']) == (st.st_size, st.st_mtime_ns): return meta
+            meta = read_metadata(path)
+        except (OSError, SyntaxError, ValueError): return meta
+        self._store([meta])
+        return meta
+
+    def refresh(self, paths, cancel_event=None):
+        # Relê só os arquivos novos ou alterados (tamanho/mtime diferentes do índice)
+        changed = []
+        for path in paths:
+            if cancel_event is not None and cancel_event.is_set(): return len(changed)
+            name = os.path.basename(path)
+            try:
+                st = os.stat(path)
+                meta = self._rows.get(name)
+                if meta and (meta['size'], meta['mtime_ns']) == (st.st_size, st.st_mtime_ns): continue
+                changed.append(read_metadata(path))
+            except (OSError, SyntaxError, ValueError): continue
+            if len(changed) % 500 == 0: self._store(changed[-500:])
+        self._store(changed[len(changed) - len(changed) % 500:])
+        return len(changed)
+
+    def prune(self, existing_paths):
+        names = {os.path.basename(p) for p in existing_paths}
+        with self._lock:
+            gone = [n for n in self._rows if n not in names]
+            if not gone or self._conn is None: return
+            self._conn.executemany("DELETE FROM files WHERE name = ?", [(n,) for n in gone])
+            self._conn.commit()
+            for n in gone: self._rows.pop(n, None)
+
+    def _store(self, metas):
+        if not metas: return
+        with self._lock:
+            if self._conn is None: return
+            self._conn.executemany(f"INSERT OR REPLACE INTO files VALUES ({', '.join('?' * len(COLUMNS))})", [tuple(m[c] for c in COLUMNS) for m in metas])
+            self._conn.commit()
+            for m in metas: self._rows[m['name']] = m
+
+    def close(self):
+        # Depois de fechado, o que já está em memória continua legível, mas nada mais é gravado
+        # (uma atualização do indexador ainda em andamento termina sem erro)
+        with self._lock:
+            if self._conn is not None: self._conn.close(); self._conn = None
+
+    def sort_paths(self, paths, key='name', reverse=False):
+        # Arquivos ainda não indexados vão para o fim, em ordem de nome
+        rows = self._rows
+        if key == 'name': return sorted(paths, reverse=reverse)
+        value = {'date': capture_date, 'dimensions': lambda m: m['width'] * m['height'],
+                 'filesize': lambda m: m['size'], 'format': lambda m: m['format'] or ''}[key]
+        indexed, missing = [], []
+        for path in paths:
+            meta = rows.get(os.path.basename(path))
+            if meta: indexed.append((value(meta), path))
+            else: missing.append(path)
+        indexed.sort(reverse=reverse)
+        return [path for _, path in indexed] + sorted(missing)
+
+    def filter_paths(self, paths, fmt=None, orientation=None):
+        # orientation: 'landscape' | 'portrait' | None; arquivos ainda não indexados são mantidos
+        if not fmt and not orientation: return list(paths)
+        rows, result = self._rows, []
+        for path in paths:
+            meta = rows.get(os.path.basename(path))
+            if meta:
+                if fmt and meta['format'] != fmt: continue
+                if orientation:
+                    w, h = display_size(meta)
+                    if (orientation == 'landscape') != (w >= h): continue
+            result.append(path)
+        return result
+
+
+class MetadataIndexer:
+    # Uma thread de fundo que atualiza o índice; cada pedido concluído gera ('indexed', quantidade relida) em `results`
+    def __init__(self, index):
+        self.index = index
+        self.results = queue.Queue()
+        self._requests = queue.Queue()
+        self._cancel = threading.Event()
+        threading.Thread(target=self._run, name="PixelVista-Metadata", daemon=True).start()
+
+    def request(self, paths, prune=False):
+        self._requests.put((list(paths), prune))
+
+    def stop(self):
+        self._cancel.set(); self._requests.put(None)
+
+    def _run(self):
+        while True:
+            job = self._requests.get()
+            if job is None or self._cancel.is_set(): return
+            paths, prune = job
+            count = self.index.refresh(paths, self._cancel)
+            if prune and not self._cancel.is_set(): self.index.prune(paths)
+            self.results.put(('indexed', count))
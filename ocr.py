@@ -0,0 +1,263 @@
+# ===================================================================
+#        OCR EM FUNDO: PRÉ-PROCESSAMENTO, CACHE E ÍNDICE DA PASTA
+# ===================================================================
+# O Tesseract roda como processo externo, então um pool de threads basta
+# para paralelizar (as threads só esperam o subprocesso). Os resultados
+# ficam num cache SQLite chaveado pelo hash do conteúdo + parâmetros, e o
+# modo "pasta inteira" grava o texto num índice pesquisável por pasta.
+# O pytesseract só é importado (e o Tesseract localizado) no primeiro uso,
+# para não atrasar a abertura do programa.
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image, ImageOps
+from storage import user_cache_dir, folder_cache_path
+
+pytesseract = None      # Módulo carregado por load_tesseract()
+_base_path = None       # Pasta onde procurar o Tesseract portátil (definida na abertura, usada no primeiro OCR)
+
+DEFAULT_LANG = 'por'
+TARGET_DPI = 300        # Resolução em que o Tesseract tem melhor precisão
+MAX_SIDE = 5000         # Lados maiores que isso são reduzidos antes do OCR
+
+
+def set_base_path(base_path):
+    global _base_path
+    _base_path = base_path
+
+
+def load_tesseract():
+    # Importa o pytesseract e configura o executável na primeira chamada; False se não estiver instalado
+    global pytesseract
+    if pytesseract is None:
+        try: import pytesseract as module
+        except ImportError: return False
+        pytesseract = module
+        if _base_path: configure_tesseract(_base_path)
+    return True
+
+
+def configure_tesseract(base_path):
+    # Usa o Tesseract portátil (pasta 'Tesseract-OCR' junto do projeto/exe) ou a instalação padrão do Windows
+    try:
+        # Define o caminho para a pasta do Tesseract dentro do projeto/exe
+        tesseract_folder = os.path.join(base_path, 'Tesseract-OCR')
+        tesseract_exe = os.path.join(tesseract_folder, 'tesseract.exe')
+
+        # Verifica se o executável existe no local esperado
+        if os.path.exists(tesseract_exe):
+            pytesseract.pytesseract.tesseract_cmd = tesseract_exe
+            # Configura onde estão os dados de linguagem (pasta tessdata)
+            # Isso é CRUCIAL para funcionar portatilmente
+            tessdata_dir = os.path.join(tesseract_folder, 'tessdata')
+            os.environ['TESSDATA_PREFIX'] = tessdata_dir
+        else:
+            # Fallback: tenta procurar na instalação padrão do Windows se não achar a portátil
+            # Isso é útil se você esquecer de copiar a pasta antes de rodar o script py
+            default_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+            if os.path.exists(default_path):
+                pytesseract.pytesseract.tesseract_cmd = default_path
+    except Exception as e:
+        print(f"Erro ao configurar OCR: {e}")
+
+
+class OcrOptions:
+    def __init__(self, lang=DEFAULT_LANG, grayscale=True, binarize=False, target_dpi=TARGET_DPI, max_side=MAX_SIDE):
+        self.lang = lang
+        self.grayscale = grayscale
+        self.binarize = binarize
+        self.target_dpi = target_dpi
+        self.max_side = max_side
+
+    def signature(self):
+        # Parâmetros que mudam o texto reconhecido (fazem parte da chave do cache)
+        return f"{self.lang}|g{int(self.grayscale)}|b{int(self.binarize)}|{self.target_dpi}|{self.max_side}"
+
+
+# --- Pré-processamento ---
+def otsu_threshold(histogram):
+    # Limiar de Otsu a partir do histograma de 256 tons (maximiza a variância entre as duas classes)
+    total = sum(histogram); sum_all = sum(i * h for i, h in enumerate(histogram))
+    weight_bg = sum_bg = 0; best, threshold = -1.0, 127
+    for i, h in enumerate(histogram):
+        weight_bg += h
+        if weight_bg == 0: continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0: break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg; mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best: best, threshold = between, i
+    return threshold
+
+
+def preprocess(image, options):
+    # Retorna (imagem preparada, dpi informado ao Tesseract)
+    dpi = image.info.get('dpi', (0, 0))[0] or None
+    scale = 1.0
+    if options.target_dpi and dpi and abs(dpi - options.target_dpi) > dpi * 0.1: scale = min(4.0, max(0.25, options.target_dpi / dpi))
+    if options.max_side and max(image.size) * scale > options.max_side: scale = options.max_side / max(image.size)
+    if options.grayscale or options.binarize: image = ImageOps.grayscale(image) if image.mode != 'L' else image
+    if scale != 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.Resampling.BILINEAR if scale < 1 else Image.Resampling.BICUBIC)
+        dpi = dpi * scale if dpi else None
+    if options.binarize:
+        threshold = otsu_threshold(image.histogram())
+        image = image.point([255 if i > threshold else 0 for i in range(256)], '1')
+    return image, round(dpi) if dpi else None
+
+
+def image_hash(image):
+    digest = hashlib.sha1(f"{image.mode}|{image.width}x{image.height}|".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+
+_languages = None
+
+
+def resolve_lang(lang):
+    # Consulta os idiomas instalados uma única vez, em vez de tentar rodar o OCR de novo quando o idioma falta
+    global _languages
+    if _languages is None:
+        try: _languages = set(pytesseract.get_languages(config=''))
+        except Exception: _languages = set()
+    if not _languages or all(part in _languages for part in lang.split('+')): return lang
+    return None     # Idioma padrão do Tesseract
+
+
+def recognize(image, options):
+    prepared, dpi = preprocess(image, options)
+    config = f"--dpi {dpi}" if dpi else ''
+    lang = resolve_lang(options.lang)
+    try: return pytesseract.image_to_string(prepared, lang=lang, config=config)
+    except pytesseract.TesseractError:
+        if lang is None: raise
+        return pytesseract.image_to_string(prepared, config=config)
+
+
+# --- Cache de resultados (hash do conteúdo + parâmetros) ---
+class OcrCache:
+    def __init__(self, db_path=None):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path or os.path.join(user_cache_dir(), 'ocr.sqlite'), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, text TEXT, created REAL)")
+
+    def get(self, content_hash, options):
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM results WHERE key = ?", (f"{content_hash}|{options.signature()}",)).fetchone()
+        return row[0] if row else None
+
+    def put(self, content_hash, options, text):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (f"{content_hash}|{options.signature()}", text, time.time()))
+            self._conn.commit()
+
+
+# --- Índice pesquisável da pasta ---
+class OcrIndex:
+    # FTS5 quando o SQLite foi compilado com ele; senão uma tabela comum pesquisada com LIKE
+    def __init__(self, folder, db_path=None):
+        self.folder = os.path.abspath(folder)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path or folder_cache_path('ocr', self.folder), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, options TEXT)")
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS texts USING fts5(name UNINDEXED, text)")
+            self.fulltext = True
+        except sqlite3.OperationalError:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS texts (name TEXT PRIMARY KEY, text TEXT)")
+            self.fulltext = False
+        self._conn.commit()
+
+    def is_current(self, path, options):
+        st = os.stat(path)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, options FROM files WHERE name = ?", (os.path.basename(path),)).fetchone()
+        return row == (st.st_size, st.st_mtime_ns, options.signature())
+
+    def put(self, path, options, text):
+        st = os.stat(path); name = os.path.basename(path)
+        with self._lock:
+            self._conn.execute("DELETE FROM texts WHERE name = ?", (name,))
+            self._conn.execute("INSERT INTO texts (name, text) VALUES (?, ?)", (name, text))
+            self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (name, st.st_size, st.st_mtime_ns, options.signature()))
+            self._conn.commit()
+
+    def count(self):
+        with self._lock: return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def search(self, query, limit=500):
+        # Retorna [(caminho, trecho)] dos arquivos cujo texto contém a consulta
+        query = query.strip()
+        if not query: return []
+        with self._lock:
+            if self.fulltext:
+                # Cada palavra vira um termo entre aspas (prefixo): evita erro de sintaxe do FTS com pontuação
+                match = " ".join('"' + word.replace('"', '""') + '"*' for word in query.split())
+                rows = self._conn.execute("SELECT name, snippet(texts, 1, '[', ']', '...', 12) FROM texts WHERE texts MATCH ? ORDER BY rank LIMIT ?", (match, limit)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT name, substr(text, max(1, instr(lower(text), lower(?)) - 40), 120) FROM texts WHERE text LIKE ? LIMIT ?",
+                                          (query, f"%{query}%", limit)).fetchall()
+        return [(os.path.join(self.folder, name), " ".join(snippet.split())) for name, snippet in rows]
+
+
+# --- Execução ---
+class OcrEngine:
+    def __init__(self, workers=None, cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache or OcrCache()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="PixelVista-OCR")
+        # Vários Tesseracts em paralelo: cada um usa uma única thread do OpenMP em vez de disputar todos os núcleos
+        if self.workers > 1: os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+    def submit_image(self, image, options):
+        # OCR de uma imagem em memória (ex.: a imagem editada); retorna um Future com o texto
+        return self._executor.submit(self._recognize_image, image, options)
+
+    def _recognize_image(self, image, options):
+        content_hash = image_hash(image)
+        text = self.cache.get(content_hash, options)
+        if text is None:
+            text = recognize(image, options); self.cache.put(content_hash, options, text)
+        return text
+
+    def _recognize_file(self, path, options):
+        content_hash = file_hash(path)
+        text = self.cache.get(content_hash, options)
+        if text is None:
+            with Image.open(path) as img: text = recognize(img, options)
+            self.cache.put(content_hash, options, text)
+        return text
+
+    def run_folder(self, paths, options, index, cancel_event=None):
+        # Gera (caminho, texto, erro, já indexado?) conforme terminam; no máximo workers*2 arquivos pendentes
+        paths = iter(paths); pending = {}
+        while True:
+            while len(pending) < self.workers * 2 and not (cancel_event and cancel_event.is_set()):
+                path = next(paths, None)
+                if path is None: break
+                try: current = index.is_current(path, options)
+                except OSError as e: yield path, None, str(e), False; continue
+                if current: yield path, None, None, True; continue
+                pending[self._executor.submit(self._recognize_file, path, options)] = path
+            if not pending: break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try: text = future.result(); index.put(path, options, text); yield path, text, None, False
+                except Exception as e: yield path, None, str(e), False
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,121 @@
+# ===================================================================
+#        ORIENTAÇÃO EXIF: LEITURA, EXIBIÇÃO E GRAVAÇÃO SEM RECOMPRESSÃO
+# ===================================================================
+# Câmeras gravam os pixels sempre "deitados" e indicam na tag 274 do EXIF
+# como a imagem deve ser girada para exibição. Os valores 1..8 equivalem
+# aos 8 elementos (inversão, k rotações de 90° anti-horárias) usados pela
+# pilha de edições (ver edits.py), então girar/inverter um JPEG pode ser
+# salvo trocando só os 2 bytes da tag, sem decodificar nem recomprimir.
+import os
+import struct
+import shutil
+import tempfile
+import PIL
+from PIL import Image
+
+TAG_ORIENTATION = 274
+
+# Valor da tag -> elemento (inversão horizontal, k rotações de 90° anti-horárias) aplicado aos pixels gravados
+ORIENTATION_ELEMENTS = {1: (0, 0), 2: (1, 0), 3: (0, 2), 4: (1, 2), 5: (1, 1), 6: (0, 3), 7: (1, 3), 8: (0, 1)}
+_ELEMENT_ORIENTATIONS = {element: value for value, element in ORIENTATION_ELEMENTS.items()}
+_METHODS = {2: Image.Transpose.FLIP_LEFT_RIGHT, 3: Image.Transpose.ROTATE_180, 4: Image.Transpose.FLIP_TOP_BOTTOM,
+            5: Image.Transpose.TRANSPOSE, 6: Image.Transpose.ROTATE_270, 7: Image.Transpose.TRANSVERSE, 8: Image.Transpose.ROTATE_90}
+# Desde o Pillow 10.1 o TIFF é desvirado pelo próprio Pillow ao carregar (e, a partir do 11, já abre com o tamanho trocado)
+PILLOW_ORIENTS_TIFF = tuple(int(part) for part in PIL.__version__.split('.')[:2]) >= (10, 1)
+
+
+def orientation_for_element(element):
+    return _ELEMENT_ORIENTATIONS[tuple(element)]
+
+
+def swaps_axes(orientation):
+    return orientation in (5, 6, 7, 8)
+
+
+def stored_orientation(img):
+    # Valor da tag gravada no arquivo (1 se ausente ou inválido) de uma imagem aberta, sem decodificar os pixels
+    # (no PNG o getexif() decodifica a imagem inteira quando o EXIF vem depois dos pixels: nesse caso é ignorado)
+    if img.format == 'PNG' and 'exif' not in img.info: return 1
+    try: value = img.getexif().get(TAG_ORIENTATION)
+    except Exception: return 1
+    return value if value in ORIENTATION_ELEMENTS else 1
+
+
+def read_orientation(img):
+    # Orientação que ainda falta aplicar aos pixels carregados: no TIFF o Pillow já aplica a tag sozinho
+    if PILLOW_ORIENTS_TIFF and img.format == 'TIFF': return 1
+    return stored_orientation(img)
+
+
+def apply_orientation(image, orientation):
+    method = _METHODS.get(orientation)
+    return image.transpose(method) if method is not None else image
+
+
+# --- Gravação da tag em JPEG ---
+def _segments(f):
+    # Gera (marcador, início do segmento, tamanho total) dos cabeçalhos, até o início dos dados comprimidos (SOS)
+    f.seek(0)
+    if f.read(2) != b'\xff\xd8': raise ValueError("o arquivo não é um JPEG")
+    while True:
+        start = f.tell()
+        header = f.read(4)
+        if len(header) < 4 or header[0] != 0xFF: raise ValueError("cabeçalho JPEG inválido")
+        if header[1] in (0xD9, 0xDA): return
+        length = struct.unpack('>H', header[2:])[0]
+        yield header[1], start, length + 2
+        f.seek(start + length + 2)
+
+
+def _exif_orientation_offset(f):
+    # Posição (no arquivo) do valor da tag de orientação no IFD0 + ordem dos bytes, ou None se a tag não existir
+    for marker, start, size in _segments(f):
+        if marker != 0xE1: continue
+        f.seek(start + 4); data = f.read(size - 4)
+        if data[:6] != b'Exif\x00\x00': continue
+        order = '<' if data[6:8] == b'II' else '>'
+        ifd0 = 6 + struct.unpack(order + 'I', data[10:14])[0]
+        (count,) = struct.unpack(order + 'H', data[ifd0:ifd0 + 2])
+        for i in range(count):
+            entry = ifd0 + 2 + i * 12
+            tag, kind, n = struct.unpack(order + 'HHI', data[entry:entry + 8])
+            if tag == TAG_ORIENTATION and kind == 3 and n == 1: return start + 4 + entry + 8, order    # SHORT: valor dentro da entrada
+        return None
+    return None
+
+
+def write_jpeg_orientation(path, orientation):
+    # Com a tag presente (o caso das câmeras), troca 2 bytes no próprio arquivo. Sem ela, o arquivo é
+    # reescrito com o bloco EXIF atualizado, mas os dados comprimidos são copiados como estão.
+    with open(path, 'r+b') as f:
+        found = _exif_orientation_offset(f)
+        if found:
+            offset, order = found
+            f.seek(offset); f.write(struct.pack(order + 'H', orientation)); return
+    with Image.open(path) as img: exif = img.getexif()
+    exif[TAG_ORIENTATION] = orientation
+    payload = exif.tobytes()
+    if len(payload) > 65533: raise ValueError("bloco EXIF grande demais")
+    segment = b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+            segments = list(_segments(src))
+            position = 2
+            dst.write(b'\xff\xd8')
+            if segments and segments[0][0] == 0xE0:      # JFIF (APP0) continua logo após o início do arquivo
+                src.seek(segments[0][1]); dst.write(src.read(segments[0][2])); position = segments[0][1] + segments[0][2]
+            dst.write(segment)
+            for marker, start, size in segments:
+                if start < position: continue
+                src.seek(start); data = src.read(size)
+                if marker == 0xE1 and data[4:10] == b'Exif\x00\x00': continue     # EXIF antigo (substituído)
+                dst.write(data)
+            src.seek(segments[-1][1] + segments[-1][2] if segments else 2)
+            shutil.copyfileobj(src, dst, 1 << 20)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
@@ -0,0 +1,349 @@
+# ===================================================================
+#          PIPELINE DE PADRONIZAÇÃO (SEM TK: GUI E LINHA DE COMANDO)
+# ===================================================================
+# Uso sem interface gráfica (ex.: servidor de build):
+#   python visualizador.py batch FOTOS/ --size 900x900 --workers 16
+#   python pipeline.py batch "fotos/**/*.jpg" --recursive --output saida/ --format jpeg --quality 90
+#   python visualizador.py orient FOTOS/ --recursive      (aplica a orientação EXIF nos pixels)
+import io
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image, JpegImagePlugin
+from orientation import read_orientation, stored_orientation, apply_orientation, swaps_axes, TAG_ORIENTATION
+
+IMAGE_EXTENSIONS = ('.jpg','.jpeg','.png','.gif','.bmp','.tiff','.tif','.webp')
+OUTPUT_DIR_NAME = "Padronizadas"
+MANIFEST_NAME = ".pixelvista-manifest.json"
+MANIFEST_FLUSH_RECORDS = 100      # O manifesto é gravado a cada N registros novos...
+MANIFEST_FLUSH_SECONDS = 30.0     # ...ou a cada tantos segundos, para uma interrupção não perder o lote inteiro
+# Tags do TIFF que descrevem o layout dos pixels (tamanho, compressão, faixas/blocos): recalculadas pelo Pillow ao gravar
+TIFF_LAYOUT_TAGS = (256, 257, 258, 259, 262, 273, 277, 278, 279, 284, 317, 322, 323, 324, 325, 338, 339)
+# Formato de saída -> (formato do Pillow, extensão). 'keep' mantém o arquivo com o mesmo nome/formato de origem.
+OUTPUT_FORMATS = {'keep': (None, None), 'jpeg': ('JPEG', '.jpg'), 'png': ('PNG', '.png'), 'webp': ('WEBP', '.webp'), 'bmp': ('BMP', '.bmp')}
+
+
+class StandardizeOptions:
+    def __init__(self, target_w, target_h, pad_color=(255, 255, 255), output_format='keep', quality=None):
+        self.target_w, self.target_h = target_w, target_h
+        self.pad_color = tuple(pad_color)
+        self.output_format = output_format
+        self.quality = quality
+
+    def signature(self):
+        # Parâmetros que influenciam a saída (gravados no manifesto do modo incremental; 'exif_orientation' invalida as saídas
+        # geradas antes de a tag de orientação ser aplicada)
+        return {'size': [self.target_w, self.target_h], 'pad_color': list(self.pad_color), 'format': self.output_format, 'quality': self.quality,
+                'exif_orientation': True}
+
+
+def parse_size(text):
+    target_w, target_h = map(int, text.lower().split('x'))
+    if target_w < 1 or target_h < 1: raise ValueError(text)
+    return target_w, target_h
+
+
+def parse_color(text):
+    text = text.strip().lstrip('#')
+    if ',' in text: return tuple(int(c) for c in text.split(','))
+    return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+
+
+# --- Redimensionar + bordas ---
+def standardize_image(img, target_w, target_h, pad_color=(255, 255, 255)):
+    if img.mode != 'RGB': img = img.convert('RGB')
+    ratio = min(target_w/img.width, target_h/img.height)
+    new_size = (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+    resized_img = img.resize(new_size, Image.Resampling.LANCZOS)
+    final_img = Image.new("RGB", (target_w, target_h), pad_color)
+    paste_x = (target_w - new_size[0]) // 2; paste_y = (target_h - new_size[1]) // 2
+    final_img.paste(resized_img, (paste_x, paste_y))
+    return final_img
+
+
+def output_path_for(src_path, root, output_dir, options):
+    rel_path = os.path.relpath(src_path, root) if root else os.path.basename(src_path)
+    pil_format, extension = OUTPUT_FORMATS[options.output_format]
+    if extension: rel_path = os.path.splitext(rel_path)[0] + extension
+    return os.path.join(output_dir, rel_path)
+
+
+def standardize_file(src_path, dst_path, options, with_hash=False, known_hash=None):
+    # Executado nos processos do pool: precisa ser uma função de módulo (picklable)
+    st = os.stat(src_path)
+    result = {'src': src_path, 'dst': dst_path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'bytes_in': st.st_size, 'skipped': False}
+    if with_hash:
+        with open(src_path, 'rb') as f: data = f.read()
+        result['hash'] = hashlib.sha1(data).hexdigest()
+        # Só o mtime mudou (arquivo copiado/tocado): o conteúdo é o mesmo, a saída atual continua válida
+        if result['hash'] == known_hash and os.path.exists(dst_path):
+            return dict(result, bytes_out=os.path.getsize(dst_path), skipped=True)
+        source = io.BytesIO(data)
+    else: source = src_path
+    with Image.open(source) as img:
+        # A foto é padronizada como o visualizador a exibe: com a tag de orientação EXIF aplicada aos pixels
+        orientation = read_orientation(img)
+        width, height = (img.height, img.width) if swaps_axes(orientation) else img.size
+        ratio = min(options.target_w/width, options.target_h/height)
+        if img.format == 'JPEG': img.draft('RGB', (max(1, int(img.width * ratio)), max(1, int(img.height * ratio))))
+        final_img = standardize_image(apply_orientation(img, orientation), options.target_w, options.target_h, options.pad_color)
+    os.makedirs(os.path.dirname(dst_path) or '.', exist_ok=True)
+    save_kwargs = {}
+    if options.quality: save_kwargs['quality'] = options.quality
+    final_img.save(dst_path, OUTPUT_FORMATS[options.output_format][0], **save_kwargs)
+    return dict(result, bytes_out=os.path.getsize(dst_path))
+
+
+# --- Normalizar a orientação (tag EXIF -> pixels) ---
+def normalize_orientation_file(src_path):
+    # Grava os pixels já girados e a tag como 1, para programas que ignoram o EXIF. O JPEG precisa ser
+    # recomprimido, mas com as mesmas tabelas de quantização e subamostragem da origem; EXIF e perfil ICC são mantidos.
+    st = os.stat(src_path)
+    result = {'src': src_path, 'dst': src_path, 'bytes_in': st.st_size, 'skipped': False}
+    with Image.open(src_path) as img:
+        if stored_orientation(img) == 1: return dict(result, bytes_out=st.st_size, skipped=True)
+        # Regravar só o primeiro quadro apagaria as demais páginas: o arquivo fica intacto e volta como falha
+        if getattr(img, 'n_frames', 1) > 1: raise ValueError(f"arquivo com {img.n_frames} quadros/páginas não é normalizado")
+        fmt = img.format
+        save_kwargs = {'icc_profile': img.info.get('icc_profile')} if img.info.get('icc_profile') else {}
+        if fmt == 'JPEG': save_kwargs.update(qtables=img.quantization, subsampling=JpegImagePlugin.get_sampling(img))
+        if fmt == 'TIFF' and img.info.get('compression') not in (None, 'raw'): save_kwargs['compression'] = img.info['compression']
+        # TIFF: o Pillow já desvira os pixels ao carregar (lendo a tag do EXIF em cache, que só depois é zerada)
+        image = apply_orientation(img, read_orientation(img))
+        if image is img: image = img.copy()
+        exif = img.getexif(); exif[TAG_ORIENTATION] = 1
+        # No TIFF o "EXIF" é o próprio IFD da imagem: as tags de layout descrevem os pixels antigos e sobreporiam as novas
+        if fmt == 'TIFF':
+            for tag in TIFF_LAYOUT_TAGS: exif.pop(tag, None)
+        if fmt in ('JPEG', 'PNG', 'WEBP', 'TIFF'): save_kwargs['exif'] = exif.tobytes()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(src_path)), suffix='.tmp'); os.close(fd)
+    try: image.save(tmp_path, fmt, **save_kwargs); os.replace(tmp_path, src_path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    return dict(result, bytes_out=os.path.getsize(src_path))
+
+
+# --- Descoberta de arquivos (em fluxo, sem listar tudo antes) ---
+def iter_image_files(inputs, recursive=False, exclude_dirs=()):
+    # Gera (caminho, raiz) à medida que os arquivos são encontrados
+    excluded = {os.path.normcase(os.path.abspath(d)) for d in exclude_dirs}
+    for item in inputs:
+        if os.path.isdir(item):
+            pending = [item]
+            while pending:
+                current = pending.pop()
+                try: entries = os.scandir(current)
+                except OSError: continue
+                with entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and os.path.normcase(os.path.abspath(entry.path)) not in excluded: pending.append(entry.path)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS): yield entry.path, item
+        else:
+            root = glob_root(item)
+            for path in glob.iglob(item, recursive=recursive):
+                if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path): yield path, root
+
+
+def glob_root(pattern):
+    # Parte fixa do padrão (antes do primeiro curinga), usada para preservar subpastas na saída
+    parts = []
+    for part in pattern.replace('\\', '/').split('/'):
+        if glob.has_magic(part): break
+        parts.append(part)
+    root = '/'.join(parts)
+    return root if os.path.isdir(root) else os.path.dirname(root)
+
+
+# --- Execução paralela ---
+def run_batch(jobs, workers=None, cancel_event=None, task=standardize_file):
+    # 'jobs' é um iterável de argumentos de 'task' (a origem primeiro); os resultados são gerados conforme terminam.
+    # No máximo workers*4 trabalhos ficam pendentes, então a lista de arquivos nunca é materializada inteira.
+    workers = workers or os.cpu_count() or 1
+    jobs = iter(jobs); pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < workers * 4 and not (cancel_event and cancel_event.is_set()):
+                job = next(jobs, None)
+                if job is None: break
+                pending[executor.submit(task, *job)] = job[0]
+            if not pending: break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                src_path = pending.pop(future)
+                try: yield dict(future.result(), ok=True)
+                except Exception as e: yield {'src': src_path, 'ok': False, 'error': str(e), 'bytes_in': 0, 'bytes_out': 0}
+
+
+# --- Modo incremental ---
+class Manifest:
+    # Registro (na pasta de saída) de cada origem processada: tamanho, mtime, hash, parâmetros e saída
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        self.unsaved, self.saved_at = 0, time.monotonic()
+        try:
+            with open(self.path, encoding='utf-8') as f: self.entries = json.load(f).get('entries', {})
+        except (OSError, ValueError): pass
+
+    def check(self, src_path, dst_path, signature):
+        # Retorna (saída está em dia?, hash conhecido do conteúdo anterior)
+        entry = self.entries.get(os.path.abspath(src_path))
+        if not entry or entry['params'] != signature or entry['output'] != os.path.abspath(dst_path): return False, None
+        try: st = os.stat(src_path)
+        except OSError: return False, None
+        current = st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns'] and os.path.exists(dst_path)
+        return current, entry['hash']
+
+    def record(self, result, signature):
+        self.entries[os.path.abspath(result['src'])] = {'size': result['size'], 'mtime_ns': result['mtime_ns'], 'hash': result['hash'],
+                                                        'params': signature, 'output': os.path.abspath(result['dst'])}
+        self.unsaved += 1
+        if self.unsaved >= MANIFEST_FLUSH_RECORDS or time.monotonic() - self.saved_at >= MANIFEST_FLUSH_SECONDS: self.save()
+
+    def prune(self):
+        # Remove as saídas cujas origens não existem mais
+        removed = []
+        for src_path, entry in list(self.entries.items()):
+            if os.path.exists(src_path): continue
+            try: os.remove(entry['output'])
+            except FileNotFoundError: pass
+            del self.entries[src_path]; removed.append(entry['output'])
+        return removed
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f: json.dump({'version': 1, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.unsaved, self.saved_at = 0, time.monotonic()
+
+
+def run_standardize(files, options, output_dir_for, workers=None, cancel_event=None, incremental=False):
+    # 'files' gera (origem, raiz); 'output_dir_for(raiz)' escolhe a pasta de saída.
+    # No modo incremental, origens inalteradas (tamanho + mtime + parâmetros) nem chegam ao pool.
+    signature = options.signature()
+    manifests, job_dirs, skipped = {}, {}, deque()
+
+    def jobs():
+        for src_path, root in files:
+            output_dir = output_dir_for(root)
+            dst_path = output_path_for(src_path, root, output_dir, options)
+            if not incremental: yield src_path, dst_path, options; continue
+            if output_dir not in manifests: manifests[output_dir] = Manifest(output_dir)
+            current, known_hash = manifests[output_dir].check(src_path, dst_path, signature)
+            if current:
+                skipped.append({'src': src_path, 'dst': dst_path, 'ok': True, 'skipped': True, 'bytes_in': 0, 'bytes_out': 0}); continue
+            job_dirs[src_path] = output_dir
+            yield src_path, dst_path, options, True, known_hash
+
+    try:
+        for result in run_batch(jobs(), workers, cancel_event):
+            while skipped: yield skipped.popleft()
+            if incremental:
+                output_dir = job_dirs.pop(result['src'])
+                if result['ok']: manifests[output_dir].record(result, signature)
+            yield result
+        while skipped: yield skipped.popleft()
+        if not (cancel_event and cancel_event.is_set()):
+            for manifest in manifests.values():
+                for removed_path in manifest.prune(): yield {'src': None, 'dst': removed_path, 'ok': True, 'removed': True, 'bytes_in': 0, 'bytes_out': 0}
+    finally:
+        # Também quando o lote termina por erro ou o consumidor abandona o gerador: o que já foi feito fica registrado
+        for manifest in manifests.values(): manifest.save()
+
+
+def run_normalize_orientation(files, workers=None, cancel_event=None):
+    # 'files' gera (origem, raiz), como em run_standardize; arquivos já na orientação 1 voltam como 'skipped'
+    return run_batch(((src_path,) for src_path, root in files), workers, cancel_event, task=normalize_orientation_file)
+
+
+class BatchSummary:
+    def __init__(self):
+        self.files = self.succeeded = self.failed = self.skipped = self.removed = self.bytes_in = self.bytes_out = 0
+        self.failures = []
+        self.start_time = time.perf_counter()
+
+    def add(self, result):
+        if result.get('removed'): self.removed += 1; return
+        self.files += 1; self.bytes_in += result['bytes_in']; self.bytes_out += result['bytes_out']
+        if result.get('skipped'): self.skipped += 1
+        elif result['ok']: self.succeeded += 1
+        else: self.failed += 1; self.failures.append({'path': result['src'], 'error': result['error']})
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def as_dict(self):
+        elapsed = self.elapsed()
+        return {'files': self.files, 'succeeded': self.succeeded, 'failed': self.failed, 'skipped': self.skipped, 'removed': self.removed,
+                'seconds': round(elapsed, 3), 'files_per_second': round(self.files / elapsed, 2) if elapsed > 0 else 0.0,
+                'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out, 'failures': self.failures}
+
+
+# ===================================================================
+#                      LINHA DE COMANDO
+# ===================================================================
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pixelvista", description="Ferramentas de linha de comando do PixelVista.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch = commands.add_parser("batch", help="Padroniza imagens (redimensiona e adiciona bordas) sem interface gráfica.")
+    batch.add_argument("inputs", nargs="+", help="Pastas ou padrões glob (ex.: 'fotos/**/*.jpg').")
+    batch.add_argument("--size", type=parse_size, default=(900, 900), help="Tamanho alvo LxA (padrão: 900x900).")
+    batch.add_argument("--pad-color", type=parse_color, default=(255, 255, 255), help="Cor das bordas: #RRGGBB ou R,G,B (padrão: branco).")
+    batch.add_argument("--output", help=f"Pasta de saída (padrão: <pasta>/{OUTPUT_DIR_NAME}).")
+    batch.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default='keep', help="Formato de saída (padrão: o mesmo da origem).")
+    batch.add_argument("--quality", type=int, help="Qualidade para JPEG/WEBP (1-100).")
+    batch.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos em paralelo (padrão: número de CPUs).")
+    batch.add_argument("--recursive", action="store_true", help="Inclui subpastas (e '**' nos padrões glob).")
+    batch.add_argument("--incremental", action="store_true", help=f"Reprocessa só o que mudou, usando o manifesto '{MANIFEST_NAME}' da pasta de saída.")
+    orient = commands.add_parser("orient", help="Aplica a orientação EXIF nos pixels (e grava a tag como 1) nos próprios arquivos.")
+    orient.add_argument("inputs", nargs="+", help="Pastas ou padrões glob (ex.: 'fotos/**/*.jpg').")
+    orient.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos em paralelo (padrão: número de CPUs).")
+    orient.add_argument("--recursive", action="store_true", help="Inclui subpastas (e '**' nos padrões glob).")
+    return parser
+
+
+def run_batch_command(args):
+    if not args.output and not all(os.path.isdir(item) for item in args.inputs):
+        print("Erro: --output é obrigatório quando as entradas são padrões glob.", file=sys.stderr); return 2
+    options = StandardizeOptions(*args.size, pad_color=args.pad_color, output_format=args.format, quality=args.quality)
+    output_dirs = [args.output] if args.output else [os.path.join(item, OUTPUT_DIR_NAME) for item in args.inputs]
+
+    files = iter_image_files(args.inputs, args.recursive, exclude_dirs=output_dirs)
+    output_dir_for = lambda root: args.output or os.path.join(root, OUTPUT_DIR_NAME)
+
+    summary = BatchSummary()
+    for result in run_standardize(files, options, output_dir_for, args.workers, incremental=args.incremental):
+        summary.add(result)
+        if not result['ok']: print(f"Erro ao processar {result['src']}: {result['error']}", file=sys.stderr)
+    print(json.dumps(summary.as_dict(), ensure_ascii=False))
+    return 1 if summary.failed else 0
+
+
+def run_orient_command(args):
+    summary = BatchSummary()
+    for result in run_normalize_orientation(iter_image_files(args.inputs, args.recursive), args.workers):
+        summary.add(result)
+        if not result['ok']: print(f"Erro ao processar {result['src']}: {result['error']}", file=sys.stderr)
+    print(json.dumps(summary.as_dict(), ensure_ascii=False))
+    return 1 if summary.failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "batch": return run_batch_command(args)
+    if args.command == "orient": return run_orient_command(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
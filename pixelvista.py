@@ -0,0 +1,46 @@
+# ===================================================================
+#            PONTO DE ENTRADA: ABERTURA RÁPIDA E INSTÂNCIA ÚNICA
+# ===================================================================
+# Cada clique duplo num arquivo de imagem inicia este script. Antes de
+# carregar Tk, Pillow e a interface, ele tenta entregar o arquivo à janela
+# já aberta (ver single_instance.py) e sai em poucos milissegundos.
+# Uso:
+#   python pixelvista.py [arquivo]                abre o arquivo (na janela já aberta, se houver)
+#   python pixelvista.py --new-window [arquivo]   sempre abre uma nova janela
+#   python pixelvista.py batch|orient ...         modo sem interface (ver pipeline.py)
+import os
+import sys
+import multiprocessing
+
+
+def print_startup_and_exit(app, elapsed_ms):
+    # PIXELVISTA_STARTUP_EXIT=1 (usado pelo benchmark.py): imprime o tempo até a primeira imagem e fecha a janela
+    print(f"{elapsed_ms:.1f}"); app.on_app_close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in ("batch", "orient"):
+        import pipeline
+        return pipeline.main(argv)     # Modo sem interface
+    new_window = '--new-window' in argv
+    args = [arg for arg in argv if arg != '--new-window']
+    file_path = args[0] if args else None
+    server = None
+    if not new_window:
+        import single_instance
+        if file_path and single_instance.hand_off(file_path): return 0
+        # O servidor começa a escutar antes de a interface carregar: arquivos entregues nesse meio-tempo esperam na fila
+        try: server = single_instance.InstanceServer()
+        except OSError as e: print(f"Aviso: modo de instância única indisponível: {e}")
+    try:
+        import visualizador
+        visualizador.run(file_path, server, print_startup_and_exit if os.environ.get('PIXELVISTA_STARTUP_EXIT') else None)
+    finally:
+        if server: server.close()      # Também quando a janela sai por "Sair" ou por erro: não deixa o arquivo da porta para trás
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()    # Necessário para o ProcessPoolExecutor no executável do PyInstaller
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# ===================================================================
+#          MEDIÇÃO DE TEMPO POR ETAPA (PERFIL) + RASTREAMENTO
+# ===================================================================
+# Uso:   with profiler.stage('decode'): ...
+# Desligado (padrão), stage() devolve sempre o mesmo objeto que não faz
+# nada: o custo é uma verificação de atributo por etapa. Ligado, guarda as
+# últimas N durações de cada etapa (para o painel na tela) e os eventos
+# brutos, que podem ser exportados no formato de trace do Chrome
+# (abrir em chrome://tracing ou https://ui.perfetto.dev).
+# PIXELVISTA_PROFILE=1 liga a medição desde a abertura do programa.
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque, OrderedDict
+
+STAGE_HISTORY = 60          # Durações guardadas por etapa (média/máximo no painel)
+TRACE_MAX_EVENTS = 200_000  # Eventos guardados para exportação (os mais antigos são descartados)
+
+
+class _NullStage:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, history=STAGE_HISTORY):
+        self.enabled = enabled
+        self.history = history
+        self._stages = OrderedDict()        # nome -> deque das últimas durações (ms)
+        self._events = deque(maxlen=TRACE_MAX_EVENTS)
+        self._origin = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def record(self, name, start_ns, end_ns):
+        with self._lock:
+            durations = self._stages.get(name)
+            if durations is None: durations = self._stages[name] = deque(maxlen=self.history)
+            durations.append((end_ns - start_ns) / 1e6)
+            self._events.append((name, start_ns, end_ns, threading.get_ident()))
+
+    def summary(self):
+        # {etapa: (última, média, máxima, contagem)} em ms, na ordem em que as etapas apareceram
+        with self._lock:
+            return OrderedDict((name, (d[-1], sum(d) / len(d), max(d), len(d))) for name, d in self._stages.items() if d)
+
+    def clear(self):
+        with self._lock: self._stages.clear(); self._events.clear()
+
+    def export_chrome_trace(self, path):
+        # Eventos "X" (duração completa) em microssegundos, um "tid" por thread
+        with self._lock: events = list(self._events)
+        threads = {t.ident: t.name for t in threading.enumerate()}
+        trace = [{'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': tid, 'ts': (start - self._origin) / 1000, 'dur': (end - start) / 1000}
+                 for name, start, end, tid in events]
+        trace += [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': threads.get(tid, str(tid))}}
+                  for tid in {e[3] for e in events}]
+        with open(path, 'w', encoding='utf-8') as f: json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t), ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+    counters = PROCESS_MEMORY_COUNTERS(); counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    return counters
+
+
+def process_memory_mb():
+    # Memória residente do processo (MB), sem dependências externas; None se a plataforma não for suportada
+    try:
+        if sys.platform == 'win32': return _windows_memory_counters().WorkingSetSize / (1024 * 1024)
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except Exception: return None
+
+
+def peak_memory_mb():
+    # Pico de memória residente do processo desde o início, ou desde o último reset_peak_memory() (MB)
+    try:
+        if sys.platform == 'win32': return _windows_memory_counters().PeakWorkingSetSize / (1024 * 1024)
+        if os.path.exists('/proc/self/status'):
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'): return int(line.split()[1]) / 1024
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024     # macOS informa em bytes, Linux em KB
+    except Exception: return None
+
+
+def reset_peak_memory():
+    # Zera o pico medido por peak_memory_mb() (só no Linux, via /proc/self/clear_refs); False se não for possível
+    try:
+        with open('/proc/self/clear_refs', 'w') as f: f.write('5')
+        return True
+    except OSError: return False
+
+
+def process_start_time():
+    # Horário (time.time()) em que o processo foi criado, para medir o tempo desde o clique até a primeira imagem;
+    # sem suporte da plataforma, usa o momento em que este módulo foi importado
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+            creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            ctypes.windll.kernel32.GetProcessTimes(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(creation), ctypes.byref(exit_), ctypes.byref(kernel), ctypes.byref(user))
+            return ((creation.dwHighDateTime << 32) + creation.dwLowDateTime) / 1e7 - 11644473600     # FILETIME: 100 ns desde 1601
+        with open('/proc/self/stat') as f: start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f: uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))      # Idade do processo (precisão de 10 ms)
+    except Exception: return _IMPORT_TIME
+
+
+_IMPORT_TIME = time.time()
+
+# Instância única usada por todos os módulos
+profiler = Profiler(enabled=bool(os.environ.get('PIXELVISTA_PROFILE')))
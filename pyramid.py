@@ -0,0 +1,312 @@
+# ===================================================================
+#        PIRÂMIDE DE BLOCOS EM DISCO PARA IMAGENS GIGANTES
+# ===================================================================
+# Imagens acima de alguns centenas de megapixels não cabem na memória
+# como um único PIL.Image. A pirâmide é gerada uma vez, em fundo: cada
+# nível tem metade da resolução do anterior e fica num arquivo de blocos
+# RGB de 256x256 sem compressão, lido por mmap. A tela só monta os blocos
+# do nível adequado ao zoom que caem dentro da área visível.
+import io
+import os
+import json
+import math
+import mmap
+import shutil
+import struct
+import threading
+from PIL import Image, TiffImagePlugin
+from storage import user_cache_dir, folder_cache_path
+from rendering import visible_region
+
+TILE = 256
+TILE_BYTES = TILE * TILE * 3
+PYRAMID_CACHE_GB = 20       # Espaço máximo em disco das pirâmides (as usadas há mais tempo são apagadas)
+PYRAMID_VERSION = 1
+DECODE_BUDGET_MB = 1024     # Memória máxima para decodificar de uma vez uma origem que não pode ser lida em faixas
+
+# Bits por pixel dos modos "raw" mais comuns (para calcular o passo das linhas quando o arquivo não informa)
+_RAW_BITS = {'L': 8, 'P': 8, 'RGB': 24, 'BGR': 24, 'RGBX': 32, 'RGBA': 32, 'BGRX': 32, 'BGRA': 32}
+# Tags que descrevem a codificação dos pixels de um TIFF (copiadas para o TIFF em memória de cada faixa)
+_TIFF_LAYOUT_TAGS = (256, 258, 259, 262, 266, 277, 278, 284, 317, 320, 322, 323, 338, 339, 347, 529, 530, 531, 532)
+TIFF_STRIP_OFFSETS, TIFF_STRIP_COUNTS, TIFF_TILE_OFFSETS, TIFF_TILE_COUNTS = 273, 279, 324, 325
+
+_open_lock = threading.Lock()
+
+
+def open_large(fp):
+    # Image.open sem o limite de "decompression bomb" do Pillow, que continua valendo no resto do programa.
+    # Só para quem lê o cabeçalho ou os pixels em faixas/dentro de DECODE_BUDGET_MB; o limite volta logo após o cabeçalho.
+    with _open_lock:
+        limit, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+        try: return Image.open(fp)
+        finally: Image.MAX_IMAGE_PIXELS = limit
+
+
+def pyramid_dir(path):
+    return folder_cache_path('pyramids', path, extension='')
+
+
+def level_sizes(size):
+    # Do tamanho real até o primeiro nível que cabe num único bloco
+    sizes = [tuple(size)]
+    while max(sizes[-1]) > TILE: sizes.append(((sizes[-1][0] + 1) // 2, (sizes[-1][1] + 1) // 2))
+    return sizes
+
+
+def tile_grid(size):
+    return -(-size[0] // TILE), -(-size[1] // TILE)
+
+
+def _decoded_bytes(size, mode):
+    return size[0] * size[1] * max(3, len(mode))
+
+
+# --- Leitura da origem em faixas horizontais ---
+def _raw_tiles(img):
+    # Blocos "raw" (sem compressão) com passo de linha conhecido, ou None se o formato exigir decodificação completa
+    tiles = []
+    for tile in img.tile:
+        codec, extents, offset, args = tile[:4]
+        if codec != 'raw': return None
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        width = extents[2] - extents[0]
+        if not stride:
+            if rawmode not in _RAW_BITS: return None
+            stride = (width * _RAW_BITS[rawmode] + 7) // 8
+        tiles.append((extents, offset, rawmode, stride, orientation or 1))
+    return tiles
+
+
+def _tiff_blocks(img):
+    # TIFF comprimido (LZW, deflate, JPEG...) em strips ou blocos: (largura, altura do bloco, colunas, offsets, tamanhos),
+    # ou None se não der para decodificar uma linha de blocos isolada (planos separados, strip único grande demais)
+    if img.format != 'TIFF' or len(img.tile) != 1 or img.tile[0][0] != 'libtiff': return None
+    tags = img.tag_v2
+    tiled = TIFF_TILE_OFFSETS in tags
+    offsets, counts = (tags.get(TIFF_TILE_OFFSETS), tags.get(TIFF_TILE_COUNTS)) if tiled else (tags.get(TIFF_STRIP_OFFSETS), tags.get(TIFF_STRIP_COUNTS))
+    block_w, block_h = (tags.get(322), tags.get(323)) if tiled else (img.width, tags.get(278, img.height))
+    if tags.get(284, 1) != 1 or not offsets or not counts or not block_w or not block_h: return None
+    cols = -(-img.width // block_w)
+    if len(offsets) != cols * -(-img.height // block_h) or _decoded_bytes((cols * block_w, block_h), img.mode) > DECODE_BUDGET_MB * 1024 ** 2: return None
+    return tiled, block_h, cols, tuple(offsets), tuple(counts)
+
+
+def _tiff_rows(f, img, blocks, y0, y1):
+    # Decodifica só as linhas de blocos que cobrem y0..y1: elas viram um TIFF em memória com as mesmas tags de codificação
+    tiled, block_h, cols, offsets, counts = blocks
+    r0, r1 = y0 // block_h, -(-y1 // block_h)
+    top = r0 * block_h
+    ifd = TiffImagePlugin.ImageFileDirectory_v2()
+    for tag in _TIFF_LAYOUT_TAGS:
+        if tag in img.tag_v2: ifd[tag] = img.tag_v2[tag]; ifd.tagtype[tag] = img.tag_v2.tagtype[tag]
+    ifd[257] = min(img.height, r1 * block_h) - top
+    data, positions = bytearray(), []
+    for i in range(r0 * cols, r1 * cols):
+        f.seek(offsets[i]); positions.append(len(data)); data += f.read(counts[i])
+    offsets_tag, counts_tag = (TIFF_TILE_OFFSETS, TIFF_TILE_COUNTS) if tiled else (TIFF_STRIP_OFFSETS, TIFF_STRIP_COUNTS)
+    ifd[offsets_tag], ifd[counts_tag] = tuple(positions), counts[r0 * cols:r1 * cols]
+    ifd.tagtype[offsets_tag] = ifd.tagtype[counts_tag] = 4
+    # Os dados vêm logo após o IFD: o Pillow já soma essa posição aos StripOffsets, mas não aos TileOffsets
+    if tiled: ifd[offsets_tag] = tuple(8 + len(ifd.tobytes(8)) + p for p in positions)
+    with open_large(io.BytesIO(b'II*\x00' + struct.pack('<I', 8) + ifd.tobytes(8) + bytes(data))) as part:
+        return part.crop((0, y0 - top, img.width, y1 - top))
+
+
+def source_level(img):
+    # Primeiro nível da pirâmide que dá para gerar a partir da origem: 0 (resolução real) quando ela é lida em faixas
+    # ou cabe em DECODE_BUDGET_MB; JPEG maior que isso é decodificado por draft em 1/2, 1/4 ou 1/8 (níveis 1 a 3)
+    if (len(img.tile) and _raw_tiles(img) is not None) or _tiff_blocks(img) or _decoded_bytes(img.size, img.mode) <= DECODE_BUDGET_MB * 1024 ** 2: return 0
+    sizes = level_sizes(img.size)
+    if img.format == 'JPEG':
+        for level in range(1, min(4, len(sizes))):
+            if _decoded_bytes(sizes[level], img.mode) <= DECODE_BUDGET_MB * 1024 ** 2: return level
+    raise ValueError(f"{img.format} de {img.width}x{img.height} não pode ser lido em faixas e não cabe em {DECODE_BUDGET_MB} MB de memória "
+                     "(converta para TIFF sem compressão ou com LZW/deflate em strips/blocos)")
+
+
+def iter_bands(path, band_height=TILE):
+    # Gera (y, faixa RGB) do nível source_level(), de cima para baixo. Arquivos sem compressão (TIFF/PPM/BMP...) são
+    # lidos faixa a faixa direto do disco e TIFF comprimido, uma linha de strips/blocos por vez; os demais formatos
+    # são decodificados inteiros uma vez (JPEG grande em escala reduzida), sempre dentro de DECODE_BUDGET_MB.
+    with open_large(path) as img:
+        level = source_level(img)
+        width, height, mode = img.width, img.height, img.mode
+        tiles = _raw_tiles(img) if len(img.tile) else None
+        blocks = _tiff_blocks(img) if tiles is None else None
+        if blocks:
+            with open(path, 'rb') as f:
+                for y in range(0, height, band_height):
+                    band = _tiff_rows(f, img, blocks, y, min(height, y + band_height))
+                    yield y, band.convert('RGB') if band.mode != 'RGB' else band
+            return
+        if tiles is None:
+            if level:
+                target = level_sizes(img.size)[level]
+                img.draft('RGB', (width >> level, height >> level))      # DCT direto em 1/2^level: o tamanho fica igual ao do nível
+                width, height = target
+            img.load()
+            for y in range(0, height, band_height):
+                yield y, img.crop((0, y, width, min(height, y + band_height))).convert('RGB')
+            return
+    with open(path, 'rb') as f:
+        for y in range(0, height, band_height):
+            y1 = min(height, y + band_height)
+            band = Image.new(mode, (width, y1 - y))
+            for (tx0, ty0, tx1, ty1), offset, rawmode, stride, orientation in tiles:
+                r0, r1 = max(y, ty0), min(y1, ty1)
+                if r0 >= r1: continue
+                # Linhas r0..r1 do bloco; com orientação -1 (BMP) as linhas estão gravadas de baixo para cima
+                first_row = r0 - ty0 if orientation > 0 else ty1 - r1
+                f.seek(offset + first_row * stride)
+                data = f.read((r1 - r0) * stride)
+                band.paste(Image.frombytes(mode, (tx1 - tx0, r1 - r0), data, 'raw', rawmode, stride, orientation), (tx0, r0 - y))
+            yield y, band.convert('RGB') if mode != 'RGB' else band
+
+
+# --- Geração ---
+def _write_band(f, band):
+    # Grava uma linha de blocos (faixa de até TILE linhas), completando as bordas com preto
+    for x in range(0, band.width, TILE):
+        f.write(band.crop((x, 0, x + TILE, TILE)).tobytes())
+
+
+def build_pyramid(path, progress=None, cancel_event=None):
+    # Gera a pirâmide de 'path' na pasta de cache; progress(fração) é chamado durante a geração
+    st = os.stat(path)
+    directory = pyramid_dir(path)
+    with open_large(path) as img: sizes, base = level_sizes(img.size), source_level(img)
+    shutil.rmtree(directory, ignore_errors=True); os.makedirs(directory)
+    total_rows = sum(tile_grid(size)[1] for size in sizes[base:]); rows_done = 0
+    # Primeiro nível (o real, ou o reduzido de um JPEG grande demais) a partir da origem, em faixas de TILE linhas
+    with open(os.path.join(directory, f'level{base}.tiles'), 'wb') as f:
+        for _, band in iter_bands(path):
+            if cancel_event is not None and cancel_event.is_set(): shutil.rmtree(directory, ignore_errors=True); return None
+            _write_band(f, band); rows_done += 1
+            if progress: progress(rows_done / total_rows)
+    # Cada nível seguinte: duas linhas de blocos do anterior -> reduce(2) -> uma linha de blocos
+    for level in range(base + 1, len(sizes)):
+        source = TilePyramid(directory, sizes[:level], base)
+        height, (prev_w, prev_h) = sizes[level][1], sizes[level - 1]
+        with open(os.path.join(directory, f'level{level}.tiles'), 'wb') as f:
+            for y in range(0, height, TILE):
+                if cancel_event is not None and cancel_event.is_set(): source.close(); shutil.rmtree(directory, ignore_errors=True); return None
+                band = source.region(level - 1, (0, y * 2, prev_w, min(prev_h, (y + TILE) * 2))).reduce(2)
+                _write_band(f, band); rows_done += 1
+                if progress: progress(rows_done / total_rows)
+        source.close()
+    with open(os.path.join(directory, 'pyramid.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': PYRAMID_VERSION, 'source': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'levels': sizes, 'base': base}, f)
+    prune_pyramids(keep=directory)
+    return TilePyramid.open(path)
+
+
+def prune_pyramids(max_gb=PYRAMID_CACHE_GB, keep=None):
+    root = user_cache_dir('pyramids')
+    entries = []
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        try: entries.append((os.path.getmtime(os.path.join(directory, 'pyramid.json')), sum(e.stat().st_size for e in os.scandir(directory)), directory))
+        except OSError: entries.append((0, 0, directory))     # Geração interrompida
+    total = sum(size for _, size, _ in entries)
+    for _, size, directory in sorted(entries):
+        if total <= max_gb * 1024 ** 3: break
+        if directory == keep: continue
+        shutil.rmtree(directory, ignore_errors=True); total -= size
+
+
+class PyramidBuilder:
+    # Thread de fundo que gera a pirâmide; a interface lê 'progress', 'pyramid' e 'error'
+    def __init__(self, path):
+        self.path = path
+        self.progress = 0.0
+        self.pyramid = self.error = None
+        self.done = False
+        self.cancel_event = threading.Event()
+        threading.Thread(target=self._run, name="PixelVista-Pyramid", daemon=True).start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _run(self):
+        try: self.pyramid = build_pyramid(self.path, self._set_progress, self.cancel_event)
+        except Exception as e: self.error = e; shutil.rmtree(pyramid_dir(self.path), ignore_errors=True)
+        finally: self.done = True
+
+    def _set_progress(self, value):
+        self.progress = value
+
+
+# --- Leitura ---
+class TilePyramid:
+    def __init__(self, directory, sizes, base=0):
+        self.directory = directory
+        self.levels = [tuple(size) for size in sizes]
+        self.base = base        # Primeiro nível gravado (> 0: a origem só pôde ser lida em resolução reduzida)
+        self.full_size = self.levels[0]
+        self._files, self._maps = {}, {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        # Pirâmide já gerada e ainda válida para o arquivo (tamanho + mtime), ou None
+        directory = pyramid_dir(path)
+        try:
+            with open(os.path.join(directory, 'pyramid.json'), encoding='utf-8') as f: meta = json.load(f)
+            st = os.stat(path)
+        except (OSError, ValueError): return None
+        if meta.get('version') != PYRAMID_VERSION or (meta['size'], meta['mtime_ns']) != (st.st_size, st.st_mtime_ns): return None
+        os.utime(os.path.join(directory, 'pyramid.json'))      # Marca como usada recentemente (limpeza do cache)
+        return cls(directory, meta['levels'], meta.get('base', 0))
+
+    def _map(self, level):
+        with self._lock:
+            if level not in self._maps:
+                f = open(os.path.join(self.directory, f'level{level}.tiles'), 'rb')
+                self._files[level] = f; self._maps[level] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._maps[level]
+
+    def tile(self, level, tx, ty):
+        cols = tile_grid(self.levels[level])[0]
+        offset = (ty * cols + tx) * TILE_BYTES
+        return Image.frombytes('RGB', (TILE, TILE), self._map(level)[offset:offset + TILE_BYTES])
+
+    def region(self, level, box):
+        # Monta a região 'box' (em pixels do nível) só com os blocos que ela cobre
+        x0, y0, x1, y1 = box
+        out = Image.new('RGB', (x1 - x0, y1 - y0))
+        for ty in range(y0 // TILE, (y1 - 1) // TILE + 1):
+            for tx in range(x0 // TILE, (x1 - 1) // TILE + 1):
+                out.paste(self.tile(level, tx, ty), (tx * TILE - x0, ty * TILE - y0))
+        return out
+
+    def level_for_zoom(self, zoom):
+        # Nível mais reduzido que ainda tem pixels suficientes para o zoom (zoom relativo à resolução real)
+        if zoom >= 1: return self.base
+        return max(self.base, min(len(self.levels) - 1, int(math.floor(math.log2(1 / zoom)))))
+
+    def overview(self, box_size):
+        # Menor nível que ainda cobre 'box_size' inteiro, montado como uma imagem
+        level = len(self.levels) - 1
+        while level > self.base and (self.levels[level][0] < box_size[0] and self.levels[level][1] < box_size[1]): level -= 1
+        width, height = self.levels[level]
+        return self.region(level, (0, 0, width, height))
+
+    def render(self, zoom, origin, canvas_size, resample=Image.Resampling.LANCZOS, reducing_gap=None):
+        # Mesmo contrato de rendering.render_region, mas lendo só os blocos visíveis do nível adequado
+        region = visible_region(self.full_size, zoom, origin, canvas_size)
+        if region is None: return None
+        (bx0, by0, bx1, by1), position, size, full = region
+        level = self.level_for_zoom(zoom)
+        level_w, level_h = self.levels[level]
+        sx, sy = level_w / self.full_size[0], level_h / self.full_size[1]
+        x0, y0 = int(bx0 * sx), int(by0 * sy)
+        x1, y1 = min(level_w, math.ceil(bx1 * sx)), min(level_h, math.ceil(by1 * sy))
+        piece = self.region(level, (x0, y0, max(x0 + 1, x1), max(y0 + 1, y1)))
+        box = (bx0 * sx - x0, by0 * sy - y0, bx1 * sx - x0, by1 * sy - y0)
+        return piece.resize(size, resample, box=box, reducing_gap=reducing_gap), position, full
+
+    def close(self):
+        with self._lock:
+            for m in self._maps.values(): m.close()
+            for f in self._files.values(): f.close()
+            self._maps.clear(); self._files.clear()
@@ -0,0 +1,33 @@
+# ===================================================================
+#              RENDERIZAÇÃO DA ÁREA VISÍVEL (ZOOM E PAN)
+# ===================================================================
+# Em vez de redimensionar a imagem inteira para o nível de zoom, recorta
+# apenas a região que aparece no canvas e escala só essa parte. O custo
+# passa a depender do tamanho do canvas, não de (tamanho da imagem x zoom²).
+import math
+from PIL import Image
+
+
+def visible_region(image_size, zoom, origin, canvas_size):
+    # origin = posição (no canvas) do canto superior esquerdo da imagem ampliada
+    img_w, img_h = image_size; ox, oy = origin; canvas_w, canvas_h = canvas_size
+    x0 = math.floor(max(0, ox)); y0 = math.floor(max(0, oy))
+    x1 = math.ceil(min(canvas_w, ox + img_w * zoom)); y1 = math.ceil(min(canvas_h, oy + img_h * zoom))
+    if x1 <= x0 or y1 <= y0: return None
+    box = (max(0.0, (x0 - ox) / zoom), max(0.0, (y0 - oy) / zoom),
+           min(float(img_w), (x1 - ox) / zoom), min(float(img_h), (y1 - oy) / zoom))
+    full = box == (0.0, 0.0, float(img_w), float(img_h))
+    return box, (x0, y0), (x1 - x0, y1 - y0), full
+
+
+def preview_resample(zoom):
+    # Filtro rápido para a renderização interativa: NEAREST ao ampliar, BILINEAR ao reduzir
+    return Image.Resampling.NEAREST if zoom >= 1 else Image.Resampling.BILINEAR
+
+
+def render_region(image, zoom, origin, canvas_size, resample=Image.Resampling.LANCZOS, reducing_gap=None):
+    # Retorna (recorte escalado, posição no canvas, recorte cobre a imagem inteira?) ou None se nada estiver visível
+    region = visible_region(image.size, zoom, origin, canvas_size)
+    if region is None: return None
+    box, position, size, full = region
+    return image.resize(size, resample, box=box, reducing_gap=reducing_gap), position, full
@@ -0,0 +1,74 @@
+# ===================================================================
+#        INSTÂNCIA ÚNICA: ENTREGA DE ARQUIVOS À JANELA JÁ ABERTA
+# ===================================================================
+# A janela aberta escuta num socket local (127.0.0.1, porta escolhida pelo
+# sistema) e grava a porta + um código aleatório na pasta de cache. Um novo
+# clique duplo só precisa da biblioteca padrão para ler esse arquivo,
+# enviar o caminho e sair, sem carregar Tk nem Pillow.
+import os
+import json
+import queue
+import socket
+import secrets
+import threading
+from storage import user_cache_dir
+
+HANDOFF_TIMEOUT = 0.5       # Segundos esperando a janela aberta responder antes de abrir uma nova
+MAX_MESSAGE_BYTES = 64 * 1024
+
+
+def _port_file():
+    return os.path.join(user_cache_dir(), 'instance.json')
+
+
+def hand_off(path, timeout=HANDOFF_TIMEOUT):
+    # Entrega 'path' à janela já aberta; False se não houver uma (arquivo antigo de uma janela que fechou sem apagá-lo, etc.)
+    try:
+        with open(_port_file(), encoding='utf-8') as f: info = json.load(f)
+        with socket.create_connection(('127.0.0.1', info['port']), timeout=timeout) as conn:
+            conn.sendall(json.dumps({'token': info['token'], 'paths': [os.path.abspath(path)]}).encode('utf-8') + b'\n')
+            return conn.makefile('rb').readline().strip() == b'ok'
+    except (OSError, ValueError, KeyError, TypeError): return False
+
+
+class InstanceServer:
+    # Caminhos recebidos de outros processos chegam em `requests`, lida pelo loop do Tk
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.token = secrets.token_hex(16)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(('127.0.0.1', 0)); self._socket.listen(8)
+        self.port = self._socket.getsockname()[1]
+        self._path = _port_file()
+        # Só o usuário atual pode ler o código (quem o conhece pode pedir para a janela abrir arquivos)
+        tmp_path = self._path + f".{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+            json.dump({'port': self.port, 'token': self.token, 'pid': os.getpid()}, f)
+        os.replace(tmp_path, self._path)
+        threading.Thread(target=self._run, name="PixelVista-Instance", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try: conn, _ = self._socket.accept()
+            except OSError: return      # Socket fechado (close)
+            try: self._handle(conn)
+            except (OSError, ValueError): pass
+            finally: conn.close()
+
+    def _handle(self, conn):
+        conn.settimeout(2.0)
+        line = conn.makefile('rb').readline(MAX_MESSAGE_BYTES)
+        message = json.loads(line.decode('utf-8'))
+        if not secrets.compare_digest(str(message.get('token', '')), self.token): return
+        for path in message.get('paths', []):
+            if isinstance(path, str): self.requests.put(path)
+        conn.sendall(b'ok\n')
+
+    def close(self):
+        self._socket.close()
+        # Apaga o arquivo só se ainda for desta janela (outra pode ter sido aberta com --new-window depois)
+        try:
+            with open(self._path, encoding='utf-8') as f:
+                if json.load(f).get('token') != self.token: return
+            os.remove(self._path)
+        except (OSError, ValueError): pass
@@ -0,0 +1,21 @@
+# ===================================================================
+#                 PASTAS DE DADOS LOCAIS DO APLICATIVO
+# ===================================================================
+import os
+import sys
+import hashlib
+
+
+def user_cache_dir(*parts):
+    # Windows: %LOCALAPPDATA%\PixelVista ; demais: $XDG_CACHE_HOME/pixelvista (ou ~/.cache/pixelvista)
+    if sys.platform == 'win32': base = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), 'PixelVista')
+    else: base = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'pixelvista')
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def folder_cache_path(kind, folder, extension='.sqlite'):
+    # Um arquivo (ou pasta) por caminho de origem, nomeado pelo hash do caminho absoluto (ex.: metadata/3f2a....sqlite)
+    digest = hashlib.sha1(os.path.normcase(os.path.abspath(folder)).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(user_cache_dir(kind), digest + extension)
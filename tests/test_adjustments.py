@@ -0,0 +1,47 @@
+import pytest
+from PIL import Image, ImageChops, ImageEnhance, ImageStat
+import edits
+
+
+def photo(size=(240, 160)):
+    return Image.merge('RGB', (Image.effect_mandelbrot(size, (-2.0, -1.2, 1.0, 1.2), 64), Image.linear_gradient('L').resize(size), Image.effect_noise(size, 60)))
+
+
+def enhance(image, brightness, contrast, sharpness=1.0):
+    image = ImageEnhance.Contrast(ImageEnhance.Brightness(image).enhance(brightness)).enhance(contrast)
+    return ImageEnhance.Sharpness(image).enhance(sharpness) if sharpness != 1.0 else image
+
+
+@pytest.mark.parametrize('brightness,contrast', [(1.0, 1.0), (1.2, 1.3), (0.7, 0.6), (1.0, 1.4), (1.45, 0.5), (0.5, 1.5)])
+def test_lut_matches_image_enhance(brightness, contrast):
+    # Tabela única de brilho + contraste = ImageEnhance.Brightness seguido de ImageEnhance.Contrast, pixel a pixel
+    image = photo()
+    op = edits.adjust(image, brightness, contrast, 1.0)
+    expected = enhance(image, brightness, contrast)
+    assert op[1][3] == int(ImageStat.Stat(ImageEnhance.Brightness(image).enhance(brightness).convert('L')).mean[0] + 0.5)
+    assert max(high for _, high in ImageChops.difference(edits.apply_op(image, op), expected).getextrema()) == 0
+
+
+def test_sharpness_matches_image_enhance():
+    image = photo()
+    result = edits.apply_op(image, edits.adjust(image, 1.1, 1.2, 1.8))
+    assert max(high for _, high in ImageChops.difference(result, enhance(image, 1.1, 1.2, 1.8)).getextrema()) == 0
+
+
+def test_grayscale_and_alpha_bands():
+    gray = photo().convert('L')
+    assert max(ImageChops.difference(edits.apply_op(gray, edits.adjust(gray, 1.3, 0.8, 1.0)), enhance(gray, 1.3, 0.8)).getextrema()) == 0
+    rgba = photo().convert('RGBA'); rgba.putalpha(Image.linear_gradient('L').resize(rgba.size))
+    result = edits.apply_op(rgba, edits.adjust(rgba, 1.3, 1.2, 1.0))
+    assert result.getchannel('A').tobytes() == rgba.getchannel('A').tobytes()     # A transparência não é ajustada
+
+
+def test_preview_matches_applied_adjustment():
+    image = photo()
+    preview = edits.AdjustmentPreview(image)
+    for brightness, contrast in ((1.2, 1.3), (1.45, 0.5)):
+        applied = edits.apply_op(image, edits.adjust(image, brightness, contrast, 1.0))
+        assert preview.render(brightness, contrast, 1.0).tobytes() == applied.tobytes()
+    # A nitidez da prévia é aproximada (suavização antes da tabela), mas fica perto do resultado final
+    applied = edits.apply_op(image, edits.adjust(image, 1.2, 1.3, 1.5))
+    assert sum(ImageStat.Stat(ImageChops.difference(preview.render(1.2, 1.3, 1.5), applied)).mean) / 3 < 1.5
@@ -0,0 +1,51 @@
+import json
+import pytest
+import benchmark
+
+
+@pytest.fixture
+def tiny(monkeypatch):
+    # Imagens minúsculas e lote pequeno: só a mecânica de medição, comparação e código de saída
+    monkeypatch.setattr(benchmark, 'SIZES', {'small': (64, 48)})
+    monkeypatch.setattr(benchmark, 'BATCH_IMAGES', 2)
+    return ['--sizes', 'small', '--formats', 'jpeg', '--repeat', '1', '--workers', '1', '--no-gui']
+
+
+def run(args, tmp_path, name):
+    output = tmp_path / name
+    code = benchmark.main(args + ['--output', str(output)])
+    return code, json.loads(output.read_text(encoding='utf-8'))
+
+
+def test_baseline_round_trip_and_regression_exit_code(tiny, tmp_path):
+    baseline = tmp_path / 'base.json'
+    code, report = run(tiny + ['--save-baseline', str(baseline)], tmp_path, 'first.json')
+    assert code == 0 and 'load/jpeg/small' in report['results'] and 'batch/1workers/small' in report['results']
+    assert not any(name.startswith(('photoimage/', 'startup/')) for name in report['results'])
+    assert all('peak_rss_mb' in row for row in report['results'].values())
+    # Linha de base com tempos muito menores (e uma diferença absoluta acima do mínimo): tudo vira regressão
+    data = json.loads(baseline.read_text(encoding='utf-8'))
+    for row in data['results'].values(): row['p50_ms'] = row['p50_ms'] / 1000
+    baseline.write_text(json.dumps(data), encoding='utf-8')
+    code, report = run(tiny + ['--baseline', str(baseline), '--min-delta-ms', '0'], tmp_path, 'second.json')
+    assert code == 1 and report['comparison']['regressions']
+    # A mesma comparação com tolerância enorme passa
+    code, report = run(tiny + ['--baseline', str(baseline), '--threshold', '1e9'], tmp_path, 'third.json')
+    assert code == 0 and not report['comparison']['regressions'] and report['comparison']['rows']
+
+
+def test_compare_needs_relative_and_absolute_slowdown():
+    baseline = {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 0.1}, 'c': {'p50_ms': 10.0}, 'gone': {'p50_ms': 1.0}}
+    results = {'a': {'p50_ms': 13.0}, 'b': {'p50_ms': 0.5}, 'c': {'p50_ms': 11.0}, 'new': {'p50_ms': 5.0}}
+    rows, regressions = benchmark.compare(results, baseline, threshold=0.15, min_delta_ms=1.0)
+    assert [row['name'] for row in rows] == ['a', 'b', 'c']
+    # 'b' é 5x mais lento, mas só 0,4 ms (ruído); 'c' piorou 10%, dentro da tolerância
+    assert [row['name'] for row in regressions] == ['a']
+
+
+def test_missing_display_fails_loudly(monkeypatch, capsys):
+    monkeypatch.delenv('DISPLAY', raising=False)
+    monkeypatch.setattr(benchmark.sys, 'platform', 'linux')
+    monkeypatch.setitem(benchmark.sys.modules, 'xvfbwrapper', None)
+    assert benchmark.main(['--sizes', 'small', '--repeat', '1']) == 2
+    assert 'xvfbwrapper' in capsys.readouterr().err
@@ -0,0 +1,97 @@
+import random
+import itertools
+from types import SimpleNamespace
+import pytest
+from PIL import Image
+import duplicates
+import pyramid
+from duplicates import HammingIndex, find_groups
+from edits import EditHistory
+from image_loader import ImageCache
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count): value ^= 1 << bit
+    return value
+
+
+def brute_force(values, query, max_distance):
+    return sorted(v for v in values if bin(v ^ query).count('1') <= max_distance)
+
+
+@pytest.mark.parametrize('max_distance', [0, 3, 4, 6, 10])
+def test_hamming_index_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    base = [rng.getrandbits(64) for _ in range(40)]
+    # Vizinhos a todas as distâncias até o limite (e um pouco além), com os bits trocados espalhados pelos 4 blocos
+    values = set(base) | {flip_bits(v, d, rng) for v in base for d in range(max_distance + 3)}
+    index = HammingIndex(max_distance)
+    for value in values: index.add(value)
+    for query in list(values)[:200] + [rng.getrandbits(64) for _ in range(20)]:
+        assert sorted(set(index.search(query))) == brute_force(values, query, max_distance)
+
+
+def test_hamming_index_worst_case_split_across_chunks():
+    # r bits distribuídos igualmente pelos 4 blocos: algum bloco difere em no máximo r // 4 bits
+    value = 0x0123456789ABCDEF
+    other = value ^ sum(1 << (chunk * 16 + bit) for chunk, bit in itertools.product(range(4), range(2)))
+    index = HammingIndex(8); index.add(other)
+    assert index.search(value) == [other]
+    assert HammingIndex(7).search(value) == []
+
+
+def test_find_groups_is_transitive_and_sorted():
+    a = 0xFFFF0000FFFF0000
+    hashes = {'a.jpg': a, 'b.jpg': a ^ 0b111, 'c.jpg': a ^ 0b111111, 'd.jpg': a, 'e.jpg': ~a & (1 << 64) - 1, 'f.jpg': 0x1234, 'g.jpg': 0x1235}
+    assert find_groups(hashes, 3) == [['a.jpg', 'b.jpg', 'c.jpg', 'd.jpg'], ['f.jpg', 'g.jpg']]
+    assert find_groups(hashes, 0) == [['a.jpg', 'd.jpg']]
+
+
+def test_best_of_group_prefers_resolution_then_size():
+    rows = {'a': {'width': 100, 'height': 100, 'size': 900}, 'b': {'width': 200, 'height': 100, 'size': 10}, 'c': {'width': 200, 'height': 100, 'size': 20}}
+    assert duplicates.best_of_group(['a', 'b', 'c'], SimpleNamespace(get=rows.get)) == 'c'
+
+
+# --- Janela de duplicatas aberta durante a navegação ---
+class FakeTree:
+    def __init__(self, rows): self.rows, self.focused, self.seen = set(rows), None, None
+    def exists(self, iid): return iid in self.rows
+    def focus(self, iid): self.focused = iid
+    def see(self, iid): self.seen = iid
+
+
+@pytest.fixture
+def viewer(tmp_path, monkeypatch):
+    import visualizador
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setattr(visualizador.messagebox, 'showerror', lambda *args, **kwargs: pytest.fail(f"erro exibido: {args}"))
+    paths = []
+    for name, color in (('a.png', 'red'), ('b.png', 'blue'), ('c.png', 'green')):
+        Image.new('RGB', (64, 48), color).save(tmp_path / name); paths.append(str(tmp_path / name))
+    shown = []
+    app = SimpleNamespace(image_list=paths, folder_files=paths, current_index=0, canvas_size=lambda: (320, 240), pyramid=None,
+                          stop_frames=lambda: None, close_tiled=lambda: None, update_info_panel=lambda path: None, needs_tiles=lambda path: False,
+                          prefetcher=SimpleNamespace(wait=lambda path: None), image_cache=ImageCache(), history=EditHistory(),
+                          cancel_pending_render=lambda: None, display_tk_image=shown.append, prefetch_neighbors=lambda: None,
+                          start_frames=lambda path, size: None, thumb_views=[], shown=shown)
+    window = visualizador.DuplicatesWindow.__new__(visualizador.DuplicatesWindow)
+    window.viewer, window.tree = app, FakeTree([paths[1], paths[2]])
+    app.thumb_views.append(window)
+    app.window, app.load_image, app.show_tiled = window, lambda: visualizador.ImageViewer.load_image(app), lambda: visualizador.ImageViewer.show_tiled(app)
+    return app
+
+
+def test_navigation_with_duplicates_window_open(viewer):
+    for index in (0, 1, 2, 0):
+        viewer.current_index = index; viewer.load_image()
+    assert len(viewer.shown) == 4 and len(viewer.image_list) == 3
+    # A imagem 'a' não está em nenhum grupo: o destaque fica na última que estava ('c')
+    assert viewer.window.tree.focused == viewer.window.tree.seen == viewer.image_list[2]
+
+
+def test_tiled_image_with_duplicates_window_open(viewer):
+    path = viewer.image_list[1]
+    viewer.pyramid = pyramid.build_pyramid(path); viewer.current_index = 1
+    viewer.show_tiled()
+    viewer.pyramid.close()
+    assert viewer.shown and viewer.window.tree.focused == path
@@ -0,0 +1,163 @@
+import itertools
+from PIL import Image, ImageChops, ImageStat
+import edits
+
+ELEMENTS = [(f, k) for f in (0, 1) for k in range(4)]
+
+
+def pattern(size=(6, 4)):
+    # Todos os pixels diferentes: qualquer transposição errada muda o resultado
+    image = Image.new('RGB', size)
+    image.putdata([(x * 40, y * 60, (x + y * size[0]) * 9) for y in range(size[1]) for x in range(size[0])])
+    return image
+
+
+def gradient(size=(400, 300)):
+    return Image.merge('RGB', (Image.linear_gradient('L').resize(size), Image.linear_gradient('L').rotate(90).resize(size), Image.new('L', size, 128)))
+
+
+def mean_difference(a, b):
+    return sum(ImageStat.Stat(ImageChops.difference(a.convert('RGB'), b.convert('RGB'))).mean) / 3
+
+
+def test_compose_transpose_matches_applying_both():
+    image = pattern()
+    for first, second in itertools.product(ELEMENTS, ELEMENTS):
+        expected = edits.apply_op(edits.apply_op(image, ('transpose', first)), ('transpose', second))
+        combined = edits.apply_op(image, ('transpose', edits.compose_transpose(first, second)))
+        assert combined.tobytes() == expected.tobytes(), (first, second)
+
+
+def test_invert_transpose_is_inverse():
+    for element in ELEMENTS:
+        assert edits.compose_transpose(element, edits.invert_transpose(element)) == (0, 0)
+        assert edits.compose_transpose(edits.invert_transpose(element), element) == (0, 0)
+
+
+def test_constructors_map_to_group_elements():
+    image = pattern()
+    assert edits.apply_op(image, edits.rotate(90)).tobytes() == image.transpose(Image.Transpose.ROTATE_90).tobytes()
+    assert edits.apply_op(image, edits.rotate(-90)).tobytes() == image.transpose(Image.Transpose.ROTATE_270).tobytes()
+    for method in Image.Transpose:
+        assert edits.apply_op(image, edits.flip(method)).tobytes() == image.transpose(method).tobytes()
+
+
+def test_optimize_folds_transposes():
+    assert edits.optimize([edits.rotate(90)] * 4, (6, 4)) == []
+    ops = [edits.rotate(90), edits.flip(Image.Transpose.FLIP_LEFT_RIGHT), edits.rotate(-90)]
+    optimized = edits.optimize(ops, (6, 4))
+    assert len(optimized) == 1 and optimized[0][0] == 'transpose'
+    image = pattern()
+    assert edits.render(image, optimized).tobytes() == edits.render(image, ops).tobytes()
+
+
+def test_optimize_merges_crops():
+    ops = [edits.crop((10, 20, 200, 220)), edits.crop((5, 5, 50, 60))]
+    assert edits.optimize(ops, (400, 300)) == [('crop', (15, 25, 60, 80))]
+    image = gradient()
+    assert edits.render(image, edits.optimize(ops, image.size)).tobytes() == edits.render(image, ops).tobytes()
+
+
+def test_optimize_turns_crop_and_resize_into_one_resize_box():
+    image = gradient()
+    ops = [edits.crop((40, 30, 340, 230)), edits.resize((150, 100))]
+    optimized = edits.optimize(ops, image.size)
+    assert optimized == [('resize', (150, 100), (40, 30, 340, 230))]
+    assert mean_difference(edits.render(image, optimized), edits.render(image, ops)) < 1.0
+
+
+def test_optimize_maps_crop_after_resize_back_to_source_coordinates():
+    image = gradient()
+    ops = [edits.resize((200, 150)), edits.crop((20, 10, 120, 110))]
+    optimized = edits.optimize(ops, image.size)
+    assert len(optimized) == 1 and optimized[0][0] == 'resize'
+    assert optimized[0][1] == (100, 100) and optimized[0][2] == (40.0, 20.0, 240.0, 220.0)
+    assert mean_difference(edits.render(image, optimized), edits.render(image, ops)) < 2.0
+    # Dois redimensionamentos seguidos viram um só
+    twice = edits.optimize([edits.resize((200, 150)), edits.resize((100, 75))], image.size)
+    assert twice == [('resize', (100, 75), (0.0, 0.0, 400.0, 300.0))]
+
+
+def test_optimize_moves_pixel_ops_after_crop():
+    ops = [edits.grayscale(), edits.grayscale(), edits.crop((0, 0, 10, 10))]
+    assert edits.optimize(ops, (400, 300)) == [('crop', (0, 0, 10, 10)), ('grayscale',)]
+
+
+def test_optimize_preserves_result_of_mixed_stack():
+    image = gradient()
+    ops = [edits.rotate(90), edits.crop((10, 10, 250, 390)), edits.grayscale(), edits.flip(Image.Transpose.FLIP_TOP_BOTTOM),
+           edits.resize((120, 190)), edits.crop((10, 10, 110, 180))]
+    optimized = edits.optimize(ops, image.size)
+    assert len(optimized) < len(ops)
+    assert edits.final_size(image.size, optimized) == edits.final_size(image.size, ops) == (100, 170)
+    assert mean_difference(edits.render(image, optimized), edits.render(image, ops)) < 2.0
+
+
+def test_scale_op_converts_to_proxy_coordinates():
+    assert edits.scale_op(('crop', (100, 50, 300, 250)), 0.5) == ('crop', (50, 25, 150, 125))
+    assert edits.scale_op(('resize', (800, 600), (0, 0, 1000, 800)), 0.25) == ('resize', (200, 150), (0, 0, 250, 200))
+    assert edits.scale_op(edits.grayscale(), 0.5) == ('grayscale',)
+
+
+# --- Histórico (desfazer/refazer) ---
+def noisy(size=(120, 90), seed=1):
+    # Ruído não comprime: o tamanho das cópias guardadas é previsível
+    return Image.effect_noise(size, 80 + seed).convert('RGB')
+
+
+def apply_with_history(history, image, ops):
+    states = [image]
+    for op in ops:
+        history.push(op, states[-1]); states.append(edits.apply_op(states[-1], op))
+    return states
+
+
+def test_undo_redo_restore_each_state():
+    history = edits.EditHistory(max_mb=16)
+    base = noisy()
+    ops = [edits.crop((10, 10, 110, 80)), edits.rotate(90), edits.grayscale(), edits.resize((40, 60))]
+    states = apply_with_history(history, base, ops)
+    assert sorted(history.snapshots) == [0, 2, 3]     # Transposições não guardam cópia
+    current = states[-1]
+    for expected in reversed(states[:-1]):
+        current = history.undo(current, base, 1)
+        assert current.tobytes() == expected.tobytes()
+    assert not history.can_undo() and history.can_redo()
+    for expected in states[1:]:
+        current = history.redo(current, 1)
+        assert current.tobytes() == expected.tobytes()
+    assert history.ops == ops and not history.can_redo()
+
+
+def test_new_edit_after_undo_clears_redo():
+    history = edits.EditHistory(max_mb=16)
+    base = noisy()
+    states = apply_with_history(history, base, [edits.grayscale(), edits.crop((0, 0, 50, 50)), edits.resize((30, 30))])
+    history.undo(history.undo(states[-1], base, 1), base, 1)
+    history.push(edits.crop((0, 0, 20, 20)), states[1])
+    assert not history.can_redo()
+    # A cópia de antes do índice 1 continua válida (mesmo estado); a do refazer descartado não
+    assert sorted(history.snapshots) == [0, 1] and history._load(1).tobytes() == states[1].tobytes()
+
+
+def test_snapshot_budget_drops_oldest_and_recomputes():
+    base = noisy()
+    ops = [edits.crop((0, 0, 119 - i, 89 - i)) for i in range(6)]
+    one_copy = len(__import__('zlib').compress(base.tobytes(), 1))
+    history = edits.EditHistory(max_mb=(one_copy * 2.5) / (1024 * 1024))
+    states = apply_with_history(history, base, ops)
+    assert history.snapshot_bytes <= history.max_bytes
+    assert len(history.snapshots) < len(ops) and 0 not in history.snapshots
+    # Sem a cópia, o estado é recalculado a partir da cópia anterior mais próxima ou da imagem base
+    current = states[-1]
+    for expected in reversed(states[:-1]):
+        current = history.undo(current, base, 1)
+        assert current.tobytes() == expected.tobytes()
+
+
+def test_snapshot_larger_than_budget_is_not_kept():
+    history = edits.EditHistory(max_mb=0.001)
+    base = noisy()
+    states = apply_with_history(history, base, [edits.grayscale()])
+    assert history.snapshots == {} and history.snapshot_bytes == 0
+    assert history.undo(states[-1], base, 1).tobytes() == base.tobytes()
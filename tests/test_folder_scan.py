@@ -0,0 +1,76 @@
+import os
+import time
+import queue
+import pytest
+import folder_scan
+from folder_scan import FolderScanner
+
+EXTENSIONS = ('.jpg', '.png')
+
+
+def touch(path):
+    path.write_bytes(b'x'); return str(path)
+
+
+def next_event(scanner, timeout=10):
+    return scanner.events.get(timeout=timeout)
+
+
+def scan_events(scanner):
+    events = []
+    while not events or events[-1][0] == 'add': events.append(next_event(scanner))
+    return events
+
+
+def bump_mtime(folder):
+    # Sistemas de arquivos com mtime de baixa resolução: garante que a mudança seja vista
+    st = os.stat(folder); os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    d = tmp_path / 'fotos'; d.mkdir()
+    paths = {touch(d / f'{i:02d}.jpg') for i in range(8)}
+    touch(d / 'notas.txt'); (d / 'pasta.png').mkdir()      # Nem texto nem diretórios com extensão de imagem
+    return d, paths
+
+
+def test_initial_listing_arrives_in_batches(folder, monkeypatch):
+    d, paths = folder
+    monkeypatch.setattr(folder_scan, 'SCAN_BATCH_SIZE', 3)
+    monkeypatch.setattr(folder_scan, 'SCAN_BATCH_SECONDS', 3600)
+    scanner = FolderScanner(str(d), EXTENSIONS, watch_interval=3600)
+    events = scan_events(scanner); scanner.stop()
+    assert [(kind, len(batch)) for kind, batch in events[:-1]] == [('add', 3), ('add', 3), ('add', 2)]
+    assert set().union(*(batch for _, batch in events[:-1])) == paths and events[-1] == ('done', 8)
+
+
+def test_slow_listing_is_flushed_by_time(folder, monkeypatch):
+    d, paths = folder
+    monkeypatch.setattr(folder_scan, 'SCAN_BATCH_SECONDS', 0)
+    scanner = FolderScanner(str(d), EXTENSIONS, watch_interval=3600)
+    events = scan_events(scanner); scanner.stop()
+    assert all(len(batch) == 1 for _, batch in events[:-1]) and len(events) == 9
+
+
+def test_watch_reports_added_and_removed_files(folder):
+    d, paths = folder
+    scanner = FolderScanner(str(d), EXTENSIONS, watch_interval=0.01)
+    scan_events(scanner)
+    os.remove(d / '00.jpg'); os.rename(d / '01.jpg', d / 'renomeada.png')
+    added = [touch(d / 'nova.png'), str(d / 'renomeada.png')]; touch(d / 'outra.txt')
+    bump_mtime(d)
+    events = [next_event(scanner), next_event(scanner)]
+    assert events == [('remove', sorted([str(d / '00.jpg'), str(d / '01.jpg')])), ('add', sorted(added))]
+    # Sem mudança na pasta não há eventos; depois de stop(), nem com mudança
+    time.sleep(0.05); assert scanner.events.empty()
+    scanner.stop(); time.sleep(0.05)
+    touch(d / 'tarde.jpg'); bump_mtime(d); time.sleep(0.05)
+    assert scanner.events.empty()
+
+
+def test_missing_folder_reports_an_error(tmp_path):
+    scanner = FolderScanner(str(tmp_path / 'sumiu'), EXTENSIONS)
+    kind, error = next_event(scanner)
+    assert kind == 'error' and isinstance(error, OSError)
+    with pytest.raises(queue.Empty): scanner.events.get(timeout=0.05)
@@ -0,0 +1,70 @@
+import time
+from PIL import Image, ImageOps, TiffImagePlugin
+from frames import FrameSource
+from image_loader import decode_image
+from orientation import TAG_ORIENTATION
+
+
+def page(color, size=(60, 40)):
+    image = Image.new('RGB', size, color); image.paste((255, 255, 255), (0, 0, size[0] // 3, size[1] // 2))
+    return image
+
+
+def tiff_pages(path, pages):
+    # Cada página com a própria tag de orientação (o save_all do Pillow repetiria a da primeira)
+    with TiffImagePlugin.AppendingTiffWriter(str(path), True) as tf:
+        for image, orientation in pages:
+            exif = Image.Exif(); exif[TAG_ORIENTATION] = orientation
+            image.save(tf, 'TIFF', exif=exif.tobytes()); tf.newFrame()
+    return str(path)
+
+
+def wait_frame(source, index, timeout=10):
+    source.seek(index)
+    deadline = time.monotonic() + timeout
+    while (frame := source.get(index)) is None:
+        assert source.error is None and time.monotonic() < deadline
+        time.sleep(0.005)
+    return frame
+
+
+def test_pages_follow_their_own_exif_orientation(tmp_path):
+    pages = [(page('red'), 6), (page('green'), 1), (page('blue'), 3)]
+    path = tiff_pages(tmp_path / 'a.tif', pages)
+    source = FrameSource(path, (1000, 1000))
+    try:
+        assert source.n_frames == 3 and not source.animated
+        for index, (image, orientation) in enumerate(pages):
+            frame = wait_frame(source, index)
+            tagged = image.copy(); exif = Image.Exif(); exif[TAG_ORIENTATION] = orientation; tagged.info['exif'] = exif.tobytes()
+            assert frame.image.tobytes() == ImageOps.exif_transpose(tagged).tobytes()
+            assert frame.full_size == frame.image.size == ((40, 60) if orientation == 6 else (60, 40))
+            # Mesmo resultado da decodificação completa do quadro, usada ao ampliar e salvar
+            assert decode_image(path, full=True, frame=index).image.tobytes() == frame.image.tobytes()
+    finally: source.close()
+
+
+def test_rotated_frames_are_fitted_by_their_displayed_size(tmp_path):
+    path = tiff_pages(tmp_path / 'a.tif', [(page('red', (400, 200)), 8), (page('green', (400, 200)), 1)])
+    source = FrameSource(path, (100, 100))
+    try:
+        rotated, upright = wait_frame(source, 0), wait_frame(source, 1)
+        assert rotated.image.size == (50, 100) and rotated.full_size == (200, 400)
+        assert upright.image.size == (100, 50) and upright.full_size == (400, 200)
+    finally: source.close()
+
+
+def test_animated_frames_apply_the_file_orientation(tmp_path):
+    # GIF/WebP animados e MPO não são desvirados pelo Pillow: a tag é aplicada a cada quadro
+    frames = [page(color) for color in ('red', 'green', 'blue')]
+    exif = Image.Exif(); exif[TAG_ORIENTATION] = 8
+    path = str(tmp_path / 'a.webp')
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=50, lossless=True, exif=exif.tobytes())
+    source = FrameSource(path, (1000, 1000))
+    try:
+        assert source.animated and source.n_frames == 3
+        for index, image in enumerate(frames):
+            frame = wait_frame(source, index)
+            assert frame.image.convert('RGB').tobytes() == image.transpose(Image.Transpose.ROTATE_90).tobytes()
+            assert frame.full_size == (40, 60) and frame.duration == 50
+    finally: source.close()
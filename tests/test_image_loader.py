@@ -0,0 +1,146 @@
+import os
+import threading
+from types import SimpleNamespace
+from PIL import Image
+import image_loader
+from image_loader import DecodedImage, ImageCache, Prefetcher, decode_image
+from orientation import TAG_ORIENTATION
+
+
+def entry(size=(100, 100)):
+    return DecodedImage(Image.new('RGB', size), 'PNG', 'RGB')       # 100x100 RGB = 30000 bytes
+
+
+def make_files(tmp_path, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name; path.write_bytes(b'x'); paths.append(str(path))
+    return paths
+
+
+def photo(path, size=(1600, 1200), orientation=None, **kwargs):
+    exif = Image.Exif()
+    if orientation: exif[TAG_ORIENTATION] = orientation
+    Image.effect_mandelbrot(size, (-2, -1.2, 1, 1.2), 30).convert('RGB').save(path, exif=exif.tobytes(), **kwargs)
+    return str(path)
+
+
+# --- Decodificação em escala reduzida ---
+def test_jpeg_is_decoded_at_a_draft_scale(tmp_path):
+    decoded = decode_image(photo(tmp_path / 'a.jpg'), (200, 150))
+    assert decoded.image.size == (200, 150) and decoded.scale == 0.125
+    assert (decoded.width, decoded.height, decoded.format) == (1600, 1200, 'JPEG')
+    assert decoded.display.size == (200, 150) and decoded.display_size == (200, 150)
+    # DCT em 1/4: a menor escala que ainda cobre 300x225
+    assert decode_image(photo(tmp_path / 'a.jpg'), (300, 300)).image.size == (400, 300)
+
+
+def test_other_formats_are_reduced_after_decoding(tmp_path):
+    path = photo(tmp_path / 'a.png')
+    assert decode_image(path, (200, 150)).image.size == (200, 150)
+    decoded = decode_image(path, (300, 300))        # Alvo 300x225: reduz por 5 (320x240), nunca abaixo do alvo
+    assert decoded.image.size == (320, 240) and decoded.display.size == (300, 225)
+    assert decode_image(path, (1000, 1000), full=True).image.size == (1600, 1200)
+    assert decode_image(path).scale == 1 and decode_image(path).display is None
+
+
+def test_covers_compares_against_the_fitted_size(tmp_path):
+    decoded = decode_image(photo(tmp_path / 'a.png'), (300, 300))     # 320x240 de 1600x1200
+    assert decoded.covers((300, 300)) and decoded.covers((320, 240))
+    assert not decoded.covers((400, 300)) and not decoded.covers((1000, 1000))
+    assert decode_image(photo(tmp_path / 'a.png'), (50, 50), full=True).covers((4000, 4000))
+
+
+def test_rotated_images_use_the_swapped_display_box(tmp_path):
+    # Gravada 1600x1200 com a tag 6: exibida em pé (1200x1600), então a redução mira 400x300 nos pixels gravados
+    for path in (photo(tmp_path / 'a.png', orientation=6), photo(tmp_path / 'a.jpg', orientation=6)):
+        decoded = decode_image(path, (300, 400))
+        assert decoded.image.size == (300, 400) and (decoded.width, decoded.height) == (1200, 1600)
+        assert decoded.orientation == 6 and decoded.covers((300, 400)) and decoded.display.size == (300, 400)
+        assert not decoded.covers((600, 800))
+
+
+# --- ImageCache ---
+def test_cache_evicts_least_recently_used_within_budget(tmp_path):
+    a, b, c = make_files(tmp_path, 'abc')
+    cache = ImageCache(max_mb=70_000 / (1024 * 1024))      # Cabem duas entradas
+    cache.put(a, entry()); cache.put(b, entry())
+    assert cache.get(a) is not None                         # 'a' passa a ser a mais recente
+    cache.put(c, entry())
+    assert cache.contains(a) and not cache.contains(b) and cache.contains(c)
+    assert cache.get(b) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (1, 1, 1, 2)
+    assert cache.current_bytes == 60_000 <= cache.max_bytes
+
+
+def test_cache_skips_entries_larger_than_the_budget(tmp_path):
+    a, b = make_files(tmp_path, 'ab')
+    cache = ImageCache(max_mb=70_000 / (1024 * 1024))
+    cache.put(a, entry())
+    cache.put(b, entry((200, 200)))                         # 120000 bytes: nunca caberia
+    assert cache.contains(a) and not cache.contains(b) and cache.stats()['evictions'] == 0
+
+
+def test_cache_replaces_entries_of_a_modified_file(tmp_path):
+    a, = make_files(tmp_path, 'a')
+    cache = ImageCache()
+    cache.put(a, entry())
+    st = os.stat(a); os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(a) is None                             # Chave com o mtime novo: falha, sem devolver a versão velha
+    cache.put(a, entry((50, 50)))
+    assert cache.stats()['entries'] == 1 and cache.current_bytes == 7_500
+
+
+def test_cache_set_display_keeps_the_byte_count(tmp_path):
+    a, = make_files(tmp_path, 'a')
+    cache = ImageCache(); decoded = entry(); cache.put(a, decoded)
+    cache.set_display(decoded, Image.new('RGB', (10, 10)), (10, 10))
+    assert cache.current_bytes == 30_300 and decoded.display_size == (10, 10)
+    cache.clear()
+    assert cache.current_bytes == 0 and not cache.contains(a)
+
+
+# --- Prefetcher ---
+def test_prefetcher_drops_paths_from_older_navigations(tmp_path, monkeypatch):
+    a, b, c, d = make_files(tmp_path, 'abcd')
+    started, release, decoded = threading.Event(), threading.Event(), []
+
+    def fake_decode(path, display_size):
+        decoded.append((path, display_size))
+        if path == a: started.set(); release.wait(10)
+        return entry()
+    monkeypatch.setattr(image_loader, 'decode_image', fake_decode)
+    cache = ImageCache(); prefetcher = Prefetcher(cache)
+    prefetcher.schedule([a, b, c], (320, 240))
+    assert started.wait(10)
+    # Nova navegação enquanto 'a' decodifica: 'b' e 'c' deixam de estar pendentes
+    prefetcher.schedule([d], (640, 480))
+    prefetcher.wait(b)
+    release.set(); prefetcher.wait(a); prefetcher.wait(d)
+    assert decoded == [(a, (320, 240)), (d, (640, 480))]
+    assert cache.contains(a) and cache.contains(d) and not cache.contains(b)
+
+
+def test_prefetcher_skips_cached_and_unreadable_files(tmp_path, monkeypatch):
+    a, b = make_files(tmp_path, 'ab')
+    decoded = []
+
+    def fake_decode(path, display_size):
+        decoded.append(path)
+        raise OSError("arquivo corrompido")
+    monkeypatch.setattr(image_loader, 'decode_image', fake_decode)
+    cache = ImageCache(); cache.put(a, entry())
+    prefetcher = Prefetcher(cache)
+    prefetcher.schedule([a, b], (320, 240)); prefetcher.wait(b)
+    assert decoded == [b] and not cache.contains(b)
+
+
+def test_prefetch_neighbors_before_the_window_is_mapped():
+    import visualizador
+    scheduled = []
+    viewer = SimpleNamespace(prefetch_depth=2, image_list=['a', 'b', 'c', 'd'], current_index=3, nav_direction=1,
+                             needs_tiles=lambda path: path == 'b', canvas_size=lambda: None,
+                             prefetcher=SimpleNamespace(schedule=lambda paths, size: scheduled.append((paths, size))))
+    visualizador.ImageViewer.prefetch_neighbors(viewer)
+    assert scheduled == [(['a'], visualizador.WINDOW_SIZE)]
@@ -0,0 +1,87 @@
+import os
+import pytest
+from PIL import Image
+from metadata import MetadataIndex, MetadataIndexer, TAG_EXIF_IFD, TAG_DATETIME_ORIGINAL, TAG_ORIENTATION
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+
+
+def make_image(path, size, taken=None, orientation=None, mtime=None):
+    exif = Image.Exif()
+    if taken: exif.get_ifd(TAG_EXIF_IFD)[TAG_DATETIME_ORIGINAL] = taken
+    if orientation: exif[TAG_ORIENTATION] = orientation
+    Image.effect_noise(size, 40).convert('RGB').save(path, exif=exif.tobytes())
+    if mtime: os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    d = tmp_path / 'fotos'; d.mkdir()
+    paths = [make_image(d / 'a.jpg', (40, 30), taken="2021:05:01 10:00:00"),
+             make_image(d / 'b.png', (30, 40), mtime=1_500_000_000),                               # Sem EXIF: a data vem do mtime (2017)
+             make_image(d / 'c.jpg', (60, 20), taken="2019:01:01 08:00:00", orientation=6),      # Deitada no arquivo, exibida em pé
+             make_image(d / 'd.png', (10, 10), mtime=1_700_000_000)]
+    index = MetadataIndex(str(d)); index.refresh(paths)
+    yield index, paths
+    index.close()
+
+
+def names(paths):
+    return ''.join(os.path.basename(p)[0] for p in paths)
+
+
+def test_sort_paths_by_each_key(folder):
+    index, paths = folder
+    assert names(index.sort_paths(paths[::-1])) == 'abcd'
+    assert names(index.sort_paths(paths, 'name', reverse=True)) == 'dcba'
+    assert names(index.sort_paths(paths, 'date')) == 'bcad'
+    # Empates (mesma área, mesmo formato) ficam na ordem do caminho
+    assert names(index.sort_paths(paths, 'dimensions')) == 'dabc'
+    assert names(index.sort_paths(paths, 'dimensions', reverse=True)) == 'cbad'
+    assert names(index.sort_paths(paths, 'format')) == 'acbd'
+    sizes = {names([p]): os.path.getsize(p) for p in paths}
+    assert names(index.sort_paths(paths, 'filesize')) == ''.join(sorted(sizes, key=lambda n: (sizes[n], n)))
+
+
+def test_unindexed_files_go_last_and_survive_filters(folder, tmp_path):
+    index, paths = folder
+    extra = [make_image(tmp_path / 'fotos' / 'e.png', (5, 50)), make_image(tmp_path / 'fotos' / '0.png', (5, 50))]
+    assert names(index.sort_paths(paths + extra, 'dimensions', reverse=True)) == 'cbad0e'
+    assert names(index.filter_paths(extra + paths, fmt='PNG')) == 'e0bd'
+
+
+def test_filter_paths_by_format_and_display_orientation(folder):
+    index, paths = folder
+    assert index.filter_paths(paths) == paths
+    assert names(index.filter_paths(paths, fmt='JPEG')) == 'ac'
+    # 'c' é 60x20 no arquivo, mas a tag 6 a exibe em pé; quadrada conta como paisagem
+    assert names(index.filter_paths(paths, orientation='landscape')) == 'ad'
+    assert names(index.filter_paths(paths, orientation='portrait')) == 'bc'
+    assert names(index.filter_paths(paths, fmt='PNG', orientation='portrait')) == 'b'
+
+
+def test_index_persists_and_close_stops_writes(folder, tmp_path):
+    index, paths = folder
+    index.close(); index.close()
+    reopened = MetadataIndex(str(tmp_path / 'fotos'))
+    assert sorted(reopened._rows) == ['a.jpg', 'b.png', 'c.jpg', 'd.png']
+    # Fechado, o índice ainda responde pelo que tem em memória e não falha ao receber atualizações atrasadas
+    late = make_image(tmp_path / 'fotos' / 'e.png', (8, 8))
+    assert index.get(paths[0])['width'] == 40 and index.refresh([late]) == 1 and index.lookup(late)['width'] == 8
+    index.prune(paths[:1])
+    reopened.close()
+    reopened = MetadataIndex(str(tmp_path / 'fotos'))
+    assert sorted(reopened._rows) == ['a.jpg', 'b.png', 'c.jpg', 'd.png']
+    reopened.close()
+
+
+def test_indexer_stop_then_close(folder, tmp_path):
+    index, paths = folder
+    indexer = MetadataIndexer(index)
+    indexer.request(paths + [make_image(tmp_path / 'fotos' / 'e.png', (8, 8))], prune=True)
+    assert indexer.results.get(timeout=10) == ('indexed', 1)
+    indexer.stop(); index.close()
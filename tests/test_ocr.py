@@ -0,0 +1,139 @@
+import os
+import sys
+import types
+import threading
+import pytest
+from PIL import Image
+import ocr
+
+
+class FakeTesseract(types.ModuleType):
+    # Substitui o pytesseract: o "texto" reconhecido é o tamanho da imagem recebida
+    def __init__(self, languages=('por', 'eng')):
+        super().__init__('pytesseract')
+        self.TesseractError = type('TesseractError', (Exception,), {})
+        self.pytesseract = types.SimpleNamespace(tesseract_cmd='tesseract')
+        self.languages = list(languages)
+        self.calls = []
+        self.lock = threading.Lock()
+        self.gate = None        # threading.Event: segura cada chamada até ser liberado
+
+    def get_languages(self, config=''):
+        return self.languages
+
+    def image_to_string(self, image, lang=None, config=''):
+        with self.lock: self.calls.append((image.size, image.mode, lang, config))
+        if self.gate is not None: self.gate.wait(5)
+        if lang == 'falha': raise self.TesseractError("idioma não instalado")
+        return f"texto {image.width}x{image.height}"
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    module = FakeTesseract()
+    monkeypatch.setitem(sys.modules, 'pytesseract', module)
+    monkeypatch.setattr(ocr, 'pytesseract', None)
+    monkeypatch.setattr(ocr, '_languages', None)
+    monkeypatch.setattr(ocr, '_base_path', None)
+    assert ocr.load_tesseract()
+    return module
+
+
+@pytest.fixture
+def engine(tmp_path, fake):
+    engine = ocr.OcrEngine(workers=2, cache=ocr.OcrCache(str(tmp_path / 'cache.sqlite')))
+    yield engine
+    engine.shutdown()
+
+
+def write_images(folder, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(str(folder), f"img{i:02d}.png")
+        Image.new('RGB', (100 + i, 50), 'white').save(path); paths.append(path)
+    return paths
+
+
+def test_missing_pytesseract_is_reported_lazily(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pytesseract', None)     # import pytesseract -> ImportError
+    monkeypatch.setattr(ocr, 'pytesseract', None)
+    assert ocr.load_tesseract() is False
+    assert ocr.pytesseract is None
+
+
+def test_load_configures_portable_tesseract_once(tmp_path, monkeypatch):
+    module = FakeTesseract()
+    monkeypatch.setitem(sys.modules, 'pytesseract', module)
+    monkeypatch.setattr(ocr, 'pytesseract', None)
+    monkeypatch.delenv('TESSDATA_PREFIX', raising=False)
+    exe = tmp_path / 'Tesseract-OCR' / 'tesseract.exe'; exe.parent.mkdir(); exe.write_bytes(b'')
+    ocr.set_base_path(str(tmp_path))
+    try:
+        assert ocr.pytesseract is None      # Nada é importado antes do primeiro uso
+        assert ocr.load_tesseract() and ocr.pytesseract is module
+        assert module.pytesseract.tesseract_cmd == str(exe)
+        assert os.environ['TESSDATA_PREFIX'] == str(tmp_path / 'Tesseract-OCR' / 'tessdata')
+        module.pytesseract.tesseract_cmd = 'outro'
+        assert ocr.load_tesseract() and module.pytesseract.tesseract_cmd == 'outro'
+    finally: ocr.set_base_path(None)
+
+
+def test_image_result_is_cached(engine, fake):
+    image = Image.new('RGB', (120, 40), 'white')
+    options = ocr.OcrOptions(grayscale=True)
+    assert engine.submit_image(image, options).result(5) == "texto 120x40"
+    assert engine.submit_image(image.copy(), options).result(5) == "texto 120x40"
+    assert len(fake.calls) == 1 and fake.calls[0][1] == 'L' and fake.calls[0][2] == 'por'
+    # Outro pré-processamento é outra chave
+    engine.submit_image(image, ocr.OcrOptions(grayscale=False)).result(5)
+    assert len(fake.calls) == 2 and fake.calls[1][1] == 'RGB'
+
+
+def test_folder_runs_through_pool_and_index(tmp_path, engine, fake):
+    paths = write_images(tmp_path, 6)
+    index = ocr.OcrIndex(str(tmp_path), str(tmp_path / 'index.sqlite'))
+    options = ocr.OcrOptions()
+    results = list(engine.run_folder(paths, options, index))
+    assert sorted(r[0] for r in results) == paths
+    assert all(text and error is None and not current for _, text, error, current in results)
+    assert index.count() == 6 and len(fake.calls) == 6
+    assert index.search("103x50")[0][0] == paths[3]
+    # Segunda passada: tudo já indexado, nada vai ao Tesseract
+    again = list(engine.run_folder(paths, options, index))
+    assert all(current for _, _, _, current in again) and len(fake.calls) == 6
+
+
+def test_folder_errors_are_yielded(tmp_path, engine):
+    good, = write_images(tmp_path, 1)
+    broken = tmp_path / 'broken.png'; broken.write_bytes(b'not an image')
+    index = ocr.OcrIndex(str(tmp_path), str(tmp_path / 'index.sqlite'))
+    results = {os.path.basename(r[0]): r for r in engine.run_folder([good, str(broken), str(tmp_path / 'missing.png')], ocr.OcrOptions(), index)}
+    assert results['img00.png'][2] is None
+    assert results['broken.png'][2] and results['missing.png'][2]
+
+
+def test_cancel_stops_submitting(tmp_path, engine, fake):
+    paths = write_images(tmp_path, 20)
+    index = ocr.OcrIndex(str(tmp_path), str(tmp_path / 'index.sqlite'))
+    cancel_event = threading.Event()
+    fake.gate = threading.Event()
+    results = engine.run_folder(paths, ocr.OcrOptions(), index, cancel_event)
+    fake.gate.set()
+    first = next(results)
+    cancel_event.set()
+    rest = list(results)
+    # Só os arquivos que já estavam no pool (no máximo workers*2) terminam
+    assert first[2] is None and 1 + len(rest) <= engine.workers * 2 + 1
+    assert len(fake.calls) < len(paths)
+
+
+def test_missing_language_falls_back_to_default(engine, fake):
+    fake.languages = ['eng']
+    assert engine.submit_image(Image.new('RGB', (30, 30)), ocr.OcrOptions(lang='por')).result(5) == "texto 30x30"
+    assert fake.calls[-1][2] is None
+
+
+def test_tesseract_error_retries_without_language(fake):
+    fake.languages = []     # Idiomas desconhecidos: tenta o pedido e, se falhar, o padrão
+    assert ocr.recognize(Image.new('L', (20, 20)), ocr.OcrOptions(lang='falha')) == "texto 20x20"
+    assert [call[2] for call in fake.calls] == ['falha', None]
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+import pytest
+from PIL import Image, ImageOps
+import orientation
+from orientation import TAG_ORIENTATION, ORIENTATION_ELEMENTS, write_jpeg_orientation
+
+
+def pattern(size=(48, 32)):
+    # Quadrantes de cores diferentes: qualquer giro ou inversão errada muda o resultado
+    image = Image.new('RGB', size, (255, 0, 0))
+    image.paste((0, 255, 0), (size[0] // 2, 0, size[0], size[1] // 2))
+    image.paste((0, 0, 255), (0, size[1] // 2, size[0] // 2, size[1]))
+    return image
+
+
+def save_jpeg(path, exif=None):
+    kwargs = {'exif': exif.tobytes()} if exif is not None else {}
+    pattern().save(path, 'JPEG', quality=90, **kwargs)
+    return str(path)
+
+
+def scan_data(path):
+    # Dados comprimidos (do SOS em diante): não podem mudar ao gravar só a tag
+    with open(path, 'rb') as f:
+        segments = list(orientation._segments(f))
+        f.seek(segments[-1][1] + segments[-1][2]); return f.read()
+
+
+def read_tags(path):
+    with Image.open(path) as img: return dict(img.getexif()), img.info.get('jfif')
+
+
+def test_elements_match_exif_transpose():
+    image = pattern()
+    for value in ORIENTATION_ELEMENTS:
+        exif = Image.Exif(); exif[TAG_ORIENTATION] = value
+        tagged = image.copy(); tagged.info['exif'] = exif.tobytes()
+        assert orientation.apply_orientation(image, value).tobytes() == ImageOps.exif_transpose(tagged).tobytes(), value
+
+
+def test_existing_tag_is_patched_in_place(tmp_path):
+    exif = Image.Exif(); exif[TAG_ORIENTATION] = 1; exif[271] = "Camera"
+    path = save_jpeg(tmp_path / 'a.jpg', exif)
+    with open(path, 'rb') as f: before = f.read()
+    write_jpeg_orientation(path, 6)
+    with open(path, 'rb') as f: after = f.read()
+    assert len(after) == len(before) and sum(a != b for a, b in zip(before, after)) == 1
+    assert read_tags(path)[0] == {TAG_ORIENTATION: 6, 271: "Camera"}
+
+
+def test_missing_tag_is_inserted_without_recompressing(tmp_path):
+    path = save_jpeg(tmp_path / 'a.jpg')
+    data = scan_data(path)
+    write_jpeg_orientation(path, 8)
+    tags, jfif = read_tags(path)
+    assert tags == {TAG_ORIENTATION: 8} and jfif
+    assert scan_data(path) == data
+    with Image.open(path) as img: assert orientation.read_orientation(img) == 8
+    assert list(tmp_path.iterdir()) == [tmp_path / 'a.jpg']        # Sem arquivo temporário para trás
+
+
+def test_exif_without_orientation_keeps_other_tags(tmp_path):
+    exif = Image.Exif(); exif[271] = "Camera"; exif[272] = "Modelo"
+    path = save_jpeg(tmp_path / 'a.jpg', exif)
+    data = scan_data(path)
+    write_jpeg_orientation(path, 3)
+    assert read_tags(path)[0] == {TAG_ORIENTATION: 3, 271: "Camera", 272: "Modelo"}
+    assert scan_data(path) == data
+    with open(path, 'rb') as f: assert sum(1 for marker, _, _ in orientation._segments(f) if marker == 0xE1) == 1
+
+
+def test_non_jpeg_is_refused(tmp_path):
+    path = str(tmp_path / 'a.png'); pattern().save(path)
+    with open(path, 'rb') as f: before = f.read()
+    with pytest.raises(ValueError): write_jpeg_orientation(path, 6)
+    with open(path, 'rb') as f: assert f.read() == before
+
+
+def test_save_without_net_rotation_leaves_file_untouched(tmp_path, monkeypatch):
+    import visualizador
+    path = save_jpeg(tmp_path / 'a.jpg')
+    with open(path, 'rb') as f: before = f.read()
+    shown = []
+    monkeypatch.setattr(visualizador.messagebox, 'showinfo', lambda *args, **kwargs: shown.append(args))
+    monkeypatch.setattr(visualizador.messagebox, 'showerror', lambda *args, **kwargs: pytest.fail(f"erro exibido: {args}"))
+    for ops in ([], [('transpose', (0, 1)), ('transpose', (0, 3))]):
+        viewer = SimpleNamespace(history=SimpleNamespace(ops=ops), full_size=(48, 32), frame_source=None)
+        assert visualizador.ImageViewer.save_orientation_only(viewer, path)
+        with open(path, 'rb') as f: assert f.read() == before
+    assert len(shown) == 2
+
+
+def test_save_folds_every_transpose_into_the_tag(tmp_path, monkeypatch):
+    import visualizador
+    from edits import render
+    path = save_jpeg(tmp_path / 'a.jpg')
+    data = scan_data(path)
+    ops = [('transpose', (0, 1)), ('transpose', (0, 1)), ('transpose', (1, 0))]
+    with Image.open(path) as img: expected = render(img.convert('RGB'), ops)
+    monkeypatch.setattr(visualizador.messagebox, 'showinfo', lambda *args, **kwargs: None)
+    monkeypatch.setattr(visualizador.messagebox, 'showerror', lambda *args, **kwargs: pytest.fail(f"erro exibido: {args}"))
+    # Lista de transposições não fundidas: a tag gravada tem de refletir todas, não só a primeira
+    viewer = SimpleNamespace(history=SimpleNamespace(ops=ops, reset=lambda: None), full_size=(48, 32), frame_source=None,
+                             edited_full_size=lambda: (48, 32), edited_pil_image=None)
+    monkeypatch.setattr(visualizador.edits, 'optimize', lambda ops, size: list(ops))
+    assert visualizador.ImageViewer.save_orientation_only(viewer, path)
+    with Image.open(path) as img:
+        assert orientation.apply_orientation(img.convert('RGB'), orientation.read_orientation(img)).tobytes() == expected.tobytes()
+    assert scan_data(path) == data
+
+
+def test_tiff_is_rotated_once(tmp_path):
+    # O Pillow já aplica a tag do TIFF ao carregar: quem usa read_orientation não pode girar de novo
+    import pipeline
+    import metadata
+    from image_loader import decode_image
+    exif = Image.Exif(); exif[TAG_ORIENTATION] = 6
+    tagged = pattern(); tagged.info['exif'] = exif.tobytes()
+    expected = ImageOps.exif_transpose(tagged)
+    paths = {}
+    for fmt, ext in (('TIFF', 'tif'), ('PNG', 'png'), ('JPEG', 'jpg')):
+        paths[fmt] = str(tmp_path / f'a.{ext}'); pattern().save(paths[fmt], fmt, exif=exif.tobytes(), **({'quality': 95} if fmt == 'JPEG' else {}))
+        with Image.open(paths[fmt]) as img: assert orientation.stored_orientation(img) == 6
+        assert decode_image(paths[fmt], full=True).image.size == expected.size == (32, 48)
+        assert metadata.display_size(metadata.read_metadata(paths[fmt])) == (32, 48)
+    for fmt in ('TIFF', 'PNG'): assert decode_image(paths[fmt], full=True).image.tobytes() == expected.tobytes()
+    result = pipeline.normalize_orientation_file(paths['TIFF'])
+    assert not result['skipped']
+    with Image.open(paths['TIFF']) as img:
+        assert orientation.stored_orientation(img) == 1 and img.convert('RGB').tobytes() == expected.tobytes()
+    assert pipeline.normalize_orientation_file(paths['TIFF'])['skipped']
@@ -0,0 +1,180 @@
+import os
+import json
+import queue
+import threading
+from types import SimpleNamespace
+from PIL import Image
+import pipeline
+from pipeline import Manifest, StandardizeOptions, run_standardize
+from orientation import TAG_ORIENTATION
+
+
+def make_image(path, size=(64, 48), color=(200, 30, 30)):
+    Image.new('RGB', size, color).save(path)
+    return str(path)
+
+
+def test_standardize_image_fits_and_centers():
+    out = pipeline.standardize_image(Image.new('RGB', (100, 50), (255, 0, 0)), 40, 40, (0, 0, 255))
+    # 100x50 -> 40x20, centralizada: faixas de 10 linhas de borda em cima e embaixo
+    assert out.size == (40, 40)
+    assert out.getpixel((20, 20)) == (255, 0, 0)
+    assert out.getpixel((20, 5)) == out.getpixel((20, 35)) == (0, 0, 255)
+
+
+def test_iter_image_files_streams_folders_and_globs(tmp_path):
+    src = tmp_path / 'src'; (src / 'sub').mkdir(parents=True); (src / 'out').mkdir()
+    for name in ('a.png', 'sub/b.png', 'out/c.png'): make_image(src / name)
+    (src / 'notas.txt').write_text("x")
+    names = lambda found: sorted((os.path.relpath(path, root), root) for path, root in found)
+    assert names(pipeline.iter_image_files([str(src)])) == [('a.png', str(src))]
+    assert names(pipeline.iter_image_files([str(src)], recursive=True, exclude_dirs=[str(src / 'out')])) == [('a.png', str(src)), (os.path.join('sub', 'b.png'), str(src))]
+    # Padrão glob: a raiz é a parte fixa do padrão (preserva as subpastas na saída)
+    assert names(pipeline.iter_image_files([str(src / '**' / '*.png')], recursive=True)) == [('a.png', str(src)), (os.path.join('out', 'c.png'), str(src)), (os.path.join('sub', 'b.png'), str(src))]
+
+
+def test_run_batch_reports_each_file(tmp_path):
+    good = make_image(tmp_path / 'a.png'); broken = tmp_path / 'b.jpg'; broken.write_bytes(b'not an image')
+    options = StandardizeOptions(20, 10)
+    jobs = [(good, str(tmp_path / 'out' / 'a.png'), options), (str(broken), str(tmp_path / 'out' / 'b.jpg'), options)]
+    results = {os.path.basename(r['src']): r for r in pipeline.run_batch(jobs, workers=1)}
+    assert results['a.png']['ok'] and Image.open(results['a.png']['dst']).size == (20, 10)
+    assert not results['b.jpg']['ok'] and results['b.jpg']['error']
+
+
+def test_batch_command_prints_summary(tmp_path, capsys):
+    make_image(tmp_path / 'a.png'); make_image(tmp_path / 'b.png')
+    assert pipeline.main(['batch', str(tmp_path), '--size', '20x10', '--format', 'jpeg', '--workers', '1']) == 0
+    summary = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert summary['files'] == summary['succeeded'] == 2 and summary['failed'] == 0
+    assert sorted(os.listdir(tmp_path / pipeline.OUTPUT_DIR_NAME)) == ['a.jpg', 'b.jpg']
+    (tmp_path / 'c.png').write_bytes(b'quebrado')
+    assert pipeline.main(['batch', str(tmp_path), '--size', '20x10', '--workers', '1']) == 1
+
+
+def run_incremental(src_dir, out_dir, options):
+    files = pipeline.iter_image_files([str(src_dir)], exclude_dirs=[str(out_dir)])
+    return list(run_standardize(files, options, lambda root: str(out_dir), workers=1, incremental=True))
+
+
+def test_manifest_round_trip(tmp_path):
+    src = make_image(tmp_path / 'a.png'); dst = make_image(tmp_path / 'out.png')
+    signature = StandardizeOptions(32, 32).signature()
+    manifest = Manifest(str(tmp_path))
+    st = os.stat(src)
+    manifest.record({'src': src, 'dst': dst, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': 'abc'}, signature)
+    manifest.save()
+    reloaded = Manifest(str(tmp_path))
+    assert reloaded.check(src, dst, signature) == (True, 'abc')
+    # Parâmetros ou saída diferentes invalidam a entrada
+    assert reloaded.check(src, dst, StandardizeOptions(64, 64).signature()) == (False, None)
+    assert reloaded.check(src, str(tmp_path / 'other.png'), signature) == (False, None)
+    # Só o mtime mudou: desatualizada, mas o hash conhecido é devolvido para comparação no pool
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert reloaded.check(src, dst, signature) == (False, 'abc')
+
+
+def test_manifest_prune_removes_orphan_outputs(tmp_path):
+    src = make_image(tmp_path / 'a.png'); dst = make_image(tmp_path / 'out.png')
+    manifest = Manifest(str(tmp_path))
+    manifest.record({'src': src, 'dst': dst, 'size': 1, 'mtime_ns': 1, 'hash': 'x'}, {})
+    assert manifest.prune() == []
+    os.remove(src)
+    assert manifest.prune() == [os.path.abspath(dst)]
+    assert not os.path.exists(dst) and manifest.entries == {}
+
+
+def test_corrupt_manifest_is_ignored(tmp_path):
+    (tmp_path / pipeline.MANIFEST_NAME).write_text("{not json", encoding='utf-8')
+    assert Manifest(str(tmp_path)).entries == {}
+
+
+def test_incremental_batch_skips_unchanged_sources(tmp_path):
+    src_dir = tmp_path / 'src'; out_dir = tmp_path / 'out'; src_dir.mkdir()
+    first = make_image(src_dir / 'a.png'); make_image(src_dir / 'b.png', color=(0, 0, 255))
+    options = StandardizeOptions(32, 32)
+
+    results = run_incremental(src_dir, out_dir, options)
+    assert sorted(r['ok'] and not r['skipped'] for r in results) == [True, True]
+    assert all(Image.open(r['dst']).size == (32, 32) for r in results)
+
+    assert all(r['skipped'] for r in run_incremental(src_dir, out_dir, options))
+
+    # Arquivo tocado sem mudar o conteúdo: o hash confirma que a saída continua válida
+    st = os.stat(first); os.utime(first, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    touched = {os.path.basename(r['src']): r for r in run_incremental(src_dir, out_dir, options)}
+    assert touched['a.png']['skipped'] and touched['a.png']['ok']
+
+    # Conteúdo novo: reprocessado
+    make_image(src_dir / 'a.png', size=(80, 20))
+    changed = {os.path.basename(r['src']): r for r in run_incremental(src_dir, out_dir, options)}
+    assert not changed['a.png']['skipped'] and changed['b.png']['skipped']
+
+    # Origem apagada: a saída correspondente é removida
+    os.remove(src_dir / 'b.png')
+    removed = [r for r in run_incremental(src_dir, out_dir, options) if r.get('removed')]
+    assert [os.path.basename(r['dst']) for r in removed] == ['b.png']
+
+
+def test_failed_file_is_reported_not_raised(tmp_path):
+    src_dir = tmp_path / 'src'; src_dir.mkdir()
+    (src_dir / 'broken.jpg').write_bytes(b'not an image')
+    results = run_incremental(src_dir, tmp_path / 'out', StandardizeOptions(32, 32))
+    assert len(results) == 1 and not results[0]['ok'] and results[0]['error']
+
+
+def test_manifest_is_flushed_during_and_after_an_interrupted_batch(tmp_path, monkeypatch):
+    src_dir = tmp_path / 'src'; out_dir = tmp_path / 'out'; src_dir.mkdir()
+    for i in range(5): make_image(src_dir / f'{i}.png')
+    monkeypatch.setattr(pipeline, 'MANIFEST_FLUSH_RECORDS', 2)
+    saved = lambda: len(Manifest(str(out_dir)).entries)
+    files = pipeline.iter_image_files([str(src_dir)], exclude_dirs=[str(out_dir)])
+    results = run_standardize(files, StandardizeOptions(32, 32), lambda root: str(out_dir), workers=1, incremental=True)
+    # A cada 2 registros o manifesto vai para o disco, sem esperar o fim do lote
+    assert saved() == 0 and next(results)['ok'] and saved() == 0
+    assert next(results)['ok'] and saved() == 2
+    assert next(results)['ok'] and saved() == 2
+    # Lote abandonado no meio: o 'finally' grava o que já foi feito, e a próxima execução não refaz esses arquivos
+    results.close()
+    assert saved() == 3
+    assert sum(bool(r.get('skipped')) for r in run_incremental(src_dir, out_dir, StandardizeOptions(32, 32))) == 3
+
+
+def test_batch_window_reports_pipeline_crash():
+    # A thread do lote repassa a exceção do pipeline para a janela em vez de só sinalizar o fim
+    from visualizador import BatchProgressWindow
+
+    def run(cancel_event):
+        yield {'src': 'a.jpg', 'ok': True}
+        raise RuntimeError("disco cheio")
+    window = SimpleNamespace(results=queue.Queue(), cancel_event=threading.Event())
+    BatchProgressWindow.run_jobs(window, run)
+    items = [window.results.get_nowait() for _ in range(3)]
+    assert items[0] == {'src': 'a.jpg', 'ok': True}
+    assert isinstance(items[1], RuntimeError) and items[2] is None
+
+
+def test_standardize_applies_exif_orientation(tmp_path):
+    # Retrato gravado "deitado" com a tag 6: a saída deve sair em pé, como o visualizador mostra
+    image = Image.new('RGB', (60, 40), (255, 0, 0)); image.paste((0, 0, 255), (0, 0, 30, 40))
+    exif = Image.Exif(); exif[TAG_ORIENTATION] = 6
+    src = str(tmp_path / 'a.jpg'); image.save(src, exif=exif.tobytes(), quality=95)
+    dst = str(tmp_path / 'out.png')
+    pipeline.standardize_file(src, dst, StandardizeOptions(40, 60, pad_color=(0, 255, 0)))
+    with Image.open(dst) as out:
+        assert out.size == (40, 60)
+        # Sem borda de preenchimento (a proporção bate depois de girar); metade azul em cima, como exif_transpose
+        top, bottom = out.getpixel((20, 10)), out.getpixel((20, 50))
+        assert top[2] > 200 and top[0] < 60 and bottom[0] > 200 and bottom[2] < 60
+
+
+def test_normalize_orientation_keeps_multipage_files(tmp_path):
+    # TIFF de 3 páginas com a tag 6: regravar só a primeira perderia as outras duas
+    pages = [Image.new('RGB', (30, 20), color) for color in ('red', 'green', 'blue')]
+    exif = Image.Exif(); exif[TAG_ORIENTATION] = 6
+    path = str(tmp_path / 'a.tif'); pages[0].save(path, save_all=True, append_images=pages[1:], exif=exif.tobytes())
+    with open(path, 'rb') as f: before = f.read()
+    results = list(pipeline.run_normalize_orientation([(path, str(tmp_path))], workers=1))
+    assert len(results) == 1 and not results[0]['ok'] and 'páginas' in results[0]['error']
+    with open(path, 'rb') as f: assert f.read() == before
+    with Image.open(path) as img: assert img.n_frames == 3
@@ -0,0 +1,52 @@
+import json
+import threading
+import profiling
+from profiling import Profiler
+
+
+def test_chrome_trace_is_valid_trace_event_json(tmp_path):
+    profiler = Profiler(enabled=True)
+    with profiler.stage('load'):
+        with profiler.stage('decode'): sum(range(1000))
+
+    def thumbnail():
+        with profiler.stage('thumbnail'): pass
+    worker = threading.Thread(target=thumbnail, name="Miniaturas")
+    worker.start(); worker.join()
+    path = tmp_path / 'trace.json'
+    assert profiler.export_chrome_trace(str(path)) == 3
+    trace = json.loads(path.read_text(encoding='utf-8'))
+    assert set(trace) == {'traceEvents', 'displayTimeUnit'} and trace['displayTimeUnit'] == 'ms'
+    complete = {e['name']: e for e in trace['traceEvents'] if e['ph'] == 'X'}
+    meta = [e for e in trace['traceEvents'] if e['ph'] == 'M']
+    assert sorted(complete) == ['decode', 'load', 'thumbnail']
+    for event in complete.values():
+        assert set(event) == {'name', 'ph', 'pid', 'tid', 'ts', 'dur'}
+        assert isinstance(event['pid'], int) and isinstance(event['tid'], int)
+        assert isinstance(event['ts'], (int, float)) and event['ts'] >= 0 and event['dur'] >= 0
+    # Etapa aninhada fica dentro da externa, na mesma thread (microssegundos)
+    load, decode = complete['load'], complete['decode']
+    assert load['tid'] == decode['tid'] != complete['thumbnail']['tid']
+    assert load['ts'] <= decode['ts'] and decode['ts'] + decode['dur'] <= load['ts'] + load['dur']
+    # Um metadado 'thread_name' por thread que aparece nos eventos
+    assert sorted(e['tid'] for e in meta) == sorted({e['tid'] for e in complete.values()})
+    assert all(e['name'] == 'thread_name' and isinstance(e['args']['name'], str) for e in meta)
+
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    profiler = Profiler()
+    with profiler.stage('decode'): pass
+    assert profiler.summary() == {} and profiler.export_chrome_trace(str(tmp_path / 't.json')) == 0
+    assert json.loads((tmp_path / 't.json').read_text(encoding='utf-8'))['traceEvents'] == []
+
+
+def test_summary_and_bounded_history(monkeypatch):
+    monkeypatch.setattr(profiling, 'TRACE_MAX_EVENTS', 5)
+    profiler = Profiler(enabled=True, history=3)
+    for ms in (1, 2, 3, 4, 10): profiler.record('decode', 0, ms * 1_000_000)
+    profiler.record('resize', 0, 500_000)
+    last, mean, peak, count = profiler.summary()['decode']
+    assert (last, peak, count) == (10.0, 10.0, 3) and abs(mean - 17 / 3) < 1e-9
+    assert list(profiler.summary()) == ['decode', 'resize'] and len(profiler._events) == 5
+    profiler.clear()
+    assert profiler.summary() == {} and not profiler._events
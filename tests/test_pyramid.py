@@ -0,0 +1,89 @@
+import zlib
+import struct
+import pytest
+from PIL import Image, ImageChops, ImageStat, TiffImagePlugin
+import pyramid
+
+SIZE = (700, 600)       # Não múltiplo de TILE: a última linha/coluna de blocos fica incompleta
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+
+
+def source():
+    return Image.effect_mandelbrot(SIZE, (-2, -1.2, 1, 1.2), 40).convert('RGB')
+
+
+def assemble(path):
+    out = Image.new('RGB', SIZE)
+    for y, band in pyramid.iter_bands(path): out.paste(band, (0, y))
+    return out
+
+
+def tiled_tiff(path, image, tile=128):
+    # TIFF em blocos com deflate (o Pillow só grava TIFF em strips)
+    cols, rows = -(-image.width // tile), -(-image.height // tile)
+    blocks = [zlib.compress(image.crop((c * tile, r * tile, (c + 1) * tile, (r + 1) * tile)).tobytes()) for r in range(rows) for c in range(cols)]
+    ifd = TiffImagePlugin.ImageFileDirectory_v2()
+    for tag, value, typ in ((256, image.width, 4), (257, image.height, 4), (258, (8, 8, 8), 3), (259, 8, 3), (262, 2, 3), (277, 3, 3),
+                            (322, tile, 3), (323, tile, 3), (324, (0,) * len(blocks), 4), (325, tuple(map(len, blocks)), 4)):
+        ifd[tag] = value; ifd.tagtype[tag] = typ
+    start = 8 + len(ifd.tobytes(8)); offsets = []
+    for block in blocks: offsets.append(start); start += len(block)
+    ifd[324] = tuple(offsets)
+    with open(path, 'wb') as f: f.write(b'II*\x00' + struct.pack('<I', 8) + ifd.tobytes(8) + b''.join(blocks))
+    return str(path)
+
+
+@pytest.mark.parametrize('compression', [None, 'tiff_lzw', 'tiff_adobe_deflate', 'packbits', 'jpeg'])
+def test_tiff_is_read_band_by_band(tmp_path, monkeypatch, compression):
+    path = str(tmp_path / 'a.tif'); source().save(path, compression=compression)
+    # Com 0,1 MB a decodificação inteira (1,2 MB) falharia: só a leitura em faixas passa
+    monkeypatch.setattr(pyramid, 'DECODE_BUDGET_MB', 0.1)
+    with Image.open(path) as img: expected = img.convert('RGB')
+    assert assemble(path).tobytes() == expected.tobytes()
+
+
+def test_tiled_tiff_is_read_band_by_band(tmp_path, monkeypatch):
+    image = source(); path = tiled_tiff(tmp_path / 'a.tif', image)
+    monkeypatch.setattr(pyramid, 'DECODE_BUDGET_MB', 0.5)
+    with Image.open(path) as img: assert pyramid._tiff_blocks(img)[0]
+    assert assemble(path).tobytes() == image.tobytes()
+
+
+def test_large_jpeg_starts_at_a_draft_level(tmp_path, monkeypatch):
+    path = str(tmp_path / 'a.jpg'); source().save(path, quality=95)
+    monkeypatch.setattr(pyramid, 'DECODE_BUDGET_MB', 0.5)
+    with Image.open(path) as img: assert pyramid.source_level(img) == 1
+    built = pyramid.build_pyramid(path)
+    assert built.base == 1 and built.levels == pyramid.level_sizes(SIZE)
+    assert pyramid.TilePyramid.open(path).base == 1
+    assert built.level_for_zoom(1.0) == 1 and built.level_for_zoom(0.1) == len(built.levels) - 1
+    expected = source().resize((350, 300), Image.Resampling.BOX)
+    assert sum(ImageStat.Stat(ImageChops.difference(built.region(1, (0, 0, 350, 300)), expected)).mean) / 3 < 4
+    built.close()
+
+
+def test_unstreamable_source_over_budget_is_refused(tmp_path, monkeypatch):
+    path = str(tmp_path / 'a.png'); source().save(path)
+    monkeypatch.setattr(pyramid, 'DECODE_BUDGET_MB', 0.5)
+    with pytest.raises(ValueError, match="não pode ser lido em faixas"): pyramid.build_pyramid(path)
+
+
+def test_built_pyramid_matches_the_source(tmp_path):
+    image = source(); path = str(tmp_path / 'a.tif'); image.save(path, compression='tiff_lzw')
+    built = pyramid.build_pyramid(path)
+    assert built.base == 0 and built.full_size == SIZE
+    assert built.region(0, (0, 0) + SIZE).tobytes() == image.tobytes()
+    assert built.region(1, (0, 0, 350, 300)).tobytes() == image.reduce(2).tobytes()
+    built.close()
+
+
+def test_open_large_keeps_the_global_limit(tmp_path, monkeypatch):
+    path = str(tmp_path / 'a.png'); source().save(path)
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    with pytest.raises(Image.DecompressionBombError): Image.open(path)
+    with pyramid.open_large(path) as img: assert img.size == SIZE
+    assert Image.MAX_IMAGE_PIXELS == 1000
@@ -0,0 +1,56 @@
+import pytest
+from PIL import Image
+from rendering import visible_region, render_region, preview_resample
+
+NEAREST = Image.Resampling.NEAREST
+
+
+def noise(size=(10, 8)):
+    return Image.effect_noise(size, 80).convert('RGB')
+
+
+def test_whole_image_inside_the_canvas():
+    box, position, size, full = visible_region((100, 50), 2.0, (10, 20), (300, 200))
+    assert (box, position, size, full) == ((0.0, 0.0, 100.0, 50.0), (10, 20), (200, 100), True)
+
+
+@pytest.mark.parametrize('origin', [(-200, 0), (300, 0), (0, 200), (0, -100), (-400, -300)])
+def test_region_fully_off_screen_is_none(origin):
+    # Imagem 200x100 na tela: encostada na borda (sem sobreposição) também não desenha nada
+    assert visible_region((100, 50), 2.0, origin, (300, 200)) is None
+    assert render_region(noise((100, 50)), 2.0, origin, (300, 200)) is None
+
+
+def test_zoom_at_the_top_left_boundary():
+    # Imagem ampliada começando fora do canvas: o recorte começa dentro da imagem, na posição (0, 0) da tela
+    box, position, size, full = visible_region((100, 50), 4.0, (-40, -20), (120, 80))
+    assert position == (0, 0) and size == (120, 80) and not full
+    assert box == (10.0, 5.0, 40.0, 25.0)
+
+
+def test_image_ending_exactly_at_the_canvas_edge():
+    box, position, size, full = visible_region((100, 50), 2.0, (100, 100), (300, 200))
+    assert box == (0.0, 0.0, 100.0, 50.0) and position == (100, 100) and size == (200, 100) and full
+
+
+def test_fractional_origin_rounds_outwards_and_box_stays_inside_the_image():
+    # Bordas fracionárias: a região na tela cobre os pixels parcialmente visíveis, e o recorte não passa da imagem
+    box, position, size, full = visible_region((100, 50), 1.5, (-0.3, 10.6), (149, 90))
+    assert position == (0, 10) and size == (149, 76)
+    assert box[0] == pytest.approx(0.2) and box[1] == 0.0 and box[2] == pytest.approx(149.3 / 1.5) and box[3] == 50.0
+    assert 0 <= box[0] < box[2] <= 100 and 0 <= box[1] < box[3] <= 50 and not full
+
+
+def test_render_region_matches_a_crop_of_the_full_resize():
+    image = noise()
+    for zoom, origin, canvas in ((2.0, (-5, -3), (12, 9)), (3.0, (4, 2), (40, 30)), (2.0, (-10, -8), (6, 6))):
+        scaled, position, full = render_region(image, zoom, origin, canvas, NEAREST)
+        big = image.resize((int(image.width * zoom), int(image.height * zoom)), NEAREST)
+        crop = (position[0] - origin[0], position[1] - origin[1], position[0] - origin[0] + scaled.width, position[1] - origin[1] + scaled.height)
+        assert scaled.tobytes() == big.crop(crop).tobytes()
+    assert render_region(image, 3.0, (4, 2), (40, 30), NEAREST)[2]
+
+
+def test_preview_resample_by_zoom():
+    assert preview_resample(1.0) == preview_resample(4.0) == NEAREST
+    assert preview_resample(0.5) == Image.Resampling.BILINEAR
@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import stat
+import queue
+import socket
+import pytest
+import single_instance
+from single_instance import InstanceServer, hand_off
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+
+
+@pytest.fixture
+def server():
+    server = InstanceServer()
+    yield server
+    server.close()
+
+
+def send_raw(port, payload):
+    with socket.create_connection(('127.0.0.1', port), timeout=2) as conn:
+        conn.sendall(payload)
+        return conn.makefile('rb').readline()
+
+
+def test_hand_off_round_trip(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert hand_off('foto.jpg', timeout=2)
+    assert server.requests.get(timeout=2) == str(tmp_path / 'foto.jpg')
+    assert hand_off(str(tmp_path / 'outra.png'), timeout=2) and server.requests.get(timeout=2) == str(tmp_path / 'outra.png')
+
+
+def test_wrong_token_or_garbage_is_ignored(server):
+    for payload in (json.dumps({'token': 'x' * 32, 'paths': ['/tmp/a.jpg']}).encode() + b'\n', json.dumps({'paths': ['/tmp/a.jpg']}).encode() + b'\n',
+                    b'isto nao e json\n', b'\xff\xfe\n'):
+        assert send_raw(server.port, payload) == b''
+    # Caminhos que não são texto são descartados mesmo com o código certo; o servidor continua atendendo
+    assert send_raw(server.port, json.dumps({'token': server.token, 'paths': [42, '/tmp/b.jpg']}).encode() + b'\n') == b'ok\n'
+    assert server.requests.get(timeout=2) == '/tmp/b.jpg'
+    with pytest.raises(queue.Empty): server.requests.get_nowait()
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="permissões POSIX")
+def test_port_file_is_private(server):
+    path = single_instance._port_file()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path, encoding='utf-8') as f: info = json.load(f)
+    assert info == {'port': server.port, 'token': server.token, 'pid': os.getpid()}
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith('.tmp')]
+
+
+def test_no_window_means_no_hand_off(tmp_path):
+    assert not hand_off(str(tmp_path / 'a.jpg'))                    # Sem arquivo de porta
+    server = InstanceServer(); server.close()
+    assert not os.path.exists(single_instance._port_file())
+    # Arquivo deixado por uma janela que fechou sem apagá-lo: a porta não responde
+    with open(single_instance._port_file(), 'w', encoding='utf-8') as f: json.dump({'port': server.port, 'token': server.token}, f)
+    assert not hand_off(str(tmp_path / 'a.jpg'))
+
+
+def test_close_keeps_the_port_file_of_a_newer_window():
+    older = InstanceServer(); newer = InstanceServer()
+    older.close()
+    with open(single_instance._port_file(), encoding='utf-8') as f: assert json.load(f)['token'] == newer.token
+    assert hand_off('a.jpg', timeout=2) and newer.requests.get(timeout=2) == os.path.abspath('a.jpg')
+    newer.close()
+    assert not os.path.exists(single_instance._port_file())
@@ -0,0 +1,78 @@
+import io
+import time
+import sqlite3
+import itertools
+import threading
+from types import SimpleNamespace
+import pytest
+from PIL import Image
+import thumbnails
+from thumbnails import ThumbnailStore, ThumbnailLoader, make_thumbnail
+from orientation import TAG_ORIENTATION
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Relógio que só avança quando lido: a ordem de uso fica determinística
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(thumbnails, 'time', SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_store_evicts_least_recently_used(tmp_path, clock):
+    store = ThumbnailStore(str(tmp_path / 't.sqlite'), max_mb=1000 / (1024 * 1024))
+    store.put('a', 1, 1, b'a' * 400); store.put('b', 1, 1, b'b' * 400)
+    assert store.get('a', 1, 1) == b'a' * 400       # 'a' passa a ser a mais recente
+    store.put('c', 1, 1, b'c' * 400)                # 1200 > 1000: descarta até 90% do limite
+    assert store.get('b', 1, 1) is None and store.get('a', 1, 1) and store.get('c', 1, 1)
+    assert store.total_bytes == 800
+    # Substituir uma entrada não conta os bytes duas vezes
+    store.put('c', 1, 1, b'c' * 100)
+    assert store.total_bytes == 500
+
+
+def test_store_drops_changed_files(tmp_path):
+    store = ThumbnailStore(str(tmp_path / 't.sqlite'))
+    store.put('a', 10, 111, b'x' * 50)
+    assert store.get('a', 10, 111) == b'x' * 50
+    assert store.get('a', 10, 222) is None and store.get('a', 10, 111) is None and store.total_bytes == 0
+
+
+def test_store_discards_thumbnails_from_older_versions(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 't.sqlite')
+    store = ThumbnailStore(db_path); store.put('a', 1, 1, b'x' * 10); store.flush(); store._conn.close()
+    reopened = ThumbnailStore(db_path)
+    assert reopened.get('a', 1, 1) == b'x' * 10 and reopened.total_bytes == 10
+    reopened._conn.close()
+    monkeypatch.setattr(thumbnails, 'STORE_VERSION', thumbnails.STORE_VERSION + 1)
+    upgraded = ThumbnailStore(db_path)
+    assert upgraded.get('a', 1, 1) is None and upgraded.total_bytes == 0
+    upgraded._conn.close()
+    with sqlite3.connect(db_path) as conn: assert conn.execute("PRAGMA user_version").fetchone()[0] == thumbnails.STORE_VERSION
+
+
+def test_make_thumbnail_applies_exif_orientation(tmp_path):
+    exif = Image.Exif(); exif[TAG_ORIENTATION] = 6
+    path = str(tmp_path / 'a.jpg'); Image.new('RGB', (400, 200)).save(path, exif=exif.tobytes())
+    with Image.open(io.BytesIO(make_thumbnail(path))) as thumb: assert thumb.size == (64, 128)
+
+
+def test_loader_skips_superseded_requests(tmp_path):
+    paths = []
+    for name in 'abcde':
+        Image.new('RGB', (32, 32), 'red').save(tmp_path / f'{name}.png'); paths.append(str(tmp_path / f'{name}.png'))
+    store = ThumbnailStore(str(tmp_path / 't.sqlite'))
+    loader = ThumbnailLoader(store, workers=0)
+    grid, strip = object(), object()
+    loader.request(paths[:3], grid)
+    loader.request(paths[3:4], grid)               # A grade rolou: a, b e c não são mais pedidos por ela
+    loader.request(paths[4:], strip)
+    loader.request([paths[0], paths[3]], strip)    # A tira troca 'e' por 'a' e 'd', que a grade também pediu
+    threading.Thread(target=loader._run, daemon=True).start()
+    delivered = [loader.results.get(timeout=10)]
+    deadline = time.monotonic() + 10
+    while not loader._requests.empty() and time.monotonic() < deadline: time.sleep(0.01)
+    time.sleep(0.1)
+    while not loader.results.empty(): delivered.append(loader.results.get_nowait())
+    # Só o último pedido de cada dono vale, e 'd' é entregue uma única vez para os dois
+    assert [path for path, data in delivered] == [paths[3], paths[0]] and all(data for _, data in delivered)
+    assert all(not waiting for _, waiting in loader._pending.values())
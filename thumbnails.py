@@ -0,0 +1,124 @@
+# ===================================================================
+#         MINIATURAS: CACHE PERSISTENTE EM DISCO + GERAÇÃO EM FUNDO
+# ===================================================================
+# As miniaturas (JPEG) ficam num SQLite na pasta de cache do usuário,
+# chaveadas por caminho e validadas por tamanho + mtime do arquivo.
+# O total é limitado e as menos usadas recentemente são descartadas.
+import io
+import os
+import time
+import queue
+import sqlite3
+import itertools
+import threading
+from PIL import Image
+from storage import user_cache_dir
+from orientation import read_orientation, apply_orientation
+
+THUMB_SIZE = 128
+MAX_SOURCE_PIXELS = 150_000_000     # Imagens maiores (modo de blocos) não são decodificadas só para gerar a miniatura
+STORE_VERSION = 1       # Miniaturas de versões anteriores (sem a orientação EXIF aplicada) são descartadas
+
+
+def make_thumbnail(path, size=THUMB_SIZE):
+    with Image.open(path) as img:
+        if img.format != 'JPEG' and img.width * img.height > MAX_SOURCE_PIXELS: raise ValueError(f"imagem grande demais para miniatura: {img.size}")
+        img.draft('RGB', (size, size))      # JPEG: decodifica direto em 1/2..1/8 da resolução
+        orientation = read_orientation(img)
+        img.thumbnail((size, size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        thumb = apply_orientation(img.convert('RGB') if img.mode != 'RGB' else img.copy(), orientation)
+    buffer = io.BytesIO()
+    thumb.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class ThumbnailStore:
+    def __init__(self, db_path=None, max_mb=200):
+        self.db_path = db_path or os.path.join(user_cache_dir(), 'thumbnails.sqlite')
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS thumbs (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, data BLOB, nbytes INTEGER, last_used REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS thumbs_last_used ON thumbs (last_used)")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < STORE_VERSION:
+            self._conn.execute("DELETE FROM thumbs"); self._conn.execute(f"PRAGMA user_version = {STORE_VERSION}"); self._conn.commit()
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM thumbs").fetchone()[0]
+
+    def get(self, path, size, mtime_ns):
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, data FROM thumbs WHERE path = ?", (path,)).fetchone()
+            if row is None: return None
+            if (row[0], row[1]) != (size, mtime_ns):
+                # O arquivo mudou: a miniatura antiga não vale mais
+                self._delete(path); self._conn.commit(); return None
+            self._touched[path] = time.time()
+            return row[2]
+
+    def put(self, path, size, mtime_ns, data):
+        with self._lock:
+            self._delete(path)
+            self._conn.execute("INSERT INTO thumbs VALUES (?, ?, ?, ?, ?, ?)", (path, size, mtime_ns, data, len(data), time.time()))
+            self.total_bytes += len(data)
+            self._flush_touched()
+            if self.total_bytes > self.max_bytes: self._evict()
+            self._conn.commit()
+
+    def flush(self):
+        with self._lock: self._flush_touched(); self._conn.commit()
+
+    def _delete(self, path):
+        row = self._conn.execute("SELECT nbytes FROM thumbs WHERE path = ?", (path,)).fetchone()
+        if row: self._conn.execute("DELETE FROM thumbs WHERE path = ?", (path,)); self.total_bytes -= row[0]
+
+    def _flush_touched(self):
+        # Os acessos são acumulados e gravados em lote para não escrever no banco a cada leitura
+        if self._touched:
+            self._conn.executemany("UPDATE thumbs SET last_used = ? WHERE path = ?", [(t, p) for p, t in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        for path, nbytes in self._conn.execute("SELECT path, nbytes FROM thumbs ORDER BY last_used").fetchall():
+            if self.total_bytes <= target: break
+            self._conn.execute("DELETE FROM thumbs WHERE path = ?", (path,)); self.total_bytes -= nbytes
+
+
+class ThumbnailLoader:
+    # Threads de fundo que entregam miniaturas (do cache em disco ou recém-geradas).
+    # Cada dono (uma vista) tem só o último pedido válido: as entradas de pedidos anteriores
+    # são descartadas ao sair da fila, como no Prefetcher, e a fila não cresce com a rolagem.
+    def __init__(self, store, workers=2):
+        self.store = store
+        self.results = queue.Queue()       # (caminho, bytes JPEG ou None), lida pelo loop do Tk
+        self._requests = queue.Queue()
+        self._counter = itertools.count(1)
+        self._pending = {}                 # dono -> (geração do último pedido, caminhos ainda não entregues)
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"PixelVista-Thumbs-{i}", daemon=True).start()
+
+    def request(self, paths, owner=None):
+        # Substitui o pedido anterior do mesmo dono; dentro do pedido a ordem da lista é respeitada
+        with self._lock:
+            generation = next(self._counter)
+            self._pending[owner] = (generation, set(paths))
+        for path in paths: self._requests.put((owner, generation, path))
+
+    def _run(self):
+        while True:
+            owner, generation, path = self._requests.get()
+            with self._lock:
+                current, waiting = self._pending.get(owner, (None, ()))
+                if generation != current or path not in waiting: continue      # Pedido substituído, ou já entregue
+                # O resultado vai para todas as vistas: nenhum outro dono precisa pedir este caminho de novo
+                for _, other in self._pending.values(): other.discard(path)
+            try:
+                st = os.stat(path)
+                data = self.store.get(path, st.st_size, st.st_mtime_ns)
+                if data is None:
+                    data = make_thumbnail(path)
+                    self.store.put(path, st.st_size, st.st_mtime_ns, data)
+            except Exception: data = None
+            self.results.put((path, data))
@@ -1,19 +1,24 @@
 # ===================================================================
 #                      IMPORTAÇÃO DE BIBLIOTECAS
 # ===================================================================
+import io
 import os
 import sys
-import webbrowser
+import time
+import queue
+import bisect
+import threading
 import tkinter as tk
-from tkinter import filedialog, simpledialog, messagebox, font
-from PIL import Image, ImageTk, ImageEnhance, ImageOps
-
-# Tenta importar o pytesseract
-try:
-    import pytesseract
-    HAS_OCR = True
-except ImportError:
-    HAS_OCR = False
+from tkinter import filedialog, simpledialog, messagebox, font, ttk
+from PIL import Image, ImageTk
+from image_loader import ImageCache, Prefetcher, decode_image, fit_size
+from rendering import render_region, preview_resample
+from profiling import profiler
+import edits
+from collections import OrderedDict
+import orientation
+# Os módulos de cada recurso (lote, OCR, duplicatas, miniaturas, pasta, blocos, quadros...) são importados
+# só quando o recurso é usado: a abertura carrega apenas o necessário para mostrar a primeira imagem
 
 # ===================================================================
 #                      ★ ÁREA DE CUSTOMIZAÇÃO DA MARCA ★
@@ -33,53 +38,53 @@ FONT_TUPLE = ("Segoe UI", 10)
 FONT_TUPLE_BOLD = ("Segoe UI", 12, "bold")
 FONT_ICON = ("Segoe UI", 12)
 
+# --- Desempenho ---
+CACHE_MAX_MB = 512      # Memória máxima do cache de imagens decodificadas
+PREFETCH_DEPTH = 2      # Quantas imagens pré-carregar na direção da navegação
+PROGRESSIVE_RENDER = True   # Zoom/pan desenham primeiro uma prévia rápida e depois refinam com LANCZOS
+REFINE_DELAY_MS = 150       # Tempo sem entrada do usuário antes do refinamento em alta qualidade
+BATCH_WORKERS = os.cpu_count() or 1     # Processos usados pela padronização em lote
+HISTORY_MAX_MB = 256    # Memória máxima das cópias guardadas para desfazer
+THUMB_CACHE_MB = 200    # Tamanho máximo do cache de miniaturas em disco
+THUMB_MEMORY_COUNT = 600    # Miniaturas mantidas em memória (PhotoImage) para a tira e a grade
+OCR_WORKERS = os.cpu_count() or 1       # Processos do Tesseract em paralelo (OCR da pasta inteira)
+PERF_OVERLAY_REFRESH_MS = 500    # Atualização do painel de desempenho (tecla P)
+DUPLICATE_WORKERS = os.cpu_count() or 1     # Processos que calculam os hashes na busca de duplicatas
+TILED_MIN_PIXELS = 150_000_000      # Acima disso a imagem é exibida por uma pirâmide de blocos em disco (ver pyramid.py)
+WINDOW_SIZE = (1200, 750)       # Tamanho inicial da janela; a imagem de abertura é decodificada para ele antes de o canvas existir
+INSTANCE_POLL_MS = 100          # Verificação dos arquivos entregues por outras execuções (ver single_instance.py)
+
 # ===================================================================
 #                      CLASSE PRINCIPAL DO APLICATIVO
 # ===================================================================
 class ImageViewer(tk.Tk):
-    def __init__(self, file_path=None): 
+    def __init__(self, file_path=None, cache_mb=CACHE_MAX_MB, prefetch_depth=PREFETCH_DEPTH, progressive_render=PROGRESSIVE_RENDER, refine_delay_ms=REFINE_DELAY_MS, history_mb=HISTORY_MAX_MB, tiled_min_pixels=TILED_MIN_PIXELS, instance_server=None, on_first_image=None):
         super().__init__()
         self.title(NOME_DO_APP)
-        self.geometry("1200x750")
+        self.geometry(f"{WINDOW_SIZE[0]}x{WINDOW_SIZE[1]}")
 
-        # --- CONFIGURAÇÃO DO OCR PORTÁTIL ---
-        if HAS_OCR:
-            try:
-                if hasattr(sys, '_MEIPASS'):
-                    # Se estiver rodando como .exe (pasta temporária)
-                    base_path = sys._MEIPASS
-                else:
-                    # Se estiver rodando como script .py (pasta atual)
-                    base_path = os.path.dirname(os.path.abspath(__file__))
-                
-                # Define o caminho para a pasta do Tesseract dentro do projeto/exe
-                tesseract_folder = os.path.join(base_path, 'Tesseract-OCR')
-                tesseract_exe = os.path.join(tesseract_folder, 'tesseract.exe')
-                
-                # Verifica se o executável existe no local esperado
-                if os.path.exists(tesseract_exe):
-                    pytesseract.pytesseract.tesseract_cmd = tesseract_exe
-                    # Configura onde estão os dados de linguagem (pasta tessdata)
-                    # Isso é CRUCIAL para funcionar portatilmente
-                    tessdata_dir = os.path.join(tesseract_folder, 'tessdata')
-                    os.environ['TESSDATA_PREFIX'] = tessdata_dir
-                else:
-                    # Fallback: tenta procurar na instalação padrão do Windows se não achar a portátil
-                    # Isso é útil se você esquecer de copiar a pasta antes de rodar o script py
-                    default_path = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-                    if os.path.exists(default_path):
-                        pytesseract.pytesseract.tesseract_cmd = default_path
+        # Cache de imagens decodificadas e pré-carregamento dos vizinhos.
+        # A imagem pedida na linha de comando começa a ser decodificada já, enquanto o resto da janela é montado.
+        self.image_cache = ImageCache(cache_mb)
+        self.prefetcher = Prefetcher(self.image_cache)
+        self.prefetch_depth = prefetch_depth
+        self.nav_direction = 1
+        self.tiled_min_pixels = tiled_min_pixels
+        if file_path: self.prefetch_startup_file(file_path)
+        self.startup_reported = not file_path      # Tempo até a primeira imagem: só medido ao abrir um arquivo
+        self.on_first_image = on_first_image        # on_first_image(janela, ms) logo após esse tempo ser medido
 
-            except Exception as e:
-                print(f"Erro ao configurar OCR: {e}")
-        # -------------------------------------
+        # Pasta do projeto/exe: ícone e Tesseract portátil (configurado só no primeiro OCR, ver ocr.load_tesseract)
+        if hasattr(sys, '_MEIPASS'):
+            # Se estiver rodando como .exe (pasta temporária)
+            base_path = sys._MEIPASS
+        else:
+            # Se estiver rodando como script .py (pasta atual)
+            base_path = os.path.dirname(os.path.abspath(__file__))
+        self.base_path = base_path
 
         # --- Ícone da Janela ---
         try:
-            if hasattr(sys, '_MEIPASS'):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
             icon_path = os.path.join(base_path, 'icone.ico')
             self.iconbitmap(icon_path)
         except Exception as e:
@@ -90,19 +95,63 @@ class ImageViewer(tk.Tk):
         # --- Variáveis de Estado ---
         self.image_list, self.folder_path = [], ""
         self.current_index = -1
+        self.folder_scanner = None      # Varredura em fundo + observação da pasta aberta (ver folder_scan.py)
+        self.scan_job = None
+        self.scanning = False
+        self.folder_files = []          # Todos os arquivos da pasta em ordem de nome; image_list é a vista ordenada/filtrada
+        self.metadata_index = None      # Índice de metadados da pasta (ver metadata.py)
+        self.metadata_indexer = None
+        self.sort_key = tk.StringVar(value='name'); self.sort_reverse = tk.BooleanVar(value=False)
+        self.filter_format = tk.StringVar(value=''); self.filter_orientation = tk.StringVar(value='')
         self.original_pil_image = None
         self.edited_pil_image = None
+        self.image_scale = 1.0      # Resolução de trabalho / resolução real (< 1 enquanto só a versão reduzida foi decodificada)
+        self.full_size = (0, 0)     # Resolução real do arquivo aberto
+        self.history = edits.EditHistory(history_mb)    # Pilha de edições + desfazer/refazer (ver edits.py)
         self.tk_image_ref = None
         self.zoom_level = 1.0
         self.show_info_panel = True
+
+        # Miniaturas (criadas sob demanda ao abrir a tira ou a grade)
+        self.thumb_loader = None
+        self.thumb_photos = OrderedDict()
+        self.thumb_views = []
+        self.filmstrip = None
+
+        # Arquivos com vários quadros: decodificação sob demanda em fundo (ver frames.py)
+        self.frame_source = None
+        self.current_frame = 0
+        self.playing = False
+        self.frame_job = None
+
+        # Painel de desempenho (tecla P); ligá-lo também liga a medição
+        self.perf_overlay = False
+        self.perf_overlay_job = None
+
+        # Modo de blocos para imagens gigantes
+        self.pyramid = None
+        self.pyramid_builder = None
+        self.pyramid_job = None
+
+        # OCR em fundo (pool criado no primeiro uso) e pré-processamento escolhido no menu
+        self.ocr_engine = None
+        self.ocr_grayscale = tk.BooleanVar(value=True); self.ocr_binarize = tk.BooleanVar(value=False)
+
+        # Renderização progressiva (prévia rápida + refinamento adiado)
+        self.progressive_render = progressive_render
+        self.refine_delay_ms = refine_delay_ms
+        self.fast_render_job = None
+        self.refine_job = None
         
         # Variáveis de Corte e Pan
         self.cropping = False
         self.crop_start_x, self.crop_start_y, self.crop_rect_id = 0, 0, None
         self.pan_start_x, self.pan_start_y = 0, 0
+        self.panning = False
         self.canvas_drag_start_x, self.canvas_drag_start_y = 0, 0
         self.image_on_canvas_id = None
-        self.canvas_image_coords = (0, 0)
+        self.canvas_image_coords = (0, 0)   # Canto superior esquerdo (virtual) da imagem ampliada
+        self.viewport_full = True           # O recorte exibido cobre a imagem inteira?
         
         # --- Interface ---
         self.top_frame = tk.Frame(self, bg=BG_COLOR)
@@ -126,12 +175,61 @@ class ImageViewer(tk.Tk):
         self.create_initial_button()
         self.create_nav_buttons()
         self.create_zoom_buttons()
+        self.create_frame_controls()
         self.create_menu()
         self.bind_events()
+        self.protocol("WM_DELETE_WINDOW", self.on_app_close)
+
+        # Outras execuções do programa entregam seus arquivos a esta janela
+        self.instance_server = instance_server
+        if instance_server: self.after(INSTANCE_POLL_MS, self.poll_instance_requests)
 
         if file_path:
             self.load_from_file_path(file_path)
 
+    def on_app_close(self):
+        # Grava os acessos pendentes do cache de miniaturas antes de sair
+        if self.thumb_loader: self.thumb_loader.store.flush()
+        if self.folder_scanner: self.folder_scanner.stop()
+        if self.metadata_indexer: self.metadata_indexer.stop()
+        if self.metadata_index: self.metadata_index.close()
+        if self.ocr_engine: self.ocr_engine.shutdown()
+        if self.instance_server: self.instance_server.close()
+        self.close_tiled()
+        self.destroy()
+
+    # --- Abertura rápida e instância única ---
+    def prefetch_startup_file(self, path):
+        # Só o cabeçalho é lido aqui; imagens gigantes vão para o modo de blocos e não são decodificadas
+        path = os.path.abspath(path)
+        try:
+            with Image.open(path) as img:
+                if img.width * img.height > self.tiled_min_pixels: return
+        except Exception: return
+        self.prefetcher.schedule([path], WINDOW_SIZE)
+
+    def report_startup_time(self):
+        # Tempo desde a criação do processo (clique duplo) até a primeira imagem desenhada na tela
+        self.update_idletasks()
+        end_ns = time.perf_counter_ns()
+        from profiling import process_start_time
+        elapsed_ms = (time.time() - process_start_time()) * 1000
+        profiler.record('startup_first_pixel', end_ns - int(elapsed_ms * 1e6), end_ns)
+        if os.environ.get('PIXELVISTA_PROFILE'): print(f"Abertura até a primeira imagem: {elapsed_ms:.0f} ms", file=sys.stderr)
+        if self.on_first_image: self.on_first_image(self, elapsed_ms)
+
+    def poll_instance_requests(self):
+        while True:
+            try: path = self.instance_server.requests.get_nowait()
+            except queue.Empty: break
+            if self.state() == 'iconic': self.deiconify()
+            self.lift(); self.focus_force()
+            path = os.path.abspath(path)
+            if os.path.isdir(path): self.load_from_file_path(path, is_folder=True)
+            elif path in self.image_list: self.jump_to_image(self.image_list.index(path))
+            else: self.load_from_file_path(path)
+        self.after(INSTANCE_POLL_MS, self.poll_instance_requests)
+
     def create_info_panel(self):
         self.info_frame = tk.Frame(self.main_container, bg=PANEL_BG_COLOR, width=250, padx=10, pady=10)
         self.info_frame.pack_propagate(False)
@@ -145,6 +243,8 @@ class ImageViewer(tk.Tk):
         self.lbl_size_val = self.create_info_row("Tamanho:")
         self.lbl_format_val = self.create_info_row("Formato:")
         self.lbl_mode_val = self.create_info_row("Modo de Cor:")
+        self.lbl_date_val = self.create_info_row("Data de Captura:")
+        self.lbl_camera_val = self.create_info_row("Câmera:")
         self.lbl_path_val = self.create_info_row("Caminho:", wrap=True)
         
         tk.Label(self.info_frame, text="(Duplo clique para ocultar)", fg="#888888", bg=PANEL_BG_COLOR, font=("Segoe UI", 8)).pack(side='bottom', pady=10)
@@ -158,19 +258,26 @@ class ImageViewer(tk.Tk):
         val_label.bind("<Double-Button-1>", lambda e: self.toggle_info_panel())
         return val_label
 
-    def update_info_panel(self, file_path, pil_image):
-        if not file_path or not pil_image: return
+    def update_info_panel(self, file_path):
+        # Só lê o cabeçalho do arquivo (ou usa o índice da pasta): o painel não depende da decodificação
+        meta = self.metadata_index.lookup(file_path) if file_path and self.metadata_index else None
+        if not meta: return
         try:
             self.lbl_filename_val.config(text=os.path.basename(file_path))
-            self.lbl_res_val.config(text=f"{pil_image.width} x {pil_image.height} px")
-            size_bytes = os.path.getsize(file_path)
+            from metadata import display_size
+            width, height = display_size(meta)
+            self.lbl_res_val.config(text=f"{width} x {height} px")
+            size_bytes = meta['size']
             if size_bytes < 1024: size_str = f"{size_bytes} bytes"
             elif size_bytes < 1024*1024: size_str = f"{size_bytes/1024:.1f} KB"
             else: size_str = f"{size_bytes/(1024*1024):.2f} MB"
             self.lbl_size_val.config(text=size_str)
-            fmt = pil_image.format if pil_image.format else "Desconhecido"
+            fmt = meta['format'] if meta['format'] else "Desconhecido"
             self.lbl_format_val.config(text=fmt)
-            self.lbl_mode_val.config(text=pil_image.mode)
+            self.lbl_mode_val.config(text=meta['mode'])
+            taken = meta['taken']
+            self.lbl_date_val.config(text=f"{taken[8:10]}/{taken[5:7]}/{taken[:4]} {taken[11:16]}" if taken and len(taken) >= 16 else (taken or "-"))
+            self.lbl_camera_val.config(text=meta['camera'] or "-")
             self.lbl_path_val.config(text=os.path.dirname(file_path))
         except Exception as e:
             print(f"Erro ao ler metadados: {e}")
@@ -182,48 +289,85 @@ class ImageViewer(tk.Tk):
             self.info_frame.pack(side='right', fill='y'); self.show_info_panel = True; self.btn_info.config(bg=BTN_HOVER_COLOR)
 
     def create_menu(self):
+        # Só a barra é criada na abertura; os itens de cada menu são montados quando ele é aberto pela primeira vez
         self.menu_bar = tk.Menu(self)
         self.config(menu=self.menu_bar)
-        
-        file_menu = tk.Menu(self.menu_bar, tearoff=0); self.menu_bar.add_cascade(label="Arquivo", menu=file_menu)
+        for label, build, state in (("Arquivo", self.build_file_menu, "normal"), ("Ver", self.build_view_menu, "normal"), ("Editar", self.build_edit_menu, "disabled"),
+                                    ("Ferramentas", self.build_tools_menu, "normal"), ("Ajuda", self.build_help_menu, "normal")):
+            menu = tk.Menu(self.menu_bar, tearoff=0)
+            menu.config(postcommand=lambda menu=menu, build=build: self.populate_menu(menu, build))
+            self.menu_bar.add_cascade(label=label, menu=menu, state=state)
+
+    def populate_menu(self, menu, build):
+        if menu.index('end') is None: build(menu)
+
+    def build_file_menu(self, file_menu):
         file_menu.add_command(label="Abrir Pasta...", command=self.open_folder, accelerator="Ctrl+O")
         file_menu.add_separator()
         file_menu.add_command(label="Salvar (Sobrescrever)", command=self.save_changes, accelerator="Ctrl+S")
         file_menu.add_command(label="Salvar Como...", command=self.save_as, accelerator="Ctrl+Shift+S")
         file_menu.add_separator(); file_menu.add_command(label="Sair", command=self.quit, accelerator="Esc")
-        
-        view_menu = tk.Menu(self.menu_bar, tearoff=0); self.menu_bar.add_cascade(label="Ver", menu=view_menu)
+
+    def build_view_menu(self, view_menu):
         view_menu.add_command(label="Alternar Painel de Info", command=self.toggle_info_panel)
+        view_menu.add_command(label="Tira de Miniaturas", command=self.toggle_filmstrip, accelerator="T")
+        view_menu.add_command(label="Grade de Miniaturas...", command=self.open_thumbnail_grid, accelerator="G")
+        sort_menu = tk.Menu(view_menu, tearoff=0); view_menu.add_cascade(label="Ordenar por", menu=sort_menu)
+        for label, key in (("Nome", 'name'), ("Data de Captura", 'date'), ("Dimensões", 'dimensions'), ("Tamanho do Arquivo", 'filesize'), ("Formato", 'format')):
+            sort_menu.add_radiobutton(label=label, variable=self.sort_key, value=key, command=self.apply_view)
+        sort_menu.add_separator(); sort_menu.add_checkbutton(label="Ordem Decrescente", variable=self.sort_reverse, command=self.apply_view)
+        filter_menu = tk.Menu(view_menu, tearoff=0); view_menu.add_cascade(label="Filtrar", menu=filter_menu)
+        filter_menu.add_radiobutton(label="Todos os Formatos", variable=self.filter_format, value='', command=self.apply_view)
+        for fmt in ('JPEG', 'PNG', 'GIF', 'BMP', 'TIFF', 'WEBP', 'PPM'):
+            filter_menu.add_radiobutton(label=fmt, variable=self.filter_format, value=fmt, command=self.apply_view)
+        filter_menu.add_separator()
+        for label, value in (("Qualquer Orientação", ''), ("Paisagem", 'landscape'), ("Retrato", 'portrait')):
+            filter_menu.add_radiobutton(label=label, variable=self.filter_orientation, value=value, command=self.apply_view)
         view_menu.add_separator()
         view_menu.add_command(label="Ajustar à Janela (Reset)", command=self.fit_image_to_window, accelerator="F")
         view_menu.add_command(label="Tamanho Real (100%)", command=lambda: self.set_zoom(1.0), accelerator="R")
+        view_menu.add_separator()
+        view_menu.add_command(label="Estatísticas do Cache", command=self.show_cache_stats)
+        view_menu.add_command(label="Painel de Desempenho", command=self.toggle_perf_overlay, accelerator="P")
+        view_menu.add_command(label="Exportar Rastreamento de Desempenho...", command=self.export_perf_trace)
 
-        self.edit_menu = tk.Menu(self.menu_bar, tearoff=0); self.menu_bar.add_cascade(label="Editar", menu=self.edit_menu, state="disabled")
-        self.edit_menu.add_command(label="Cortar Imagem (Seleção)", command=self.start_crop_mode)
-        self.edit_menu.add_separator()
-        self.edit_menu.add_command(label="Rotacionar 90° Direita", command=lambda: self.apply_edit(self.rotate_image, angle=-90))
-        self.edit_menu.add_command(label="Rotacionar 90° Esquerda", command=lambda: self.apply_edit(self.rotate_image, angle=90))
-        self.edit_menu.add_command(label="Inverter Horizontalmente", command=lambda: self.apply_edit(self.flip_image, method=Image.Transpose.FLIP_LEFT_RIGHT))
-        self.edit_menu.add_command(label="Inverter Verticalmente", command=lambda: self.apply_edit(self.flip_image, method=Image.Transpose.FLIP_TOP_BOTTOM))
-        self.edit_menu.add_separator()
-        self.edit_menu.add_command(label="Ajustar Imagem (Brilho, Contraste...)", command=self.open_adjustments_window)
-        self.edit_menu.add_command(label="Redimensionar (Esticar)...", command=self.resize_image)
-        self.edit_menu.add_separator()
-        self.edit_menu.add_command(label="Filtro: Tons de Cinza", command=lambda: self.apply_edit(self.convert_grayscale))
-        self.edit_menu.add_separator()
-        self.edit_menu.add_command(label="Desfazer Alterações", command=self.revert_changes)
-
-        tools_menu = tk.Menu(self.menu_bar, tearoff=0); self.menu_bar.add_cascade(label="Ferramentas", menu=tools_menu, state="normal") 
+    def build_edit_menu(self, edit_menu):
+        edit_menu.add_command(label="Desfazer", command=self.undo_edit, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Refazer", command=self.redo_edit, accelerator="Ctrl+Y")
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Cortar Imagem (Seleção)", command=self.start_crop_mode)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Rotacionar 90° Direita", command=lambda: self.apply_edit(edits.rotate(-90)))
+        edit_menu.add_command(label="Rotacionar 90° Esquerda", command=lambda: self.apply_edit(edits.rotate(90)))
+        edit_menu.add_command(label="Inverter Horizontalmente", command=lambda: self.apply_edit(edits.flip(Image.Transpose.FLIP_LEFT_RIGHT)))
+        edit_menu.add_command(label="Inverter Verticalmente", command=lambda: self.apply_edit(edits.flip(Image.Transpose.FLIP_TOP_BOTTOM)))
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Ajustar Imagem (Brilho, Contraste...)", command=self.open_adjustments_window)
+        edit_menu.add_command(label="Redimensionar (Esticar)...", command=self.resize_image)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Filtro: Tons de Cinza", command=lambda: self.apply_edit(edits.grayscale()))
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Desfazer Alterações", command=self.revert_changes)
+
+    def build_tools_menu(self, tools_menu):
         tools_menu.add_command(label="Padronizar Imagem Atual...", command=self.standardize_current_image)
         tools_menu.add_separator()
         tools_menu.add_command(label="Padronizar Pasta Inteira (Lote)...", command=self.batch_process_images)
+        tools_menu.add_command(label="Aplicar Orientação EXIF na Pasta (Lote)...", command=self.batch_normalize_orientation)
         tools_menu.add_separator()
         tools_menu.add_command(label="Extrair Texto (OCR)", command=self.perform_ocr_extraction)
-        
-        help_menu = tk.Menu(self.menu_bar, tearoff=0); self.menu_bar.add_cascade(label="Ajuda", menu=help_menu)
+        tools_menu.add_command(label="Buscar Texto na Pasta (OCR)...", command=self.open_ocr_folder_window)
+        tools_menu.add_checkbutton(label="OCR: Converter para Tons de Cinza", variable=self.ocr_grayscale)
+        tools_menu.add_checkbutton(label="OCR: Binarizar (Preto e Branco)", variable=self.ocr_binarize)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Encontrar Duplicatas na Pasta...", command=self.open_duplicates_window)
+
+    def build_help_menu(self, help_menu):
         help_menu.add_command(label=f"Sobre {NOME_DO_APP}", command=self.show_about_window)
 
-    def open_link(self, url): webbrowser.open_new_tab(url)
+    def open_link(self, url):
+        import webbrowser
+        webbrowser.open_new_tab(url)
 
     def show_about_window(self):
         about_win = tk.Toplevel(self); about_win.title(f"Sobre {NOME_DO_APP}"); about_win.geometry("400x250")
@@ -242,7 +386,8 @@ class ImageViewer(tk.Tk):
     def update_status(self):
         if self.image_list:
             filename = os.path.basename(self.image_list[self.current_index])
-            count = f"[{self.current_index + 1} de {len(self.image_list)}]"; zoom_percent = f"Zoom: {self.zoom_level:.2f}x ({int(self.zoom_level*100)}%)"
+            count = f"[{self.current_index + 1} de {len(self.image_list)}{'...' if self.scanning else ''}]"; zoom_percent = f"Zoom: {self.zoom_level:.2f}x ({int(self.zoom_level*100)}%)"
+            if self.pyramid and self.pyramid.base: zoom_percent += f"  (blocos em 1/{2 ** self.pyramid.base} da resolução: origem grande demais para ler inteira)"
             self.file_status_label.config(text=f"{filename}  {count}  {zoom_percent}"); self.title(f"{filename} - {NOME_DO_APP}")
         else:
             self.file_status_label.config(text="Nenhuma imagem carregada."); self.title(NOME_DO_APP)
@@ -263,9 +408,22 @@ class ImageViewer(tk.Tk):
         self.zoom_out_btn=tk.Button(self.top_frame,text="🔍-",command=self.zoom_out,bg=BTN_BG_COLOR,fg=TEXT_COLOR,font=FONT_ICON,relief='flat',activebackground=BTN_HOVER_COLOR,activeforeground=TEXT_COLOR)
         self.zoom_out_btn.pack(side='right', padx=5)
         
+    def create_frame_controls(self):
+        # Só aparecem (à esquerda da barra superior) quando o arquivo tem mais de um quadro
+        self.frame_controls = tk.Frame(self.top_frame, bg=BG_COLOR)
+        button_style = dict(bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_ICON, relief='flat', activebackground=BTN_HOVER_COLOR, activeforeground=TEXT_COLOR)
+        tk.Button(self.frame_controls, text="⏮", command=lambda: self.step_frame(-1), **button_style).pack(side='left')
+        self.btn_play = tk.Button(self.frame_controls, text="▶", command=self.toggle_playback, **button_style); self.btn_play.pack(side='left', padx=5)
+        tk.Button(self.frame_controls, text="⏭", command=lambda: self.step_frame(1), **button_style).pack(side='left')
+        self.lbl_frame = tk.Label(self.frame_controls, text="", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE); self.lbl_frame.pack(side='left', padx=10)
+
     def bind_events(self):
         self.bind_all("<Control-o>",self.open_folder);self.bind_all("<Control-s>",self.save_changes);self.bind_all("<Control-S>",self.save_as)
+        self.bind_all("<Control-z>",self.undo_edit);self.bind_all("<Control-y>",self.redo_edit);self.bind_all("<Control-Z>",self.redo_edit)
         self.bind('<Left>',self.show_previous_image);self.bind('<Right>',self.show_next_image);self.bind('<Escape>',self.cancel_actions);self.bind('+',self.zoom_in);self.bind('-',self.zoom_out);self.bind('<f>',self.fit_image_to_window);self.bind('<r>',lambda e:self.set_zoom(1.0))
+        self.bind('<t>',self.toggle_filmstrip);self.bind('<g>',self.open_thumbnail_grid)
+        self.bind('<p>',self.toggle_perf_overlay)
+        self.bind('<space>',self.toggle_playback);self.bind('<Prior>',lambda e:self.step_frame(-1));self.bind('<Next>',lambda e:self.step_frame(1))
         self.canvas.bind("<ButtonPress-1>", self.on_crop_start);self.canvas.bind("<B1-Motion>", self.on_crop_drag);self.canvas.bind("<ButtonRelease-1>", self.on_crop_end)
         self.canvas.bind("<ButtonPress-2>", self.on_pan_start);self.canvas.bind("<B2-Motion>", self.on_pan_move);self.canvas.bind("<ButtonRelease-2>", self.on_pan_end)
         self.canvas.bind("<MouseWheel>", self.on_mouse_wheel);self.bind("<MouseWheel>", self.on_mouse_wheel)
@@ -277,93 +435,473 @@ class ImageViewer(tk.Tk):
         
     def load_from_file_path(self, path, is_folder=False):
         target_file = None
+        path = os.path.abspath(path)
         if is_folder: self.folder_path = path
         else: self.folder_path = os.path.dirname(path); target_file = path
+        if not os.path.isdir(self.folder_path): messagebox.showerror("Erro", f"A pasta não foi encontrada:\n{self.folder_path}"); return
+        from folder_scan import FolderScanner
+        from metadata import MetadataIndex, MetadataIndexer
         image_extensions = ('.jpg','.jpeg','.png','.gif','.bmp','.tiff','.tif','.webp','.ppm','.pgm','.pbm','.pnm')
-        try: self.image_list = sorted([os.path.join(self.folder_path, f) for f in os.listdir(self.folder_path) if f.lower().endswith(image_extensions)])
-        except FileNotFoundError: messagebox.showerror("Erro", f"A pasta não foi encontrada:\n{self.folder_path}"); return
+        # A listagem chega aos poucos: a imagem pedida (ou a primeira encontrada) aparece sem esperar o fim da varredura
+        if self.folder_scanner: self.folder_scanner.stop()
+        if self.metadata_indexer: self.metadata_indexer.stop()
+        if self.metadata_index: self.metadata_index.close()
+        if self.scan_job: self.after_cancel(self.scan_job)
+        self.folder_files, self.image_list, self.current_index, self.scanning = [], [], -1, True
+        self.folder_scanner = FolderScanner(self.folder_path, image_extensions)
+        self.metadata_index = MetadataIndex(self.folder_path)
+        self.metadata_indexer = MetadataIndexer(self.metadata_index)
+        if target_file and target_file.lower().endswith(image_extensions) and os.path.isfile(target_file):
+            self.folder_files.append(target_file); self.apply_view()
+        self.scan_job = self.after(30, self.poll_folder_scan)
 
-        if self.image_list:
-            self.open_folder_btn.place_forget()
-            self.prev_btn.place(relx=0.0,rely=0.5,anchor='w',x=10);self.next_btn.place(relx=1.0,rely=0.5,anchor='e',x=-10)
-            self.menu_bar.entryconfig("Editar",state="normal")
-            if target_file and target_file in self.image_list: self.current_index = self.image_list.index(target_file)
-            else: self.current_index = 0
+    def show_browsing_controls(self):
+        self.open_folder_btn.place_forget()
+        self.prev_btn.place(relx=0.0,rely=0.5,anchor='w',x=10);self.next_btn.place(relx=1.0,rely=0.5,anchor='e',x=-10)
+        self.menu_bar.entryconfig("Editar",state="normal")
+
+    def poll_folder_scan(self):
+        # Aplica os lotes da varredura e as mudanças vistas pelo observador em folder_files (sempre em ordem de nome)
+        self.scan_job = None
+        changed = finished = False
+        while True:
+            try: kind, payload = self.folder_scanner.events.get_nowait()
+            except queue.Empty: break
+            if kind == 'add':
+                new = [p for p in payload if not self.contains_path(p)]
+                if len(new) > 16: self.folder_files.extend(new); self.folder_files.sort()     # Timsort junta as duas sequências ordenadas em tempo linear
+                else:
+                    for p in new: bisect.insort(self.folder_files, p)
+                if new and not self.scanning: self.metadata_indexer.request(new)
+                changed = changed or bool(new)
+            elif kind == 'remove':
+                removed = set(payload)
+                self.folder_files[:] = [p for p in self.folder_files if p not in removed]; changed = True
+            elif kind == 'done':
+                finished = True; self.metadata_indexer.request(self.folder_files, prune=True)
+            elif kind == 'error':
+                self.scanning = False
+                messagebox.showerror("Erro", f"Não foi possível ler a pasta:\n{self.folder_path}\n\nErro: {payload}"); return
+        # Com ordenação/filtro por metadados, a vista é refeita quando o índice termina de atualizar
+        while True:
+            try: self.metadata_indexer.results.get_nowait()
+            except queue.Empty: break
+            changed = changed or not self.default_view()
+        if finished: self.scanning = False
+        if changed: self.apply_view()
+        elif finished: self.update_status()
+        if finished and not self.image_list:
+            messagebox.showinfo("Nenhuma Imagem",f"Nenhum arquivo de imagem encontrado em:\n{self.folder_path}");self.menu_bar.entryconfig("Editar",state="disabled")
+        self.scan_job = self.after(30 if self.scanning else 500, self.poll_folder_scan)
+
+    def contains_path(self, path):
+        i = bisect.bisect_left(self.folder_files, path)
+        return i < len(self.folder_files) and self.folder_files[i] == path
+
+    # --- Ordenação e filtros (índice de metadados) ---
+    def default_view(self):
+        return self.sort_key.get() == 'name' and not self.sort_reverse.get() and not self.filter_format.get() and not self.filter_orientation.get()
+
+    def apply_view(self, event=None):
+        # Refaz image_list a partir de folder_files mantendo o current_index no mesmo arquivo
+        if self.metadata_index is None: return
+        current = self.image_list[self.current_index] if self.image_list else None
+        if self.default_view(): self.image_list = self.folder_files     # Mesma lista: as inserções da varredura já ficam visíveis
+        else:
+            paths = self.metadata_index.filter_paths(self.folder_files, self.filter_format.get() or None, self.filter_orientation.get() or None)
+            self.image_list = self.metadata_index.sort_paths(paths, self.sort_key.get(), self.sort_reverse.get())
+        positions = {p: i for i, p in enumerate(self.image_list)} if current is not None else {}
+        if current in positions:
+            self.current_index = positions[current]; self.update_status()
+        elif self.image_list:
+            # O arquivo atual sumiu (apagado/renomeado/filtrado) ou esta é a primeira imagem encontrada
+            if current is None: self.show_browsing_controls()
+            self.current_index = min(max(self.current_index, 0), len(self.image_list) - 1)
             self.load_image()
         else:
-            messagebox.showinfo("Nenhuma Imagem",f"Nenhum arquivo de imagem encontrado em:\n{self.folder_path}");self.menu_bar.entryconfig("Editar",state="disabled")
+            self.current_index = -1; self.canvas.delete("all"); self.create_initial_button(); self.update_status()
+        self.refresh_thumbnail_views()
+
+    def canvas_size(self):
+        win_w, win_h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if win_w < 50 or win_h < 50: return None
+        return (win_w, win_h)
 
     def load_image(self):
         if not self.image_list: return
         image_path = self.image_list[self.current_index]
+        canvas_size = self.canvas_size()
+        self.stop_frames(); self.close_tiled()
+        with profiler.stage('metadata'): self.update_info_panel(image_path)
+        if self.needs_tiles(image_path): self.open_tiled(image_path); return
         try:
-            self.original_pil_image = Image.open(image_path)
-            self.update_info_panel(image_path, self.original_pil_image)
-            if self.original_pil_image.mode not in ('RGB','RGBA'): self.original_pil_image = self.original_pil_image.convert('RGB')
-            self.revert_changes()
+            self.prefetcher.wait(image_path)
+            entry = self.image_cache.get(image_path)
+            # Antes de a janela aparecer o canvas ainda não tem tamanho: decodifica para o tamanho inicial da janela
+            decode_size = canvas_size or WINDOW_SIZE
+            if entry is None or not entry.covers(decode_size):
+                entry = decode_image(image_path, decode_size)
+                self.image_cache.put(image_path, entry)
+            self.original_pil_image = entry.image
+            # As edições sempre geram uma nova imagem, então não é preciso copiar a original do cache
+            self.edited_pil_image = self.original_pil_image
+            self.image_scale = entry.scale
+            self.full_size = (entry.width, entry.height)
+            self.history.reset()
+            if canvas_size and entry.display_size != canvas_size:
+                new_w, new_h, _ = fit_size(entry.image.size, canvas_size)
+                self.image_cache.set_display(entry, entry.image.resize((new_w, new_h), Image.Resampling.LANCZOS), canvas_size)
+            if canvas_size:
+                self.cancel_pending_render()
+                self.zoom_level = fit_size(entry.image.size, canvas_size)[2] * entry.scale
+                self.display_tk_image(entry.display)
+            else: self.fit_image_to_window()
+            if entry.n_frames > 1 and canvas_size: self.start_frames(image_path, canvas_size)
+            self.prefetch_neighbors()
+            for view in self.thumb_views: view.set_current(self.current_index)
         except Exception as e:
             messagebox.showerror("Erro",f"Não foi possível carregar a imagem:\n{image_path}\n\nErro: {e}")
             self.image_list.pop(self.current_index)
+            if self.image_list is not self.folder_files and self.contains_path(image_path): self.folder_files.remove(image_path)
             if not self.image_list: self.canvas.delete("all"); self.create_initial_button()
             elif self.current_index >= len(self.image_list): self.current_index = 0
             self.load_image()
 
-    def display_tk_image(self, pil_image, specific_position=None):
+    def ensure_full_resolution(self):
+        # Zoom além da escala decodificada, OCR e salvamento precisam dos pixels reais:
+        # decodifica o arquivo inteiro e executa a pilha de edições (otimizada) uma única vez
+        if self.image_scale >= 1 or not self.image_list or self.pyramid: return
+        image_path = self.image_list[self.current_index]
+        self.pause_playback()
+        self.config(cursor="watch"); self.update_idletasks()
+        try:
+            entry = decode_image(image_path, full=True, frame=self.current_frame)
+            if self.current_frame == 0: self.image_cache.put(image_path, entry)
+            self.original_pil_image = entry.image
+            with profiler.stage('edits_render'): self.edited_pil_image = edits.render(entry.image, edits.optimize(self.history.ops, entry.image.size))
+            self.image_scale = 1.0
+            self.history.drop_snapshots()
+        finally: self.config(cursor="arrow")
+
+    def ensure_edit_proxy(self):
+        # Antes da primeira edição, troca uma imagem em resolução real por um proxy do tamanho da tela
+        canvas_size = self.canvas_size()
+        if self.history.ops or self.image_scale < 1 or not canvas_size: return
+        factor = min(self.original_pil_image.width // canvas_size[0], self.original_pil_image.height // canvas_size[1])
+        if factor < 2: return
+        self.original_pil_image = self.edited_pil_image = self.original_pil_image.reduce(factor)
+        self.image_scale = self.original_pil_image.width / self.full_size[0]
+        self.history.drop_snapshots()
+
+    def edited_full_size(self):
+        return edits.final_size(self.full_size, self.history.ops)
+
+    def prefetch_neighbors(self):
+        if self.prefetch_depth <= 0 or len(self.image_list) < 2: return
+        total = len(self.image_list); depth = min(self.prefetch_depth, total - 1)
+        paths = [self.image_list[(self.current_index + self.nav_direction * k) % total] for k in range(1, depth + 1)]
+        # Antes de a janela ser mapeada o canvas ainda não tem tamanho: decodifica para o tamanho inicial, como load_image
+        self.prefetcher.schedule([p for p in paths if not self.needs_tiles(p)], self.canvas_size() or WINDOW_SIZE)
+
+    def show_cache_stats(self):
+        stats = self.image_cache.stats()
+        messagebox.showinfo("Estatísticas do Cache",
+                            f"Acertos: {stats['hits']}\nFalhas: {stats['misses']}\nRemoções (LRU): {stats['evictions']}\n\n"
+                            f"Imagens em cache: {stats['entries']}\nMemória: {stats['mb']:.1f} MB de {stats['max_mb']:.0f} MB")
+
+    def display_tk_image(self, pil_image, specific_position=None, image_origin=None):
         self.canvas.delete("all")
         canvas_w = self.canvas.winfo_width(); canvas_h = self.canvas.winfo_height()
         img_w, img_h = pil_image.size
         if specific_position: x, y = specific_position
         else: x = (canvas_w - img_w) / 2; y = (canvas_h - img_h) / 2
-        self.canvas_image_coords = (x, y)
-        tk_image = ImageTk.PhotoImage(pil_image)
+        # Quando só um recorte é exibido, a origem da imagem inteira é diferente da posição do recorte
+        self.canvas_image_coords = image_origin if image_origin else (x, y)
+        self.viewport_full = image_origin is None
+        with profiler.stage('photoimage'): tk_image = ImageTk.PhotoImage(pil_image)
         self.image_on_canvas_id = self.canvas.create_image(x, y, image=tk_image, anchor='nw')
         self.tk_image_ref = tk_image
         self.update_status()
+        if not self.startup_reported: self.startup_reported = True; self.after_idle(self.report_startup_time)
+        if self.perf_overlay: self.draw_perf_overlay()
         
     def fit_image_to_window(self, event=None):
         if not self.edited_pil_image:return
+        self.cancel_pending_render()
         img_w,img_h=self.edited_pil_image.size;win_w,win_h=self.canvas.winfo_width(),self.canvas.winfo_height()
         if win_w<50 or win_h<50:self.after(50,self.fit_image_to_window);return
         ratio=min(win_w/img_w,win_h/img_h);new_w,new_h=int(img_w*ratio),int(img_h*ratio)
-        resized_image=self.edited_pil_image.resize((new_w,new_h),Image.Resampling.LANCZOS)
-        self.zoom_level=ratio
+        with profiler.stage('fit_resize'): resized_image=self.edited_pil_image.resize((new_w,new_h),Image.Resampling.LANCZOS)
+        self.zoom_level=ratio*self.image_scale
         self.display_tk_image(resized_image)
         
+    # --- Desempenho ---
+    def toggle_perf_overlay(self, event=None):
+        self.perf_overlay = not self.perf_overlay
+        if self.perf_overlay:
+            profiler.enabled = True; self.draw_perf_overlay()
+        else:
+            if self.perf_overlay_job: self.after_cancel(self.perf_overlay_job); self.perf_overlay_job = None
+            self.canvas.delete("perf_overlay")
+            profiler.enabled = bool(os.environ.get('PIXELVISTA_PROFILE'))
+
+    def draw_perf_overlay(self):
+        # Texto no canto do canvas (recriado após cada display_tk_image, que limpa o canvas)
+        if self.perf_overlay_job: self.after_cancel(self.perf_overlay_job)
+        lines = [f"{'Etapa':<16}{'última':>9}{'média':>9}{'máx':>9}"]
+        for name, (last, mean, peak, count) in profiler.summary().items():
+            lines.append(f"{name:<16}{last:>8.1f}ms{mean:>7.1f}ms{peak:>7.1f}ms")
+        from profiling import process_memory_mb
+        memory = process_memory_mb(); stats = self.image_cache.stats()
+        lines.append(f"Memória: {memory:.0f} MB" if memory is not None else "Memória: -")
+        lines.append(f"Cache: {stats['entries']} imagens, {stats['mb']:.0f}/{stats['max_mb']:.0f} MB, acertos {stats['hits']}/{stats['hits'] + stats['misses']}")
+        self.canvas.delete("perf_overlay")
+        text_id = self.canvas.create_text(10, 10, text="\n".join(lines), anchor='nw', fill="#9EFF9E", font=("Consolas", 9), tags="perf_overlay")
+        self.canvas.create_rectangle(self.canvas.bbox(text_id), fill="#000000", outline="", stipple="gray50", tags="perf_overlay")
+        self.canvas.tag_raise(text_id)
+        self.perf_overlay_job = self.after(PERF_OVERLAY_REFRESH_MS, self.draw_perf_overlay)
+
+    def export_perf_trace(self):
+        if not profiler.enabled: messagebox.showinfo("Desempenho", "Ative o Painel de Desempenho (tecla P) e use o programa antes de exportar."); return
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Chrome Trace", "*.json")], initialfile="pixelvista-trace.json")
+        if not file_path: return
+        try: count = profiler.export_chrome_trace(file_path); messagebox.showinfo("Desempenho", f"{count} eventos exportados para:\n{file_path}\n\nAbra em chrome://tracing ou ui.perfetto.dev.")
+        except Exception as e: messagebox.showerror("Erro", f"Não foi possível exportar: {e}")
+
+    # --- Modo de blocos (imagens gigantes) ---
+    def needs_tiles(self, path):
+        # Lê o cabeçalho quando o arquivo ainda não está no índice: uma vizinha gigante nunca é decodificada inteira no pré-carregamento
+        if not self.metadata_index: return False
+        meta = self.metadata_index.lookup(path)
+        return bool(meta) and meta['width'] * meta['height'] > self.tiled_min_pixels
+
+    def open_tiled(self, path):
+        from pyramid import TilePyramid, PyramidBuilder
+        self.pyramid = TilePyramid.open(path)
+        if self.pyramid: self.show_tiled(); return
+        # Primeira abertura: a pirâmide é gerada em fundo (uma única vez; depois fica no cache em disco)
+        self.original_pil_image = self.edited_pil_image = None
+        self.canvas.delete("all"); self.image_on_canvas_id = None
+        self.pyramid_builder = PyramidBuilder(path)
+        self.poll_pyramid_build()
+
+    def poll_pyramid_build(self):
+        builder = self.pyramid_builder
+        if not builder.done:
+            self.file_status_label.config(text=f"{os.path.basename(builder.path)}  -  Gerando blocos da imagem grande: {builder.progress:.0%}")
+            self.pyramid_job = self.after(200, self.poll_pyramid_build); return
+        self.pyramid_job = self.pyramid_builder = None
+        if builder.error: messagebox.showerror("Erro", f"Não foi possível gerar os blocos da imagem:\n{builder.path}\n\nErro: {builder.error}"); return
+        if builder.pyramid: self.pyramid = builder.pyramid; self.show_tiled()
+
+    def show_tiled(self):
+        # A visão geral (menor nível que cobre a janela) é a imagem de trabalho; zoom e pan leem só os blocos visíveis
+        canvas_size = self.canvas_size() or self.pyramid.levels[0]
+        overview = self.pyramid.overview(canvas_size)
+        self.original_pil_image = self.edited_pil_image = overview
+        self.image_scale = overview.width / self.pyramid.full_size[0]; self.full_size = self.pyramid.full_size
+        self.history.reset(); self.cancel_pending_render()
+        new_w, new_h, ratio = fit_size(overview.size, canvas_size)
+        self.zoom_level = ratio * self.image_scale
+        self.display_tk_image(overview.resize((new_w, new_h), Image.Resampling.LANCZOS))
+        self.prefetch_neighbors()
+        for view in self.thumb_views: view.set_current(self.current_index)
+
+    def close_tiled(self):
+        if self.pyramid_job: self.after_cancel(self.pyramid_job); self.pyramid_job = None
+        if self.pyramid_builder: self.pyramid_builder.cancel(); self.pyramid_builder = None
+        if self.pyramid: self.pyramid.close(); self.pyramid = None
+
+    def tiled_unavailable(self):
+        if not self.pyramid: return False
+        messagebox.showinfo("Modo de Blocos", "Esta imagem é exibida em blocos por ser muito grande.\nEdição e salvamento não estão disponíveis para ela.")
+        return True
+
+    # --- Vários quadros (GIF/WebP animados, TIFF com várias páginas) ---
+    def start_frames(self, path, canvas_size):
+        from frames import FrameSource
+        try: self.frame_source = FrameSource(path, canvas_size)
+        except Exception as e: print(f"Erro ao abrir quadros: {e}"); return
+        self.current_frame = 0
+        self.frame_controls.pack(side='left', padx=10); self.update_frame_label()
+        if self.frame_source.animated: self.toggle_playback()
+
+    def stop_frames(self):
+        self.pause_playback()
+        if self.frame_source: self.frame_source.close(); self.frame_source = None
+        self.current_frame = 0; self.frame_controls.pack_forget()
+
+    def toggle_playback(self, event=None):
+        if not self.frame_source: return
+        if self.playing: self.pause_playback(); return
+        self.playing = True; self.btn_play.config(text="⏸")
+        current = self.frame_source.get(self.current_frame)
+        self.frame_job = self.after(current.duration if current else 100, self.play_tick)
+
+    def pause_playback(self):
+        if self.frame_job: self.after_cancel(self.frame_job); self.frame_job = None
+        if self.playing: self.playing = False; self.btn_play.config(text="▶")
+
+    def play_tick(self):
+        # Cada quadro fica na tela pela sua própria duração; se o próximo ainda não foi decodificado, tenta de novo em 5 ms
+        self.frame_job = None
+        source = self.frame_source
+        index = (self.current_frame + 1) % source.n_frames
+        frame = source.get(index)
+        if frame is None:
+            if source.error: self.pause_playback(); return
+            source.seek(self.current_frame); self.frame_job = self.after(5, self.play_tick); return
+        started = time.perf_counter()
+        self.show_frame(index, frame)
+        self.frame_job = self.after(max(1, frame.duration - int((time.perf_counter() - started) * 1000)), self.play_tick)
+
+    def step_frame(self, delta):
+        if not self.frame_source: return
+        self.pause_playback()
+        source = self.frame_source
+        index = (self.current_frame + delta) % source.n_frames if source.animated else min(max(self.current_frame + delta, 0), source.n_frames - 1)
+        if index != self.current_frame: self.show_frame_when_ready(source, index)
+
+    def show_frame_when_ready(self, source, index):
+        if source is not self.frame_source: return      # Outro arquivo foi aberto enquanto esperava
+        frame = source.get(index)
+        if frame is not None: self.show_frame(index, frame); return
+        if source.error: messagebox.showerror("Erro", f"Não foi possível ler o quadro {index + 1}:\n{source.error}"); return
+        source.seek(index); self.after(10, self.show_frame_when_ready, source, index)
+
+    def show_frame(self, index, frame):
+        # O quadro (na escala da janela) vira a imagem de trabalho: zoom, corte e salvamento decodificam o quadro real sob demanda
+        self.current_frame = index; self.frame_source.seek(index)
+        self.original_pil_image = self.edited_pil_image = frame.image
+        self.image_scale = frame.image.width / frame.full_size[0]; self.full_size = frame.full_size
+        self.history.reset(); self.cancel_pending_render()
+        canvas_size = self.canvas_size() or frame.image.size
+        new_w, new_h, ratio = fit_size(frame.image.size, canvas_size)
+        display = frame.image if (new_w, new_h) == frame.image.size else frame.image.resize((new_w, new_h), preview_resample(ratio))
+        self.zoom_level = ratio * self.image_scale
+        self.display_tk_image(display); self.update_frame_label()
+
+    def update_frame_label(self):
+        if self.frame_source:
+            kind = "Quadro" if self.frame_source.animated else "Página"
+            self.lbl_frame.config(text=f"{kind} {self.current_frame + 1} de {self.frame_source.n_frames}")
+
+    # --- Miniaturas ---
+    def thumbnail_photo(self, path):
+        photo = self.thumb_photos.get(path)
+        if photo is not None: self.thumb_photos.move_to_end(path)
+        return photo
+
+    def request_thumbnails(self, paths, owner=None):
+        # Cada vista ('owner') substitui o próprio pedido anterior, sem cancelar o das outras
+        missing = [p for p in paths if p not in self.thumb_photos]
+        self.thumb_loader.request(missing, owner)
+
+    def register_thumbnail_view(self, view):
+        if self.thumb_loader is None:
+            from thumbnails import ThumbnailStore, ThumbnailLoader
+            self.thumb_loader = ThumbnailLoader(ThumbnailStore(max_mb=THUMB_CACHE_MB))
+            self.after(50, self.poll_thumbnails)
+        self.thumb_views.append(view)
+
+    def poll_thumbnails(self):
+        arrived = []
+        while True:
+            try: path, data = self.thumb_loader.results.get_nowait()
+            except queue.Empty: break
+            if data is None: continue
+            self.thumb_photos[path] = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+            while len(self.thumb_photos) > THUMB_MEMORY_COUNT: self.thumb_photos.popitem(last=False)
+            arrived.append(path)
+        if arrived:
+            for view in self.thumb_views: view.on_thumbnails(arrived)
+        self.after(50, self.poll_thumbnails)
+
+    def jump_to_image(self, index):
+        if 0 <= index < len(self.image_list) and index != self.current_index:
+            self.nav_direction = 1 if index > self.current_index else -1
+            self.current_index = index; self.load_image()
+
+    def toggle_filmstrip(self, event=None):
+        if self.filmstrip:
+            self.thumb_views.remove(self.filmstrip); self.filmstrip.destroy(); self.filmstrip = None; return
+        self.filmstrip = ThumbnailView(self, self, horizontal=True)
+        self.filmstrip.pack(side='bottom', fill='x', before=self.main_container)
+        self.register_thumbnail_view(self.filmstrip)
+
+    def open_thumbnail_grid(self, event=None):
+        if not self.image_list: return
+        grid_win = tk.Toplevel(self); grid_win.title(f"Miniaturas - {self.folder_path}"); grid_win.geometry("900x600"); grid_win.configure(bg=BG_COLOR)
+        grid = ThumbnailView(grid_win, self, horizontal=False)
+        scrollbar = tk.Scrollbar(grid_win, orient='vertical', command=grid.on_scrollbar)
+        grid.config(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y'); grid.pack(side='left', expand=True, fill='both')
+        self.register_thumbnail_view(grid)
+        def close(): self.thumb_views.remove(grid); grid_win.destroy()
+        grid_win.protocol("WM_DELETE_WINDOW", close)
+
+    def refresh_thumbnail_views(self):
+        for view in self.thumb_views: view.refresh(relayout=True)
+
     def show_next_image(self,event=None):
-        if self.image_list:self.current_index=(self.current_index+1)%len(self.image_list);self.load_image()
+        if self.image_list:self.nav_direction=1;self.current_index=(self.current_index+1)%len(self.image_list);self.load_image()
     def show_previous_image(self,event=None):
-        if self.image_list:self.current_index=(self.current_index-1+len(self.image_list))%len(self.image_list);self.load_image()
+        if self.image_list:self.nav_direction=-1;self.current_index=(self.current_index-1+len(self.image_list))%len(self.image_list);self.load_image()
     
     # --- Funções de Edição ---
-    def apply_edit(self,edit_function,**kwargs):
-        if not self.edited_pil_image:return
-        self.edited_pil_image=edit_function(self.edited_pil_image,**kwargs);self.fit_image_to_window()
-    def rotate_image(self,image,angle):return image.rotate(angle,expand=True)
-    def flip_image(self,image,method):return image.transpose(method)
-    def convert_grayscale(self,image):return image.convert("L")
+    def apply_edit(self,op):
+        # A operação (em pixels reais) entra na pilha e é aplicada só na pré-visualização, na escala atual
+        if not self.edited_pil_image or self.tiled_unavailable():return
+        self.pause_playback()
+        self.ensure_edit_proxy()
+        self.history.push(op,self.edited_pil_image)
+        self.edited_pil_image=edits.apply_op(self.edited_pil_image,edits.scale_op(op,self.image_scale));self.fit_image_to_window()
+    def undo_edit(self,event=None):
+        if not self.edited_pil_image or not self.history.can_undo():return
+        self.edited_pil_image=self.history.undo(self.edited_pil_image,self.original_pil_image,self.image_scale);self.fit_image_to_window()
+    def redo_edit(self,event=None):
+        if not self.edited_pil_image or not self.history.can_redo():return
+        self.edited_pil_image=self.history.redo(self.edited_pil_image,self.image_scale);self.fit_image_to_window()
     def revert_changes(self,event=None):
-        if self.original_pil_image:self.edited_pil_image=self.original_pil_image.copy();self.fit_image_to_window()
+        if self.original_pil_image:self.history.reset();self.edited_pil_image=self.original_pil_image;self.fit_image_to_window()
     
     def resize_image(self):
-        if not self.edited_pil_image:return
-        dims=simpledialog.askstring("Redimensionar","Digite as novas dimensões (LarguraxAltura):",initialvalue=f"{self.edited_pil_image.width}x{self.edited_pil_image.height}")
+        if not self.edited_pil_image or self.tiled_unavailable():return
+        full_w,full_h=self.edited_full_size()
+        dims=simpledialog.askstring("Redimensionar","Digite as novas dimensões (LarguraxAltura):",initialvalue=f"{full_w}x{full_h}")
         if dims:
-            try:w,h=map(int,dims.lower().split('x'));self.apply_edit(lambda img:img.resize((w,h),Image.Resampling.LANCZOS))
+            try:w,h=map(int,dims.lower().split('x'));self.apply_edit(edits.resize((w,h)))
             except(ValueError,IndexError):messagebox.showerror("Formato Inválido","Use o formato 'LarguraxAltura', por exemplo '800x600'.")
             
     def open_adjustments_window(self):
-        if not self.edited_pil_image:return
+        if not self.edited_pil_image or self.tiled_unavailable():return
+        self.fit_image_to_window()
+        canvas_size=self.canvas_size()
+        if not canvas_size:return
+        new_w,new_h,_=fit_size(self.edited_pil_image.size,canvas_size)
+        preview=edits.AdjustmentPreview(self.edited_pil_image.resize((new_w,new_h),Image.Resampling.BILINEAR,reducing_gap=2.0))
         adj_win=tk.Toplevel(self);adj_win.title("Ajustes");adj_win.geometry("300x250");adj_win.configure(bg=BG_COLOR);adj_win.resizable(False,False);adj_win.transient(self)
+        preview_job=[None]
+        def schedule_preview(value=None):
+            # Movimentos do slider são agrupados: no máximo um quadro a cada ~15 ms
+            if preview_job[0] is None:preview_job[0]=adj_win.after(15,update_preview)
+        def update_preview():
+            preview_job[0]=None
+            self.display_tk_image(preview.render(brightness_slider.get(),contrast_slider.get(),sharpness_slider.get()))
         tk.Label(adj_win,text="Brilho",fg=TEXT_COLOR,bg=BG_COLOR).pack(pady=(10,0));brightness_slider=tk.Scale(adj_win,from_=0.5,to=1.5,resolution=0.05,orient='horizontal');brightness_slider.set(1.0);brightness_slider.pack(fill='x',padx=10)
         tk.Label(adj_win,text="Contraste",fg=TEXT_COLOR,bg=BG_COLOR).pack(pady=(10,0));contrast_slider=tk.Scale(adj_win,from_=0.5,to=1.5,resolution=0.05,orient='horizontal');contrast_slider.set(1.0);contrast_slider.pack(fill='x',padx=10)
         tk.Label(adj_win,text="Nitidez",fg=TEXT_COLOR,bg=BG_COLOR).pack(pady=(10,0));sharpness_slider=tk.Scale(adj_win,from_=0.0,to=2.0,resolution=0.1,orient='horizontal');sharpness_slider.set(1.0);sharpness_slider.pack(fill='x',padx=10)
-        def apply_all_adjustments():
-            base_image=self.edited_pil_image.copy()
-            enhancer=ImageEnhance.Brightness(base_image);base_image=enhancer.enhance(brightness_slider.get())
-            enhancer=ImageEnhance.Contrast(base_image);base_image=enhancer.enhance(contrast_slider.get())
-            enhancer=ImageEnhance.Sharpness(base_image);base_image=enhancer.enhance(sharpness_slider.get())
-            self.edited_pil_image=base_image;self.fit_image_to_window();adj_win.destroy()
-        tk.Button(adj_win,text="Aplicar",command=apply_all_adjustments).pack(pady=10)
+        for slider in (brightness_slider,contrast_slider,sharpness_slider):slider.config(command=schedule_preview)
+        def close_window(apply=False):
+            if preview_job[0]:adj_win.after_cancel(preview_job[0])
+            # Os valores são lidos antes de destruir a janela (um Scale destruído não pode ser consultado)
+            values=(brightness_slider.get(),contrast_slider.get(),sharpness_slider.get())
+            adj_win.destroy()
+            # Na aplicação, a resolução real é processada depois numa única passada (tabela + nitidez)
+            if apply:self.apply_edit(edits.adjust(self.edited_pil_image,*values))
+            else:self.fit_image_to_window()
+        adj_win.protocol("WM_DELETE_WINDOW",close_window)
+        tk.Button(adj_win,text="Aplicar",command=lambda:close_window(apply=True)).pack(pady=10)
     
     def batch_process_images(self):
         if not self.folder_path: messagebox.showwarning("Aviso", "Abra uma pasta primeiro."); return
@@ -371,51 +909,63 @@ class ImageViewer(tk.Tk):
         if not dims: return
         try: target_w, target_h = map(int, dims.lower().split('x'))
         except: messagebox.showerror("Erro", "Formato inválido. Use ex: 900x900"); return
-        output_dir = os.path.join(self.folder_path, "Padronizadas")
+        workers = simpledialog.askinteger("Padronizar (Lote)", "Processos em paralelo:", initialvalue=BATCH_WORKERS, minvalue=1, maxvalue=256)
+        if not workers: return
+        import pipeline
+        output_dir = os.path.join(self.folder_path, pipeline.OUTPUT_DIR_NAME)
         if not os.path.exists(output_dir): os.makedirs(output_dir)
-        count = 0; image_extensions = ('.jpg','.jpeg','.png','.gif','.bmp','.tiff','.tif','.webp')
-        files = [f for f in os.listdir(self.folder_path) if f.lower().endswith(image_extensions)]
-        for f in files:
-            try:
-                img_path = os.path.join(self.folder_path, f)
-                with Image.open(img_path) as img:
-                    if img.mode != 'RGB': img = img.convert('RGB')
-                    ratio = min(target_w/img.width, target_h/img.height)
-                    new_size = (int(img.width * ratio), int(img.height * ratio))
-                    resized_img = img.resize(new_size, Image.Resampling.LANCZOS)
-                    final_img = Image.new("RGB", (target_w, target_h), (255, 255, 255))
-                    paste_x = (target_w - new_size[0]) // 2; paste_y = (target_h - new_size[1]) // 2
-                    final_img.paste(resized_img, (paste_x, paste_y))
-                    save_path = os.path.join(output_dir, f); final_img.save(save_path); count += 1
-            except Exception as e: print(f"Erro ao processar {f}: {e}")
-        messagebox.showinfo("Concluído", f"Processamento finalizado!\n{count} imagens salvas em:\n{output_dir}")
+        options = pipeline.StandardizeOptions(target_w, target_h)
+        files = list(pipeline.iter_image_files([self.folder_path]))
+        if not files: messagebox.showinfo("Padronizar (Lote)", "Nenhuma imagem encontrada na pasta."); return
+        # Incremental: arquivos inalterados desde a última execução (manifesto em 'Padronizadas') são pulados
+        run = lambda cancel_event: pipeline.run_standardize(files, options, lambda root: output_dir, workers, cancel_event, incremental=True)
+        BatchProgressWindow(self, "Padronizar (Lote)", len(files), run, output_dir)
+
+    def batch_normalize_orientation(self):
+        if not self.folder_path: messagebox.showwarning("Aviso", "Abra uma pasta primeiro."); return
+        if not messagebox.askyesno("Orientação EXIF (Lote)", "Girar os pixels de todas as imagens da pasta conforme a tag de orientação EXIF e gravar a tag como normal?\n\n"
+                                   "Útil para programas e sites que ignoram o EXIF. Os arquivos originais são substituídos (JPEG é recomprimido com a mesma qualidade)."): return
+        import pipeline
+        files = list(pipeline.iter_image_files([self.folder_path]))
+        if not files: messagebox.showinfo("Orientação EXIF (Lote)", "Nenhuma imagem encontrada na pasta."); return
+        BatchProgressWindow(self, "Orientação EXIF (Lote)", len(files), lambda cancel_event: pipeline.run_normalize_orientation(files, BATCH_WORKERS, cancel_event))
 
     def standardize_current_image(self):
-        if not self.edited_pil_image: return
+        if not self.edited_pil_image or self.tiled_unavailable(): return
         dims = simpledialog.askstring("Padronizar Imagem Atual", "Tamanho Alvo (LxA):\n(Adicionará bordas brancas)", initialvalue="900x900")
         if not dims: return
         try: target_w, target_h = map(int, dims.lower().split('x'))
         except: messagebox.showerror("Erro", "Formato inválido. Use ex: 900x900"); return
-        try:
-            img = self.edited_pil_image
-            ratio = min(target_w/img.width, target_h/img.height)
-            new_size = (int(img.width * ratio), int(img.height * ratio))
-            resized_img = img.resize(new_size, Image.Resampling.LANCZOS)
-            final_img = Image.new("RGB", (target_w, target_h), (255, 255, 255))
-            paste_x = (target_w - new_size[0]) // 2; paste_y = (target_h - new_size[1]) // 2
-            final_img.paste(resized_img, (paste_x, paste_y))
-            self.edited_pil_image = final_img; self.fit_image_to_window()
+        try: self.apply_edit(edits.standardize(target_w, target_h))
         except Exception as e: messagebox.showerror("Erro", f"Erro ao padronizar imagem: {e}")
 
     # --- OCR ---
-    def perform_ocr_extraction(self):
-        if not HAS_OCR:
+    def get_ocr_engine(self):
+        import ocr
+        ocr.set_base_path(self.base_path)
+        if not ocr.load_tesseract():
             messagebox.showwarning("OCR Indisponível", "O Tesseract-OCR não foi encontrado.\nInstale o Tesseract e tente novamente.")
-            return
-        if not self.edited_pil_image: return
+            return None
+        if self.ocr_engine is None: self.ocr_engine = ocr.OcrEngine(OCR_WORKERS)
+        return self.ocr_engine
+
+    def ocr_options(self):
+        import ocr
+        return ocr.OcrOptions(grayscale=self.ocr_grayscale.get(), binarize=self.ocr_binarize.get())
+
+    def perform_ocr_extraction(self):
+        if not self.edited_pil_image or not self.get_ocr_engine(): return
+        self.ensure_full_resolution()
+        # O Tesseract roda no pool; a interface só verifica periodicamente se o resultado chegou
+        future = self.ocr_engine.submit_image(self.edited_pil_image, self.ocr_options())
+        self.config(cursor="watch"); self.file_status_label.config(text="Extraindo texto (OCR)...")
+        self.after(100, self.poll_ocr_result, future)
+
+    def poll_ocr_result(self, future):
+        if not future.done(): self.after(100, self.poll_ocr_result, future); return
+        self.config(cursor=""); self.update_status()
         try:
-            try: text = pytesseract.image_to_string(self.edited_pil_image, lang='por')
-            except pytesseract.TesseractError: text = pytesseract.image_to_string(self.edited_pil_image)
+            text = future.result()
             if not text.strip(): messagebox.showinfo("OCR", "Nenhum texto detectado."); return
             ocr_win = tk.Toplevel(self); ocr_win.title("Texto Extraído"); ocr_win.geometry("600x400"); ocr_win.configure(bg=BG_COLOR)
             txt_box = tk.Text(ocr_win, wrap="word", font=("Segoe UI", 11)); txt_box.pack(expand=True, fill='both', padx=10, pady=10); txt_box.insert("1.0", text)
@@ -423,9 +973,21 @@ class ImageViewer(tk.Tk):
             tk.Button(ocr_win, text="Copiar Texto", command=copy, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE_BOLD).pack(pady=10)
         except Exception as e: messagebox.showerror("Erro no OCR", f"Falha: {e}")
 
+    def open_ocr_folder_window(self):
+        if not self.folder_files: messagebox.showinfo("OCR", "Abra uma pasta primeiro."); return
+        if not self.get_ocr_engine(): return
+        import ocr
+        OcrFolderWindow(self, self.ocr_engine, ocr.OcrIndex(self.folder_path), list(self.folder_files), self.ocr_options())
+
+    # --- Duplicatas ---
+    def open_duplicates_window(self):
+        if not self.folder_files: messagebox.showinfo("Duplicatas", "Abra uma pasta primeiro."); return
+        import duplicates
+        DuplicatesWindow(self, duplicates.HashIndex(self.folder_path), list(self.folder_files))
+
     # --- Funções de Corte ---
     def start_crop_mode(self):
-        if not self.edited_pil_image:return
+        if not self.edited_pil_image or self.tiled_unavailable():return
         self.cropping=True;self.config(cursor="crosshair")
     def end_crop_mode(self):
         self.cropping=False;self.config(cursor="arrow")
@@ -447,43 +1009,98 @@ class ImageViewer(tk.Tk):
         end_x,end_y=self.canvas.canvasx(event.x),self.canvas.canvasy(event.y)
         x1,y1=min(self.crop_start_x,end_x),min(self.crop_start_y,end_y);x2,y2=max(self.crop_start_x,end_x),max(self.crop_start_y,end_y)
         img_offset_x, img_offset_y = self.canvas_image_coords
-        if not self.tk_image_ref or self.tk_image_ref.width() == 0: return
-        displayed_w = self.tk_image_ref.width(); actual_w = self.edited_pil_image.width
-        ratio = actual_w / displayed_w
+        if not self.tk_image_ref or self.zoom_level <= 0: return
+        actual_w, actual_h = self.edited_full_size()    # A caixa do corte é calculada em pixels reais
+        ratio = 1 / self.zoom_level
         box_x1 = (x1 - img_offset_x) * ratio; box_y1 = (y1 - img_offset_y) * ratio
         box_x2 = (x2 - img_offset_x) * ratio; box_y2 = (y2 - img_offset_y) * ratio
         box_x1 = max(0, box_x1); box_y1 = max(0, box_y1)
-        box_x2 = min(actual_w, box_x2); box_y2 = min(self.edited_pil_image.height, box_y2)
-        if box_x2 > box_x1 and box_y2 > box_y1:
-            self.apply_edit(lambda img,box:img.crop(box),box=(box_x1,box_y1,box_x2,box_y2))
+        box_x2 = min(actual_w, box_x2); box_y2 = min(actual_h, box_y2)
+        if box_x2 - box_x1 >= 1 and box_y2 - box_y1 >= 1:
+            self.apply_edit(edits.crop((box_x1,box_y1,box_x2,box_y2)))
         self.end_crop_mode()
 
     # --- Funções de Arrastar (Pan) ---
     def on_pan_start(self, event):
-        if not self.image_on_canvas_id: return
+        if not self.edited_pil_image: return
         self.canvas.config(cursor="fleur")
         self.pan_start_x = event.x; self.pan_start_y = event.y
-        self.canvas_drag_start_x, self.canvas_drag_start_y = self.canvas.coords(self.image_on_canvas_id)
+        self.canvas_drag_start_x, self.canvas_drag_start_y = self.canvas_image_coords
+        self.panning = True
 
     def on_pan_move(self, event):
-        if not self.image_on_canvas_id: return
+        if not self.panning: return
         dx = event.x - self.pan_start_x; dy = event.y - self.pan_start_y
-        self.canvas.coords(self.image_on_canvas_id, self.canvas_drag_start_x + dx, self.canvas_drag_start_y + dy)
+        self.canvas_image_coords = (self.canvas_drag_start_x + dx, self.canvas_drag_start_y + dy)
+        # Se a imagem inteira já está renderizada basta mover; senão a nova área visível precisa ser renderizada
+        if self.viewport_full and self.image_on_canvas_id: self.canvas.coords(self.image_on_canvas_id, *self.canvas_image_coords)
+        else: self.request_render()
 
     def on_pan_end(self, event):
         if not self.cropping: self.canvas.config(cursor="arrow")
-        if self.image_on_canvas_id: self.canvas_image_coords = self.canvas.coords(self.image_on_canvas_id)
+        if not self.panning: return
+        self.panning = False
+        if not self.viewport_full:
+            if self.progressive_render: self.schedule_refine()
+            else: self.render_viewport()
         
     # --- Zoom ---
     def set_zoom(self, zoom_level): self.zoom_level = zoom_level; self.apply_zoom()
     
-    def apply_zoom(self, specific_position=None):
-        if not self.original_pil_image: return
-        new_w = int(self.original_pil_image.width * self.zoom_level)
-        new_h = int(self.original_pil_image.height * self.zoom_level)
+    def apply_zoom(self, specific_position=None, interactive=False):
+        if not self.edited_pil_image: return
+        self.pause_playback()
+        if self.zoom_level > self.image_scale: self.ensure_full_resolution()
+        new_w = self.edited_pil_image.width * self.render_zoom()
+        new_h = self.edited_pil_image.height * self.render_zoom()
         if new_w < 1 or new_h < 1: return
-        resized_image = self.edited_pil_image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        self.display_tk_image(resized_image, specific_position)
+        if specific_position is None:
+            specific_position = ((self.canvas.winfo_width() - new_w) / 2, (self.canvas.winfo_height() - new_h) / 2)
+        self.canvas_image_coords = specific_position
+        if interactive: self.request_render()
+        else: self.cancel_pending_render(); self.render_viewport()
+
+    def render_zoom(self):
+        # zoom_level é relativo à resolução real; a imagem em memória pode estar reduzida
+        return self.zoom_level / self.image_scale
+
+    def render_viewport(self, fast=False):
+        # Escala apenas a parte da imagem que aparece no canvas
+        if not self.edited_pil_image: return
+        canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if fast: resample, reducing_gap = preview_resample(self.render_zoom()), 2.0
+        else: resample, reducing_gap = Image.Resampling.LANCZOS, None
+        with profiler.stage('zoom_fast' if fast else 'zoom_lanczos'):
+            if self.pyramid: rendered = self.pyramid.render(self.zoom_level, self.canvas_image_coords, canvas_size, resample, reducing_gap)
+            else: rendered = render_region(self.edited_pil_image, self.render_zoom(), self.canvas_image_coords, canvas_size, resample, reducing_gap)
+        if rendered is None:
+            self.canvas.delete("all"); self.image_on_canvas_id = None; self.update_status(); return
+        piece, position, full = rendered
+        self.display_tk_image(piece, position, image_origin=self.canvas_image_coords)
+        self.viewport_full = full
+
+    # --- Renderização Progressiva ---
+    def request_render(self):
+        # Entrada interativa: uma prévia rápida por rajada de eventos + um único refinamento quando a entrada parar
+        if not self.progressive_render: self.render_viewport(); return
+        if not self.fast_render_job: self.fast_render_job = self.after_idle(self.render_fast)
+        self.schedule_refine()
+
+    def schedule_refine(self):
+        if self.refine_job: self.after_cancel(self.refine_job)
+        self.refine_job = self.after(self.refine_delay_ms, self.render_refined)
+
+    def cancel_pending_render(self):
+        if self.fast_render_job: self.after_cancel(self.fast_render_job); self.fast_render_job = None
+        if self.refine_job: self.after_cancel(self.refine_job); self.refine_job = None
+
+    def render_fast(self):
+        self.fast_render_job = None
+        self.render_viewport(fast=True)
+
+    def render_refined(self):
+        self.refine_job = None
+        self.render_viewport()
 
     def on_mouse_wheel(self, event):
         if not self.original_pil_image: return
@@ -497,35 +1114,478 @@ class ImageViewer(tk.Tk):
         new_img_x = mouse_x - (mouse_x - img_x) * (new_zoom_level / self.zoom_level)
         new_img_y = mouse_y - (mouse_y - img_y) * (new_zoom_level / self.zoom_level)
         self.zoom_level = new_zoom_level
-        self.apply_zoom(specific_position=(new_img_x, new_img_y))
+        self.apply_zoom(specific_position=(new_img_x, new_img_y), interactive=True)
 
-    def zoom_in(self,event=None):self.zoom_level=min(5.0,self.zoom_level+0.1);self.apply_zoom()
-    def zoom_out(self,event=None):self.zoom_level=max(0.1,self.zoom_level-0.1);self.apply_zoom()
+    def zoom_in(self,event=None):self.zoom_level=min(5.0,self.zoom_level+0.1);self.apply_zoom(interactive=True)
+    def zoom_out(self,event=None):self.zoom_level=max(0.1,self.zoom_level-0.1);self.apply_zoom(interactive=True)
     
     def save_as(self, event=None):
-        if not self.edited_pil_image: return
+        if not self.edited_pil_image or self.tiled_unavailable(): return
+        self.ensure_full_resolution()
         image_to_save = self.edited_pil_image
         if image_to_save.mode in ('RGBA', 'P'): image_to_save = image_to_save.convert('RGB')
         file_path = filedialog.asksaveasfilename(defaultextension=".jpg", filetypes=[("JPEG", "*.jpg"), ("PNG", "*.png"), ("Bitmap", "*.bmp")])
         if file_path:
-            try: image_to_save.save(file_path); messagebox.showinfo("Sucesso", f"Imagem salva em:\n{file_path}")
+            try:
+                with profiler.stage('encode'): image_to_save.save(file_path)
+                messagebox.showinfo("Sucesso", f"Imagem salva em:\n{file_path}")
             except Exception as e: messagebox.showerror("Erro", f"Erro ao salvar: {e}")
 
     def save_changes(self, event=None):
-        if not self.edited_pil_image or not self.image_list: return
+        if not self.edited_pil_image or not self.image_list or self.tiled_unavailable(): return
         current_file_path = self.image_list[self.current_index]
-        if not messagebox.askyesno("Sobrescrever", f"Tem certeza que deseja salvar as alterações em:\n{os.path.basename(current_file_path)}?\n\nEssa ação não pode ser desfeita."): return
+        frames_note = f"\n\nO arquivo tem {self.frame_source.n_frames} quadros: apenas o quadro atual será mantido." if self.frame_source else ""
+        if not messagebox.askyesno("Sobrescrever", f"Tem certeza que deseja salvar as alterações em:\n{os.path.basename(current_file_path)}?{frames_note}\n\nEssa ação não pode ser desfeita."): return
+        if self.save_orientation_only(current_file_path): return
+        self.ensure_full_resolution()
         try:
             image_to_save = self.edited_pil_image
             if image_to_save.mode in ('RGBA', 'P') and current_file_path.lower().endswith(('.jpg', '.jpeg', '.bmp')):
                 image_to_save = image_to_save.convert('RGB')
-            image_to_save.save(current_file_path)
-            self.original_pil_image = self.edited_pil_image.copy()
+            with profiler.stage('encode'): image_to_save.save(current_file_path)
+            self.original_pil_image = self.edited_pil_image; self.history.reset(); self.full_size = self.edited_pil_image.size
             messagebox.showinfo("Salvo", "Imagem atualizada com sucesso!")
         except Exception as e: messagebox.showerror("Erro", f"Não foi possível salvar o arquivo:\n{e}")
 
+    def save_orientation_only(self, path):
+        # Só rotações/inversões num JPEG: grava a nova orientação na tag EXIF, sem decodificar nem recomprimir
+        ops = edits.optimize(self.history.ops, self.full_size)
+        if self.frame_source or any(op[0] != 'transpose' for op in ops): return False
+        net = (0, 0)
+        for op in ops: net = edits.compose_transpose(net, op[1])
+        # Sem rotação/inversão líquida (nenhuma edição, ou giros que se anulam) não há o que gravar: nem a tag é inserida
+        if net == (0, 0): messagebox.showinfo("Salvo", "Nenhuma alteração a salvar: o arquivo não foi modificado."); return True
+        try:
+            with Image.open(path) as img:
+                if img.format != 'JPEG': return False
+                current = orientation.read_orientation(img)
+            element = edits.compose_transpose(orientation.ORIENTATION_ELEMENTS[current], net)
+            with profiler.stage('encode'): orientation.write_jpeg_orientation(path, orientation.orientation_for_element(element))
+        except Exception as e: messagebox.showerror("Erro", f"Não foi possível salvar o arquivo:\n{e}"); return True
+        # A prévia já mostra o resultado: vira a nova imagem base, na mesma escala
+        self.full_size = self.edited_full_size(); self.original_pil_image = self.edited_pil_image; self.history.reset()
+        messagebox.showinfo("Salvo", "Orientação atualizada (sem recomprimir a imagem).")
+        return True
+
+# ===================================================================
+#              NAVEGADOR DE MINIATURAS (TIRA E GRADE)
+# ===================================================================
+class ThumbnailView(tk.Canvas):
+    # Canvas virtualizado: só as células visíveis têm itens desenhados e pedem miniaturas
+    def __init__(self, parent, viewer, horizontal):
+        from thumbnails import THUMB_SIZE
+        self.CELL = THUMB_SIZE + 16
+        super().__init__(parent, bg=PANEL_BG_COLOR, highlightthickness=0, height=self.CELL if horizontal else None,
+                         xscrollincrement=self.CELL, yscrollincrement=self.CELL)
+        self.viewer, self.horizontal = viewer, horizontal
+        self.cells = {}             # índice -> (caminho, ids dos itens do canvas)
+        self.layout = None
+        self.bind("<Configure>", lambda e: self.refresh(relayout=True))
+        self.bind("<MouseWheel>", self.on_wheel)
+        self.bind("<Button-1>", self.on_click)
+
+    def columns(self):
+        return max(1, self.winfo_width() // self.CELL)
+
+    def cell_origin(self, index):
+        if self.horizontal: return index * self.CELL, 0
+        cols = self.columns()
+        return (index % cols) * self.CELL, (index // cols) * self.CELL
+
+    def visible_range(self):
+        total = len(self.viewer.image_list)
+        if self.horizontal:
+            first = int(self.canvasx(0) // self.CELL); last = int(self.canvasx(self.winfo_width()) // self.CELL) + 1
+        else:
+            cols = self.columns()
+            first = int(self.canvasy(0) // self.CELL) * cols; last = (int(self.canvasy(self.winfo_height()) // self.CELL) + 1) * cols
+        return max(0, first), min(total, last)
+
+    def refresh(self, relayout=False):
+        image_list = self.viewer.image_list
+        total = len(image_list)
+        layout = (total, 1 if self.horizontal else self.columns())
+        if relayout or layout != self.layout:
+            self.layout = layout
+            self.delete("all"); self.cells.clear()
+            if self.horizontal: self.config(scrollregion=(0, 0, total * self.CELL, self.CELL))
+            else: self.config(scrollregion=(0, 0, layout[1] * self.CELL, -(-total // layout[1]) * self.CELL))
+        first, last = self.visible_range()
+        for index in [i for i in self.cells if not first <= i < last]:
+            for item in self.cells.pop(index)[1]: self.delete(item)
+        for index in range(first, last):
+            if index not in self.cells: self.draw_cell(index)
+        # Visíveis primeiro, depois uma tela adiante (pré-carregamento)
+        span = last - first
+        self.viewer.request_thumbnails(image_list[first:last] + image_list[last:min(total, last + span)], self)
+
+    def draw_cell(self, index):
+        path = self.viewer.image_list[index]
+        x, y = self.cell_origin(index)
+        current = index == self.viewer.current_index
+        items = [self.create_rectangle(x + 2, y + 2, x + self.CELL - 2, y + self.CELL - 2, outline=LINK_COLOR if current else PANEL_BG_COLOR, width=2, fill=BG_COLOR)]
+        photo = self.viewer.thumbnail_photo(path)
+        if photo: items.append(self.create_image(x + self.CELL // 2, y + self.CELL // 2, image=photo))
+        self.cells[index] = (path, items)
+
+    def redraw_cell(self, index):
+        if index in self.cells:
+            for item in self.cells.pop(index)[1]: self.delete(item)
+            self.draw_cell(index)
+
+    def on_thumbnails(self, paths):
+        arrived = set(paths)
+        for index, (path, _) in list(self.cells.items()):
+            if path in arrived: self.redraw_cell(index)
+
+    def set_current(self, index):
+        for i, (path, items) in list(self.cells.items()):
+            if i == index or self.itemcget(items[0], 'outline') == LINK_COLOR: self.redraw_cell(i)
+        self.see(index)
+
+    def see(self, index):
+        # Rola até a célula atual se ela estiver fora da área visível
+        first, last = self.visible_range()
+        if first <= index < last - 1: return
+        x, y = self.cell_origin(index)
+        if self.horizontal: self.xview_moveto(max(0, x - self.winfo_width() / 2) / max(1, len(self.viewer.image_list) * self.CELL))
+        else: self.yview_moveto(max(0, y - self.winfo_height() / 2) / max(1, (-(-len(self.viewer.image_list) // self.columns())) * self.CELL))
+        self.refresh()
+
+    def on_scrollbar(self, *args):
+        self.yview(*args); self.refresh()
+
+    def on_wheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        if self.horizontal: self.xview_scroll(step, 'units')
+        else: self.yview_scroll(step, 'units')
+        self.refresh()
+        return "break"      # Não deixa o evento chegar ao zoom da janela principal
+
+    def on_click(self, event):
+        x, y = self.canvasx(event.x), self.canvasy(event.y)
+        if self.horizontal: index = int(x // self.CELL)
+        else: index = int(y // self.CELL) * self.columns() + int(x // self.CELL) if x < self.columns() * self.CELL else -1
+        self.viewer.jump_to_image(index)
+
+# ===================================================================
+#              OCR DA PASTA INTEIRA + BUSCA NO TEXTO
+# ===================================================================
+class OcrFolderWindow(tk.Toplevel):
+    def __init__(self, parent, engine, index, files, options):
+        super().__init__(parent)
+        self.title(f"Buscar Texto (OCR) - {index.folder}"); self.geometry("620x520"); self.configure(bg=BG_COLOR); self.transient(parent)
+        self.viewer, self.engine, self.index, self.files, self.options = parent, engine, index, files, options
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.running = False
+        self.poll_job = None
+        self.matches = []
+
+        search_frame = tk.Frame(self, bg=BG_COLOR); search_frame.pack(fill='x', padx=10, pady=(10, 5))
+        self.query = tk.Entry(search_frame, font=FONT_TUPLE); self.query.pack(side='left', expand=True, fill='x')
+        self.query.bind("<Return>", self.search)
+        tk.Button(search_frame, text="Buscar", command=self.search, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE, relief='flat').pack(side='left', padx=(5, 0))
+        self.matches_list = tk.Listbox(self, bg=PANEL_BG_COLOR, fg=TEXT_COLOR, font=("Segoe UI", 9), relief='flat')
+        self.matches_list.pack(expand=True, fill='both', padx=10, pady=5)
+        self.matches_list.bind("<Double-Button-1>", self.open_match)
+        self.lbl_progress = tk.Label(self, text="", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE, anchor='w')
+        self.lbl_progress.pack(fill='x', padx=10)
+        self.progress_bar = ttk.Progressbar(self, maximum=len(files))
+        self.progress_bar.pack(fill='x', padx=10, pady=5)
+        self.btn_run = tk.Button(self, text="Indexar Pasta", command=self.start_or_cancel, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE, relief='flat', width=16)
+        self.btn_run.pack(pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.lbl_progress.config(text=f"{index.count()} de {len(files)} imagens já indexadas")
+        self.query.focus_set()
+
+    def start_or_cancel(self):
+        if self.running:
+            self.cancel_event.set(); self.btn_run.config(state='disabled', text="Cancelando..."); return
+        self.running, self.processed, self.failed = True, 0, 0
+        self.cancel_event.clear(); self.start_time = time.perf_counter()
+        self.btn_run.config(text="Cancelar")
+        threading.Thread(target=self.run_jobs, daemon=True).start()
+        self.poll_job = self.after(100, self.poll_results)
+
+    def run_jobs(self):
+        # Arquivos já indexados com os mesmos parâmetros (tamanho + mtime) são pulados
+        try:
+            for result in self.engine.run_folder(self.files, self.options, self.index, self.cancel_event): self.results.put(result)
+        finally: self.results.put(None)
+
+    def poll_results(self):
+        while True:
+            try: result = self.results.get_nowait()
+            except queue.Empty: break
+            if result is None: self.finish(); return
+            self.processed += 1
+            if result[2]: self.failed += 1
+        rate = self.processed / max(1e-6, time.perf_counter() - self.start_time)
+        self.lbl_progress.config(text=f"{self.processed} de {len(self.files)}  ({rate:.1f} imagens/s, falhas: {self.failed})")
+        self.progress_bar['value'] = self.processed
+        self.poll_job = self.after(100, self.poll_results)
+
+    def finish(self):
+        self.running, self.poll_job = False, None
+        status = "Cancelado" if self.cancel_event.is_set() else "Concluído"
+        self.lbl_progress.config(text=f"{status}: {self.processed} de {len(self.files)} imagens  (falhas: {self.failed})")
+        self.progress_bar['value'] = self.processed
+        self.btn_run.config(state='normal', text="Indexar Pasta")
+        if self.query.get().strip(): self.search()
+
+    def search(self, event=None):
+        self.matches = self.index.search(self.query.get())
+        self.matches_list.delete(0, 'end')
+        for path, snippet in self.matches: self.matches_list.insert('end', f"{os.path.basename(path)}:  {snippet}")
+        if not self.matches: self.matches_list.insert('end', "(nenhum resultado)")
+
+    def open_match(self, event=None):
+        selection = self.matches_list.curselection()
+        if not selection or selection[0] >= len(self.matches): return
+        path = self.matches[selection[0]][0]
+        if path in self.viewer.image_list: self.viewer.jump_to_image(self.viewer.image_list.index(path))
+
+    def on_close(self):
+        self.cancel_event.set()
+        if self.poll_job: self.after_cancel(self.poll_job)
+        self.destroy()
+
+# ===================================================================
+#           DUPLICATAS DA PASTA: REVISÃO E EXCLUSÃO
+# ===================================================================
+class DuplicatesWindow(tk.Toplevel):
+    METHOD_LABELS = {'phash': "pHash (frequências)", 'dhash': "dHash (gradientes)", 'ahash': "aHash (média)"}
+
+    def __init__(self, parent, index, files):
+        import duplicates
+        from thumbnails import THUMB_SIZE
+        super().__init__(parent)
+        self.title(f"Duplicatas - {index.folder}"); self.geometry("820x560"); self.configure(bg=BG_COLOR); self.transient(parent)
+        self.viewer, self.index, self.files = parent, index, files
+        self.finder = None
+        self.poll_job = None
+        self.preview_path = None
+
+        options_frame = tk.Frame(self, bg=BG_COLOR); options_frame.pack(fill='x', padx=10, pady=(10, 5))
+        tk.Label(options_frame, text="Método:", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE).pack(side='left')
+        self.method = ttk.Combobox(options_frame, values=[self.METHOD_LABELS[m] for m in duplicates.HASH_METHODS], state='readonly', width=20)
+        self.method.set(self.METHOD_LABELS[duplicates.DEFAULT_METHOD]); self.method.pack(side='left', padx=(5, 15))
+        tk.Label(options_frame, text="Tolerância (bits):", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE).pack(side='left')
+        self.max_distance = tk.Spinbox(options_frame, from_=0, to=duplicates.MAX_DISTANCE_LIMIT, width=4, font=FONT_TUPLE)
+        self.max_distance.delete(0, 'end'); self.max_distance.insert(0, duplicates.DEFAULT_MAX_DISTANCE); self.max_distance.pack(side='left', padx=5)
+        self.btn_run = tk.Button(options_frame, text="Procurar", command=self.start_or_cancel, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE, relief='flat', width=12)
+        self.btn_run.pack(side='right')
+
+        self.lbl_progress = tk.Label(self, text=f"{len(files)} imagens na pasta", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE, anchor='w')
+        self.lbl_progress.pack(fill='x', padx=10)
+        self.progress_bar = ttk.Progressbar(self)
+        self.progress_bar.pack(fill='x', padx=10, pady=5)
+
+        body = tk.Frame(self, bg=BG_COLOR); body.pack(expand=True, fill='both', padx=10, pady=5)
+        preview_frame = tk.Frame(body, bg=PANEL_BG_COLOR, width=THUMB_SIZE + 20); preview_frame.pack_propagate(False)
+        preview_frame.pack(side='right', fill='y', padx=(5, 0))
+        self.preview = tk.Label(preview_frame, bg=PANEL_BG_COLOR); self.preview.pack(expand=True, fill='both')
+        self.tree = ttk.Treeview(body, columns=('dimensions', 'filesize'), selectmode='extended')
+        self.tree.heading('#0', text="Arquivo"); self.tree.heading('dimensions', text="Dimensões"); self.tree.heading('filesize', text="Tamanho")
+        self.tree.column('dimensions', width=110, anchor='e', stretch=False); self.tree.column('filesize', width=90, anchor='e', stretch=False)
+        scrollbar = tk.Scrollbar(body, orient='vertical', command=self.tree.yview); self.tree.config(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y'); self.tree.pack(side='left', expand=True, fill='both')
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<Double-Button-1>", self.open_selected)
+
+        buttons = tk.Frame(self, bg=BG_COLOR); buttons.pack(fill='x', padx=10, pady=10)
+        tk.Button(buttons, text="Marcar Cópias", command=self.mark_copies, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE, relief='flat').pack(side='left')
+        tk.Button(buttons, text="Excluir Selecionados", command=self.delete_selected, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE, relief='flat').pack(side='right')
+        # A prévia usa as mesmas miniaturas (cache em disco) da tira e da grade
+        self.viewer.register_thumbnail_view(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def start_or_cancel(self):
+        import duplicates
+        if self.finder:
+            self.finder.cancel(); self.btn_run.config(state='disabled', text="Cancelando..."); return
+        try: max_distance = max(0, min(duplicates.MAX_DISTANCE_LIMIT, int(self.max_distance.get())))
+        except ValueError: messagebox.showerror("Erro", "Tolerância inválida.", parent=self); return
+        method = next(m for m, label in self.METHOD_LABELS.items() if label == self.method.get())
+        self.tree.delete(*self.tree.get_children())
+        self.finder = duplicates.DuplicateFinder(self.index, self.files, method, max_distance, DUPLICATE_WORKERS)
+        self.btn_run.config(text="Cancelar")
+        self.poll_job = self.after(100, self.poll_results)
+
+    def poll_results(self):
+        while True:
+            try: event = self.finder.results.get_nowait()
+            except queue.Empty: break
+            kind = event[0]
+            if kind == 'hashed':
+                processed, total, failed = event[1:]
+                self.progress_bar.config(maximum=max(1, total), value=processed)
+                self.lbl_progress.config(text=f"Calculando hashes: {processed} de {total} imagens novas ou alteradas  (falhas: {failed})")
+            elif kind == 'grouping': self.lbl_progress.config(text="Agrupando imagens parecidas...")
+            elif kind == 'done': self.finish(event[1]); return
+            elif kind == 'error':
+                self.finder, self.poll_job = None, None
+                self.btn_run.config(state='normal', text="Procurar"); self.lbl_progress.config(text="Erro")
+                messagebox.showerror("Erro", f"Falha ao procurar duplicatas:\n{event[1]}", parent=self); return
+        self.poll_job = self.after(100, self.poll_results)
+
+    def finish(self, groups):
+        self.finder, self.poll_job = None, None
+        self.btn_run.config(state='normal', text="Procurar")
+        if groups is None: self.lbl_progress.config(text="Cancelado"); return
+        for number, group in enumerate(groups, 1):
+            parent = self.tree.insert('', 'end', text=f"Grupo {number}  ({len(group)} imagens)", open=True)
+            for path in group:
+                meta = self.index.get(path) or {}
+                dimensions = f"{meta['width']}x{meta['height']}" if meta.get('width') else ""
+                filesize = f"{meta['size'] / 1024:.0f} KB" if meta.get('size') else ""
+                self.tree.insert(parent, 'end', iid=path, text=os.path.basename(path), values=(dimensions, filesize))
+        copies = sum(len(group) - 1 for group in groups)
+        self.lbl_progress.config(text=f"{len(groups)} grupos, {copies} possíveis cópias" if groups else "Nenhuma duplicata encontrada.")
+
+    def selected_files(self):
+        return [iid for iid in self.tree.selection() if self.tree.parent(iid)]
+
+    def on_select(self, event=None):
+        files = self.selected_files()
+        self.preview_path = files[-1] if files else None
+        self.show_preview()
+        if self.preview_path: self.viewer.request_thumbnails([self.preview_path], self)
+
+    def show_preview(self):
+        photo = self.viewer.thumbnail_photo(self.preview_path) if self.preview_path else None
+        self.preview.config(image=photo or '')
+
+    # Chamados pelo visualizador como nas outras vistas de miniaturas
+    def on_thumbnails(self, paths):
+        if self.preview_path in paths: self.show_preview()
+
+    def refresh(self, relayout=False): pass
+
+    def set_current(self, index):
+        # Destaca (sem selecionar) a imagem aberta no visualizador quando ela faz parte de um grupo
+        path = self.viewer.image_list[index] if 0 <= index < len(self.viewer.image_list) else None
+        if path and self.tree.exists(path): self.tree.focus(path); self.tree.see(path)
+
+    def mark_copies(self):
+        # Seleciona tudo menos o "melhor" arquivo de cada grupo (maior resolução, depois maior arquivo)
+        import duplicates
+        marked = []
+        for group_id in self.tree.get_children():
+            group = list(self.tree.get_children(group_id))
+            best = duplicates.best_of_group(group, self.index)
+            marked += [path for path in group if path != best]
+        self.tree.selection_set(marked)
+
+    def delete_selected(self):
+        files = self.selected_files()
+        if not files: return
+        if not messagebox.askyesno("Excluir", f"Excluir {len(files)} arquivo(s) do disco?\n\nEssa ação não pode ser desfeita.", parent=self): return
+        failures = []
+        for path in files:
+            try: os.remove(path)
+            except OSError as e: failures.append(f"{os.path.basename(path)}: {e}"); continue
+            if not self.tree.exists(path): continue      # O grupo já saiu da lista
+            group_id = self.tree.parent(path); self.tree.delete(path)
+            if len(self.tree.get_children(group_id)) < 2: self.tree.delete(group_id)
+        # O observador da pasta (folder_scan) tira os arquivos apagados da navegação do visualizador
+        if failures: messagebox.showerror("Erro", "Não foi possível excluir:\n" + "\n".join(failures[:20]), parent=self)
+
+    def open_selected(self, event=None):
+        files = self.selected_files()
+        if files and files[0] in self.viewer.image_list: self.viewer.jump_to_image(self.viewer.image_list.index(files[0]))
+
+    def on_close(self):
+        if self.finder: self.finder.cancel()
+        if self.poll_job: self.after_cancel(self.poll_job)
+        self.viewer.thumb_views.remove(self)
+        self.destroy()
+
+# ===================================================================
+#                   JANELA DE PROGRESSO DO LOTE
+# ===================================================================
+class BatchProgressWindow(tk.Toplevel):
+    # 'run(cancel_event)' gera os resultados do pipeline (padronização ou orientação) conforme terminam
+    def __init__(self, parent, title, total, run, output_dir=None):
+        super().__init__(parent)
+        self.title(title); self.geometry("520x420"); self.configure(bg=BG_COLOR); self.transient(parent)
+        self.total, self.done, self.failed, self.skipped, self.removed = total, 0, 0, 0, 0
+        self.output_dir = output_dir
+        self.results = queue.Queue()
+        self.start_time = time.perf_counter()
+        self.cancel_event = threading.Event()
+        self.finished = False
+        self.error = None       # Exceção que interrompeu o lote (o pipeline parou antes do fim)
+
+        self.lbl_progress = tk.Label(self, text="", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE_BOLD, anchor='w')
+        self.lbl_progress.pack(fill='x', padx=10, pady=(10, 0))
+        self.progress_bar = ttk.Progressbar(self, maximum=self.total)
+        self.progress_bar.pack(fill='x', padx=10, pady=5)
+        self.lbl_rate = tk.Label(self, text="", fg=TEXT_COLOR, bg=BG_COLOR, font=FONT_TUPLE, anchor='w')
+        self.lbl_rate.pack(fill='x', padx=10)
+        tk.Label(self, text="Falhas:", fg="#AAAAAA", bg=BG_COLOR, font=("Segoe UI", 9, "bold"), anchor='w').pack(fill='x', padx=10, pady=(10, 0))
+        self.failures_list = tk.Listbox(self, bg=PANEL_BG_COLOR, fg=TEXT_COLOR, font=("Segoe UI", 9), relief='flat')
+        self.failures_list.pack(expand=True, fill='both', padx=10, pady=5)
+        self.btn_cancel = tk.Button(self, text="Cancelar", command=self.cancel, bg=BTN_BG_COLOR, fg=TEXT_COLOR, font=FONT_TUPLE, relief='flat', width=12)
+        self.btn_cancel.pack(pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # O pool roda numa thread de fundo; os resultados voltam pela fila e são lidos no loop do Tk
+        threading.Thread(target=self.run_jobs, args=(run,), daemon=True).start()
+        self.update_labels()
+        self.poll_job = self.after(100, self.poll_results)
+
+    def run_jobs(self, run):
+        try:
+            for result in run(self.cancel_event): self.results.put(result)
+        except Exception as e: self.results.put(e)     # Mostrado como falha do lote, não como concluído
+        finally: self.results.put(None)    # Fim do lote
+
+    def poll_results(self):
+        while True:
+            try: result = self.results.get_nowait()
+            except queue.Empty: break
+            if result is None: self.update_labels(); self.finish(); return
+            if isinstance(result, Exception): self.error = result; self.failures_list.insert('end', f"Lote interrompido: {result}"); continue
+            if result.get('removed'): self.removed += 1
+            elif result.get('skipped'): self.skipped += 1
+            elif result['ok']: self.done += 1
+            else: self.failed += 1; self.failures_list.insert('end', f"{os.path.basename(result['src'])}: {result['error']}")
+        self.update_labels()
+        self.poll_job = self.after(100, self.poll_results)
+
+    def update_labels(self):
+        processed = self.done + self.failed + self.skipped
+        elapsed = time.perf_counter() - self.start_time
+        rate = processed / elapsed if elapsed > 0 else 0
+        eta = (self.total - processed) / rate if rate > 0 else 0
+        self.lbl_progress.config(text=f"{processed} de {self.total}  (concluídas: {self.done}, inalteradas: {self.skipped}, falhas: {self.failed})")
+        self.lbl_rate.config(text=f"{rate:.1f} imagens/s  -  Tempo restante: {int(eta // 60)}min {int(eta % 60)}s")
+        self.progress_bar['value'] = processed
+
+    def cancel(self):
+        if self.finished: return
+        self.cancel_event.set()     # Os arquivos em andamento terminam; os que faltam não são enviados
+        self.btn_cancel.config(state='disabled', text="Cancelando...")
+
+    def finish(self):
+        self.finished = True
+        status = "Interrompido por erro" if self.error else "Cancelado" if self.cancel_event.is_set() else "Concluído"
+        destination = f"salvas em {self.output_dir}" if self.output_dir else "atualizadas"
+        self.lbl_progress.config(text=f"{status}: {self.done} imagens {destination}  (inalteradas: {self.skipped}, removidas: {self.removed}, falhas: {self.failed})")
+        self.btn_cancel.config(state='normal', text="Fechar", command=self.destroy)
+
+    def on_close(self):
+        self.cancel(); self.after_cancel(self.poll_job); self.destroy()
+
+def run(file_path=None, instance_server=None, on_first_image=None):
+    app = ImageViewer(file_path=file_path, instance_server=instance_server, on_first_image=on_first_image)
+    app.mainloop()
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1: file_path_arg = sys.argv[1]
-    else: file_path_arg = None
-    app = ImageViewer(file_path=file_path_arg)
-    app.mainloop()
\ No newline at end of file
+    # Mesmo ponto de entrada do executável (instância única, modos batch/orient): ver pixelvista.py
+    import multiprocessing
+    multiprocessing.freeze_support()    # Necessário para o ProcessPoolExecutor no executável do PyInstaller
+    import pixelvista
+    sys.exit(pixelvista.main())